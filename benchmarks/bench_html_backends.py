@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from corpus import outlook_html_body
+
+from email2qa.html_text import lxml_to_text, soup_to_text
+from email2qa.preprocess import PreprocessRules, preprocess_email_body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare HTML-to-text backends on Outlook-shaped mail")
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [outlook_html_body(rng, quoted_replies=rng.randint(0, 6)) for _ in range(args.emails)]
+    total_mb = sum(len(body) for body in corpus) / 1e6
+    print(f"corpus: {args.emails} emails, {total_mb:.1f} MB of HTML")
+
+    for name, backend in (("soup", soup_to_text), ("lxml", lxml_to_text)):
+        rules = PreprocessRules(html_backend=backend)
+        started = time.perf_counter()
+        for body in corpus:
+            preprocess_email_body(body, rules)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>5}: {elapsed * 1000 / args.emails:8.2f} ms/email  {total_mb / elapsed:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
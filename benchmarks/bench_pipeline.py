@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import replace
+from pathlib import Path
+from typing import Any
+
+from corpus import synthetic_mailbox
+from fake_ollama import FakeOllamaServer, fake_chat_response
+
+from email2qa.config import AppConfig, RunOptions
+from email2qa.llm_client import LlmResult
+from email2qa.output import JsonlWriter
+from email2qa.pipeline import run_pipeline
+from email2qa.preprocess import preprocess_email_body
+from email2qa.prompts import build_user_prompt
+from email2qa.quality import evaluate_candidate, new_quality_state
+from email2qa.sources import SnapshotWriter
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _timed(count: int, run: Callable[[], object], repeat: int) -> dict[str, float]:
+    # Best of several runs; stage timings are short enough for scheduler noise to matter.
+    elapsed = float("inf")
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        run()
+        elapsed = min(elapsed, time.perf_counter() - started)
+    return {
+        "seconds": round(elapsed, 4),
+        "emails_per_second": round(count / elapsed, 1) if elapsed else 0.0,
+        "ms_per_email": round(elapsed * 1000 / count, 4) if count else 0.0,
+    }
+
+
+def bench_stages(emails: list, work_dir: Path, repeat: int) -> dict[str, dict[str, float]]:
+    cleaned = [preprocess_email_body(email.body) for email in emails]
+    usable = [(email, pre.cleaned_text) for email, pre in zip(emails, cleaned) if pre.has_enough_content]
+    prompts = [build_user_prompt(email, text) for email, text in usable]
+    candidates = [
+        LlmResult(**json.loads(fake_chat_response({"messages": [{"content": prompt}]})["message"]["content"]))
+        for prompt in prompts
+    ]
+
+    def evaluate() -> list:
+        state = new_quality_state()
+        return [
+            evaluate_candidate(message=email, candidate=candidate, min_confidence=0.65, state=state)
+            for (email, _), candidate in zip(usable, candidates)
+        ]
+
+    records = [record for qa, reject in evaluate() for record in (qa, reject) if record is not None]
+
+    def write() -> None:
+        with JsonlWriter(work_dir / "stage_output.jsonl") as writer:
+            for record in records:
+                writer.write(record)
+
+    return {
+        "preprocess": _timed(
+            len(emails), lambda: [preprocess_email_body(email.body) for email in emails], repeat
+        ),
+        "prompt": _timed(len(usable), lambda: [build_user_prompt(email, text) for email, text in usable], repeat),
+        "quality": _timed(len(usable), evaluate, repeat),
+        "output": _timed(len(records), write, repeat),
+    }
+
+
+def bench_end_to_end(emails: list, work_dir: Path, *, latency: float, options: RunOptions) -> dict[str, Any]:
+    # The mailbox is replayed from a snapshot, so the run exercises the real source path.
+    snapshot = work_dir / "mailbox.snap"
+    with SnapshotWriter(snapshot) as writer:
+        for email in emails:
+            writer.write(email)
+    with FakeOllamaServer(latency_seconds=latency) as server:
+        config = AppConfig(
+            exchange_server="",
+            exchange_email="",
+            exchange_username="",
+            exchange_password="",
+            ollama_base_url=server.base_url,
+            ollama_model="bench-model",
+            output_dir=str(work_dir / "run"),
+            min_confidence=0.65,
+        )
+        started = time.perf_counter()
+        run_dir = run_pipeline(config, replace(options, source=f"snapshot:{snapshot}"))
+        elapsed = time.perf_counter() - started
+        requests = server.requests
+
+    manifest = json.loads((Path(run_dir) / "manifest.json").read_text(encoding="utf-8"))
+    return {
+        "seconds": round(elapsed, 4),
+        "emails_per_second": round(len(emails) / elapsed, 1),
+        "llm_requests": requests,
+        "accepted": manifest["accepted_count"],
+        "rejected": manifest["rejected_count"],
+        "stage_timings": manifest["stage_timings"],
+    }
+
+
+def _compare(current: dict[str, Any], baseline: dict[str, Any]) -> None:
+    print(f"\ncompared with {baseline.get('commit', '?')} (emails/s, higher is better):")
+    sections = {**current["stages"], "end_to_end": current["end_to_end"]}
+    previous = {**baseline.get("stages", {}), "end_to_end": baseline.get("end_to_end", {})}
+    for name, result in sections.items():
+        before = previous.get(name, {}).get("emails_per_second")
+        if not before:
+            continue
+        change = (result["emails_per_second"] / before - 1) * 100
+        print(f"  {name:>11}: {before:10.1f} -> {result['emails_per_second']:10.1f}  ({change:+.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure per-stage and end-to-end pipeline throughput")
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake Ollama latency per request")
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--batch-token-budget", type=int, default=None)
+    parser.add_argument("--stream-llm", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5, help="Best-of runs for each stage timing")
+    parser.add_argument("--output", type=Path, default=None, help="Write results as JSON to this path")
+    parser.add_argument("--compare", type=Path, default=None, help="Results JSON from an earlier commit")
+    args = parser.parse_args()
+
+    emails = synthetic_mailbox(args.emails, seed=args.seed)
+    options = RunOptions(
+        resume=False,
+        llm_cache=False,
+        metrics=True,
+        llm_concurrency=args.llm_concurrency,
+        batch_token_budget=args.batch_token_budget,
+        stream_llm=args.stream_llm,
+    )
+    with tempfile.TemporaryDirectory(prefix="email2qa-bench-") as tmp:
+        work_dir = Path(tmp)
+        results = {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "emails": args.emails,
+            "seed": args.seed,
+            "latency_ms": args.latency_ms,
+            "llm_concurrency": args.llm_concurrency,
+            "batch_token_budget": args.batch_token_budget,
+            "stages": bench_stages(emails, work_dir, args.repeat),
+            "end_to_end": bench_end_to_end(
+                emails, work_dir, latency=args.latency_ms / 1000, options=options
+            ),
+        }
+
+    print(f"commit {results['commit']}, {args.emails} emails (seed {args.seed})")
+    for name, result in {**results["stages"], "end_to_end": results["end_to_end"]}.items():
+        print(f"  {name:>11}: {result['emails_per_second']:10.1f} emails/s  {result['seconds']:8.3f} s")
+    end_to_end = results["end_to_end"]
+    print(
+        f"  accepted={end_to_end['accepted']} rejected={end_to_end['rejected']} "
+        f"llm_requests={end_to_end['llm_requests']}"
+    )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    if args.compare:
+        _compare(results, json.loads(args.compare.read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
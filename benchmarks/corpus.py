@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+
+from email2qa.exchange_client import SourceEmail
+
+_SENTENCES = [
+    "Please restart the sync service and clear the local cache before retrying the upload.",
+    "The license key has been reissued and should activate after you sign out and back in.",
+    "We have increased the mailbox quota; the change can take up to an hour to apply.",
+    "Open Settings, choose Security, and enable two-factor authentication for the account.",
+    "The export job failed because the target folder was read-only; it now has write access.",
+    "Your invoice was generated on the first business day and is available in the portal.",
+]
+
+_OUTLOOK_HEAD = """<html xmlns:v="urn:schemas-microsoft-com:vml" xmlns:o="urn:schemas-microsoft-com:office:office">
+<head><meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+<style><!--
+@font-face {{font-family:"Cambria Math"; panose-1:2 4 5 3 5 4 6 3 2 4;}}
+p.MsoNormal, li.MsoNormal, div.MsoNormal {{margin:0cm; font-size:11.0pt; font-family:"Calibri",sans-serif;}}
+{styles}
+--></style><!--[if gte mso 9]><xml><o:shapedefaults v:ext="edit" spidmax="1026" /></xml><![endif]-->
+</head><body lang="EN-GB" link="#0563C1" vlink="#954F72"><div class="WordSection1">"""
+
+
+def _outlook_paragraph(text: str) -> str:
+    words = text.split(" ")
+    spans = "".join(f'<span style="font-size:11.0pt;color:#1F497D">{word} </span>' for word in words)
+    return f'<p class="MsoNormal">{spans}<o:p></o:p></p>\n'
+
+
+def outlook_html_body(rng: random.Random, paragraphs: int = 6, quoted_replies: int = 3) -> str:
+    styles = "\n".join(f"span.EmailStyle{idx} {{mso-style-type:personal-reply; color:#1F497D;}}" for idx in range(40))
+    parts = [_OUTLOOK_HEAD.format(styles=styles), _outlook_paragraph("Hello,")]
+    parts.extend(_outlook_paragraph(rng.choice(_SENTENCES)) for _ in range(paragraphs))
+    parts.append(_outlook_paragraph("Kind regards,"))
+    parts.append('<v:shape id="logo" style="width:90pt;height:30pt"><v:imagedata src="cid:image001.png" /></v:shape>')
+    for reply in range(quoted_replies):
+        parts.append(
+            '<div style="border:none;border-top:solid #E1E1E1 1.0pt;padding:3.0pt 0cm 0cm 0cm">'
+            f'<p class="MsoNormal"><b>From:</b> customer{reply}@example.com<br><b>Sent:</b> Monday</p></div>'
+        )
+        parts.extend(_outlook_paragraph(rng.choice(_SENTENCES)) for _ in range(paragraphs * 2))
+    parts.append("</div></body></html>")
+    return "".join(parts)
+
+
+_TOPICS = ["sync service", "license key", "mailbox quota", "two-factor login", "export job", "invoice"]
+
+_ACKNOWLEDGEMENTS = [
+    "Thanks, got it.",
+    "Thank you, will do.",
+    "See attached.",
+    "Can we move our call to tomorrow at 3pm? I sent a new calendar invite.",
+]
+
+_SIGNATURE = "\n-- \nAlex Support\nTier 2 Support | Example Corp\n+1 555 0100"
+
+_DISCLAIMER = (
+    "\n\nThis email and any attachments are confidential and intended solely for the addressee. "
+    "If you have received this email in error please notify the sender immediately."
+)
+
+
+def _quoted_chain(rng: random.Random, depth: int) -> str:
+    parts = []
+    for reply in range(depth):
+        sentences = " ".join(rng.choice(_SENTENCES) for _ in range(rng.randint(2, 6)))
+        if reply % 2:
+            parts.append(f"\n\nOn Mon, 2 Feb 2026, customer{reply}@example.com wrote:\n> {sentences}")
+        else:
+            parts.append(
+                f"\n\n-----Original Message-----\nFrom: customer{reply}@example.com\n"
+                f"Sent: Monday\nSubject: help\n\n{sentences}"
+            )
+    return "".join(parts)
+
+
+def plain_body(rng: random.Random) -> str:
+    answer = " ".join(rng.choice(_SENTENCES) for _ in range(rng.randint(2, 8)))
+    body = f"Hi,\n\n{answer}\n\nKind regards,{_SIGNATURE}"
+    if rng.random() < 0.5:
+        body += _DISCLAIMER
+    return body + _quoted_chain(rng, rng.randint(0, 4))
+
+
+def synthetic_mailbox(
+    count: int,
+    *,
+    seed: int = 7,
+    html_ratio: float = 0.4,
+    acknowledgement_ratio: float = 0.15,
+    duplicate_ratio: float = 0.1,
+    thread_size: int = 3,
+) -> list[SourceEmail]:
+    # Deterministic for a given seed so runs on different commits see the same mailbox.
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    emails: list[SourceEmail] = []
+    for index in range(count):
+        roll = rng.random()
+        if emails and roll < duplicate_ratio:
+            body = rng.choice(emails).body
+        elif roll < duplicate_ratio + acknowledgement_ratio:
+            body = rng.choice(_ACKNOWLEDGEMENTS)
+        elif rng.random() < html_ratio:
+            body = outlook_html_body(rng, paragraphs=rng.randint(2, 6), quoted_replies=rng.randint(0, 4))
+        else:
+            body = plain_body(rng)
+        thread = index // max(1, thread_size)
+        emails.append(
+            SourceEmail(
+                message_id=f"<bench-{index:06d}@example.com>",
+                thread_id=f"thread-{thread:06d}",
+                subject=f"Re: {_TOPICS[thread % len(_TOPICS)]} ticket {thread}",
+                body=body,
+                sent_at=start + timedelta(minutes=index),
+                sender="support@example.com",
+                recipients=[f"customer{rng.randint(0, 999)}@example.com"],
+            )
+        )
+    return emails
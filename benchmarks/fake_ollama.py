@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Self
+
+_MESSAGE_ID = re.compile(r"^MessageId: (.+)$", re.MULTILINE)
+_SUBJECT = re.compile(r"^Subject: (.+)$", re.MULTILINE)
+_EMAIL_BLOCK = re.compile(r"^=== Email \d+ ===$", re.MULTILINE)
+
+
+def _extract(block: str) -> dict[str, Any]:
+    # Deterministic answer derived from the prompt: the first sentence of the body becomes the
+    # answer, so duplicate bodies produce duplicate pairs and short acknowledgements score 0.
+    subject = _SUBJECT.search(block)
+    body = block.split("EmailBody:", 1)[-1].split("JSON schema:", 1)[0].strip()
+    words = body.split()
+    if len(words) < 12:
+        return {"question": "", "answer": "", "confidence": 0.0, "extraction_notes": "no answer"}
+    first_sentence = body.split(". ", 1)[0].strip()
+    return {
+        "question": f"How do I resolve {subject.group(1) if subject else 'this issue'}?",
+        "answer": first_sentence,
+        "confidence": 0.9,
+        "extraction_notes": "",
+    }
+
+
+def fake_chat_response(payload: dict[str, Any]) -> dict[str, Any]:
+    prompt = payload["messages"][-1]["content"]
+    if _EMAIL_BLOCK.search(prompt):
+        results = []
+        for block in _EMAIL_BLOCK.split(prompt)[1:]:
+            message_id = _MESSAGE_ID.search(block)
+            results.append({"message_id": message_id.group(1) if message_id else "", **_extract(block)})
+        content = {"results": results}
+    else:
+        content = _extract(prompt)
+    return {
+        "model": payload.get("model", ""),
+        "message": {"role": "assistant", "content": json.dumps(content)},
+        "done": True,
+    }
+
+
+def _stream_body(response: dict[str, Any]) -> str:
+    # Newline-delimited chunks of a few characters each, like Ollama's streamed /api/chat.
+    content = response["message"]["content"]
+    chunks = [
+        json.dumps({"message": {"role": "assistant", "content": content[start : start + 4]}, "done": False})
+        for start in range(0, len(content), 4)
+    ]
+    chunks.append(json.dumps({"message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop"}))
+    return "\n".join(chunks) + "\n"
+
+
+# Stand-in for Ollama's /api/chat with a fixed per-request latency.
+class FakeOllamaServer:
+    def __init__(self, *, latency_seconds: float = 0.0, host: str = "127.0.0.1", port: int = 0) -> None:
+        latency = latency_seconds
+        stats = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", "0"))
+                payload = json.loads(self.rfile.read(length))
+                if self.path != "/api/chat":
+                    self.send_error(404)
+                    return
+                if latency:
+                    time.sleep(latency)
+                response = fake_chat_response(payload)
+                if payload.get("stream"):
+                    body = _stream_body(response).encode("utf-8")
+                else:
+                    body = json.dumps(response).encode("utf-8")
+                with stats._lock:
+                    stats.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama /api/chat endpoint")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(latency_seconds=args.latency_ms / 1000, port=args.port)
+    print(f"Fake Ollama listening on {server.base_url} (latency={args.latency_ms:.0f} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
 import json
+import os
+import sqlite3
+import tempfile
+import threading
+from collections import Counter, deque
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -35,9 +40,23 @@ def load_checkpoint(path: Path) -> Checkpoint | None:
 
 
 def write_checkpoint(path: Path, checkpoint: Checkpoint) -> None:
+    _write_json_atomic(path, checkpoint.model_dump(mode="json"))
+
+
+def _write_json_atomic(path: Path, data: dict) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as handle:
-        json.dump(checkpoint.model_dump(mode="json"), handle, indent=2)
+    # Write to a sibling temp file and rename over the target so a crash mid-write leaves
+    # either the previous file or the new one, never a truncated file.
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, indent=2)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
 
 
 def reset_checkpoint(path: Path) -> bool:
@@ -45,3 +64,111 @@ def reset_checkpoint(path: Path) -> bool:
         return False
     path.unlink()
     return True
+
+
+class SyncState(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    folder: str
+    sync_state: str
+    updated_at: datetime
+
+
+def sync_state_path(base_dir: str) -> Path:
+    return Path(base_dir).resolve() / "sync_state.json"
+
+
+def load_sync_state(path: Path) -> SyncState | None:
+    if not path.exists():
+        return None
+
+    with path.open("r", encoding="utf-8") as handle:
+        data = json.load(handle)
+    return SyncState.model_validate(data)
+
+
+def write_sync_state(path: Path, state: SyncState) -> None:
+    _write_json_atomic(path, state.model_dump(mode="json"))
+
+
+def reset_sync_state(path: Path) -> bool:
+    if not path.exists():
+        return False
+    path.unlink()
+    return True
+
+
+def processed_index_path(base_dir: str) -> Path:
+    return Path(base_dir).resolve() / "processed.sqlite3"
+
+
+class CheckpointTracker:
+    # Tracks messages in fetch order. The watermark only advances over a prefix in which
+    # every message has been committed, however out of order the commits arrive. Messages may
+    # be registered by one stage while another marks them done.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._order: deque[tuple[datetime, str]] = deque()
+        self._done: Counter[tuple[datetime, str]] = Counter()
+        self._watermark: tuple[datetime, str] | None = None
+
+    def register(self, key: tuple[datetime, str]) -> None:
+        with self._lock:
+            self._order.append(key)
+
+    def mark_done(self, key: tuple[datetime, str]) -> None:
+        with self._lock:
+            self._done[key] += 1
+            while self._order and self._done[self._order[0]] > 0:
+                head = self._order.popleft()
+                self._done[head] -= 1
+                if self._done[head] == 0:
+                    del self._done[head]
+                if self._watermark is None or head > self._watermark:
+                    self._watermark = head
+
+    @property
+    def watermark(self) -> tuple[datetime, str] | None:
+        return self._watermark
+
+    @property
+    def pending(self) -> int:
+        return len(self._order)
+
+
+class ProcessedIndex:
+    # Message ids already written by earlier runs. Complements the checkpoint, which only
+    # remembers the newest (sent_at, message_id) and cannot describe gaps below it.
+    # Additions become durable on commit(), which callers issue after flushing output.
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS processed (message_id TEXT PRIMARY KEY)")
+
+    def __contains__(self, message_id: object) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM processed WHERE message_id = ?", (str(message_id),)
+            ).fetchone()
+        return row is not None
+
+    def add(self, message_id: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO processed (message_id) VALUES (?)", (message_id,))
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+def reset_processed_index(path: Path) -> bool:
+    if not path.exists():
+        return False
+    path.unlink()
+    return True
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import os
 from dataclasses import dataclass
 from datetime import datetime
@@ -19,6 +20,26 @@ class AppConfig:
     ollama_model: str
     output_dir: str
     min_confidence: float
+    exchange_page_size: int = 100
+    exchange_max_connections: int = 4
+    exchange_folder: str = "sent"
+    ollama_keep_alive: str = "30m"
+    ollama_timeout_seconds: float = 60.0
+    llm_cache_max_entries: int | None = None
+    llm_cache_max_age_days: float | None = None
+    output_durability: str = "flush"
+    output_compression: str = "none"
+    output_shard_bytes: int | None = None
+    output_flush_bytes: int = 1 << 20
+    output_flush_seconds: float = 5.0
+    checkpoint_every: int = 100
+    checkpoint_seconds: float = 60.0
+    extra_quote_patterns: tuple[str, ...] = ()
+    extra_signature_patterns: tuple[str, ...] = ()
+    extra_disclaimer_markers: tuple[str, ...] = ()
+    html_backend: str = "auto"
+    prompt_token_budget: int | None = None
+    prompt_max_recipients: int | None = None
 
 
 @dataclass(frozen=True)
@@ -29,6 +50,31 @@ class RunOptions:
     dry_run: bool = False
     resume: bool = True
     verbose: bool = False
+    llm_concurrency: int = 1
+    preprocess_workers: int = 0
+    stage_queue_size: int | None = None
+    llm_cache: bool = False
+    persistent_dedupe: bool = False
+    near_duplicate_threshold: float | None = None
+    relevance_threshold: float | None = None
+    relevance_shadow: bool = False
+    group_threads: bool = False
+    thread_window_hours: float = 168.0
+    thread_max_tokens: int = 8000
+    batch_token_budget: int | None = None
+    batch_max_emails: int = 8
+    source: str = "exchange"
+    record_snapshot: str | None = None
+    incremental_sync: bool = False
+    fetch_shards: int = 1
+    sources_file: str | None = None
+    metrics: bool = False
+    metrics_textfile: str | None = None
+    num_predict: int | None = None
+    num_ctx: int | None = None
+    temperature: float | None = None
+    json_schema_format: bool = False
+    stream_llm: bool = False
 
 
 def _required(name: str) -> str:
@@ -38,17 +84,63 @@ def _required(name: str) -> str:
     return value
 
 
-def load_config() -> AppConfig:
-    email = _required("EMAIL2QA_EXCHANGE_EMAIL")
+def _optional_str(name: str) -> str:
+    return os.getenv(name, "").strip()
+
+
+def _optional_int(name: str) -> int | None:
+    value = os.getenv(name, "").strip()
+    return int(value) if value else None
+
+
+def _optional_float(name: str) -> float | None:
+    value = os.getenv(name, "").strip()
+    return float(value) if value else None
+
+
+def _string_list(name: str) -> tuple[str, ...]:
+    value = os.getenv(name, "").strip()
+    if not value:
+        return ()
+    parsed = json.loads(value)
+    if not isinstance(parsed, list) or not all(isinstance(item, str) for item in parsed):
+        raise ValueError(f"{name} must be a JSON list of strings")
+    return tuple(parsed)
+
+
+def load_config(*, require_exchange: bool = True) -> AppConfig:
+    # Offline sources (snapshots) do not need Exchange credentials.
+    exchange = _required if require_exchange else _optional_str
+    email = exchange("EMAIL2QA_EXCHANGE_EMAIL")
     return AppConfig(
-        exchange_server=_required("EMAIL2QA_EXCHANGE_SERVER"),
+        exchange_server=exchange("EMAIL2QA_EXCHANGE_SERVER"),
         exchange_email=email,
         exchange_username=os.getenv("EMAIL2QA_EXCHANGE_USERNAME", email).strip() or email,
-        exchange_password=_required("EMAIL2QA_EXCHANGE_PASSWORD"),
+        exchange_password=exchange("EMAIL2QA_EXCHANGE_PASSWORD"),
         ollama_base_url=os.getenv("EMAIL2QA_OLLAMA_BASE_URL", "http://localhost:11434").rstrip("/"),
         ollama_model=os.getenv("EMAIL2QA_OLLAMA_MODEL", "gemma3:4b").strip(),
         output_dir=os.getenv("EMAIL2QA_OUTPUT_DIR", "./output").strip(),
         min_confidence=float(os.getenv("EMAIL2QA_MIN_CONFIDENCE", "0.65")),
+        exchange_page_size=int(os.getenv("EMAIL2QA_EXCHANGE_PAGE_SIZE", "100")),
+        exchange_max_connections=int(os.getenv("EMAIL2QA_EXCHANGE_MAX_CONNECTIONS", "4")),
+        exchange_folder=os.getenv("EMAIL2QA_EXCHANGE_FOLDER", "sent").strip() or "sent",
+        ollama_keep_alive=os.getenv("EMAIL2QA_OLLAMA_KEEP_ALIVE", "30m").strip(),
+        ollama_timeout_seconds=float(os.getenv("EMAIL2QA_OLLAMA_TIMEOUT_SECONDS", "60")),
+        llm_cache_max_entries=_optional_int("EMAIL2QA_LLM_CACHE_MAX_ENTRIES"),
+        llm_cache_max_age_days=_optional_float("EMAIL2QA_LLM_CACHE_MAX_AGE_DAYS"),
+        output_durability=os.getenv("EMAIL2QA_OUTPUT_DURABILITY", "flush").strip().lower(),
+        output_compression=os.getenv("EMAIL2QA_OUTPUT_COMPRESSION", "none").strip().lower() or "none",
+        output_shard_bytes=_optional_int("EMAIL2QA_OUTPUT_SHARD_BYTES"),
+        output_flush_bytes=int(os.getenv("EMAIL2QA_OUTPUT_FLUSH_BYTES", str(1 << 20))),
+        output_flush_seconds=float(os.getenv("EMAIL2QA_OUTPUT_FLUSH_SECONDS", "5")),
+        checkpoint_every=int(os.getenv("EMAIL2QA_CHECKPOINT_EVERY", "100")),
+        checkpoint_seconds=float(os.getenv("EMAIL2QA_CHECKPOINT_SECONDS", "60")),
+        extra_quote_patterns=_string_list("EMAIL2QA_EXTRA_QUOTE_PATTERNS"),
+        extra_signature_patterns=_string_list("EMAIL2QA_EXTRA_SIGNATURE_PATTERNS"),
+        extra_disclaimer_markers=_string_list("EMAIL2QA_EXTRA_DISCLAIMER_MARKERS"),
+        html_backend=os.getenv("EMAIL2QA_HTML_BACKEND", "auto").strip().lower(),
+        prompt_token_budget=_optional_int("EMAIL2QA_PROMPT_TOKEN_BUDGET"),
+        prompt_max_recipients=_optional_int("EMAIL2QA_PROMPT_MAX_RECIPIENTS"),
     )
 
 
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+
+def dedupe_index_path(base_dir: str) -> Path:
+    return Path(base_dir).resolve() / "dedupe.sqlite3"
+
+
+def pair_digest(key: tuple[str, str]) -> bytes:
+    question, answer = key
+    return hashlib.blake2b(f"{question}\x1f{answer}".encode(), digest_size=16).digest()
+
+
+class DedupeIndex:
+    # Accepted (question, answer) keys from every run, stored as fixed-width 16-byte digests
+    # in a WITHOUT ROWID table so lookups are a single B-tree probe and nothing is loaded
+    # into memory. The database is opened on first use, possibly on a different thread from
+    # the one that closes it, so every access goes through the lock. Additions only become
+    # durable on commit(), which the pipeline calls once the matching output has been flushed.
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self._path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pairs (digest BLOB PRIMARY KEY) WITHOUT ROWID"
+            )
+        return self._conn
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, tuple):
+            return False
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT 1 FROM pairs WHERE digest = ?", (pair_digest(key),)
+            ).fetchone()
+        return row is not None
+
+    def add(self, key: tuple[str, str]) -> None:
+        with self._lock:
+            self._connection().execute("INSERT OR IGNORE INTO pairs (digest) VALUES (?)", (pair_digest(key),))
+
+    def commit(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM pairs").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
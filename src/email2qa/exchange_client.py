@@ -1,7 +1,30 @@
 from __future__ import annotations
 
+from collections.abc import Callable, Iterator
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from typing import Any
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_FOLDER = "sent"
+_WELL_KNOWN_FOLDERS = ("sent", "inbox")
+
+# Phase one only pulls what is needed to decide whether an item was already processed;
+# bodies are requested in a second, batched GetItem pass for the survivors.
+_METADATA_FIELDS = ("id", "changekey", "datetime_sent", "message_id", "conversation_id")
+# SyncFolderItems always returns item id and change key, so they are not requested explicitly.
+_SYNC_FIELDS = ("datetime_sent", "message_id", "conversation_id")
+_BODY_FIELDS = (
+    "datetime_sent",
+    "message_id",
+    "conversation_id",
+    "subject",
+    "body",
+    "sender",
+    "to_recipients",
+)
+
+SkipPredicate = Callable[[datetime, str], bool]
 
 
 @dataclass(frozen=True)
@@ -23,48 +46,204 @@ def _normalize_filter_datetime(value: datetime | None) -> datetime | None:
     return value.astimezone(timezone.utc)
 
 
-def fetch_sent_items(
+def connect_account(
     *,
     server: str,
     email: str,
     username: str,
     password: str,
-    since: datetime | None,
-    until: datetime | None,
-    limit: int | None,
-) -> list[SourceEmail]:
+    max_connections: int | None = None,
+) -> Any:
     try:
         from exchangelib import Account, Configuration, Credentials, DELEGATE
     except Exception as exc:  # pragma: no cover
         raise RuntimeError("exchangelib is required for Exchange ingestion") from exc
 
     credentials = Credentials(username=username, password=password)
-    config = Configuration(server=server, credentials=credentials)
-    account = Account(primary_smtp_address=email, config=config, autodiscover=False, access_type=DELEGATE)
+    # max_connections caps exchangelib's session pool, which threads sharing the account draw from.
+    config = Configuration(server=server, credentials=credentials, max_connections=max_connections)
+    return Account(primary_smtp_address=email, config=config, autodiscover=False, access_type=DELEGATE)
+
+
+def resolve_folder(account: Any, folder: str = DEFAULT_FOLDER) -> Any:
+    # "sent" and "inbox" are exchangelib's well-known folders; anything else is a path below
+    # the mailbox root, e.g. "Inbox/Escalations".
+    path = folder.strip().strip("/")
+    if path.lower() in _WELL_KNOWN_FOLDERS:
+        return getattr(account, path.lower())
+    target = account.msg_folder_root
+    for part in path.split("/"):
+        target = target / part
+    return target
+
+
+def _message_id(item: Any) -> str:
+    return str(item.message_id or item.id)
 
-    query = account.sent.all().order_by("-datetime_sent")
+
+def _thread_id(item: Any) -> str:
+    return str(item.conversation_id.id if item.conversation_id else item.id)
+
+
+def to_source_email(item: Any, default_sender: str) -> SourceEmail:
+    recipients = [addr.email_address for addr in (item.to_recipients or []) if addr and addr.email_address]
+    sender = item.sender.email_address if item.sender else default_sender
+    return SourceEmail(
+        message_id=_message_id(item),
+        thread_id=_thread_id(item),
+        subject=(item.subject or "(no subject)").strip(),
+        body=item.body if isinstance(item.body, str) else str(item.body),
+        sent_at=item.datetime_sent,
+        sender=sender,
+        recipients=recipients,
+    )
+
+
+def iter_sent_items(
+    account: Any,
+    *,
+    email: str,
+    since: datetime | None,
+    until: datetime | None,
+    limit: int | None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    should_skip: SkipPredicate | None = None,
+    until_exclusive: bool = False,
+    folder: str = DEFAULT_FOLDER,
+) -> Iterator[SourceEmail]:
+    # Oldest first, so the checkpoint can advance while the run is still in progress.
+    query = resolve_folder(account, folder).all().order_by("datetime_sent").only(*_METADATA_FIELDS)
     since = _normalize_filter_datetime(since)
     until = _normalize_filter_datetime(until)
     if since:
         query = query.filter(datetime_sent__gte=since)
-    if until:
+    if until and until_exclusive:
+        query = query.filter(datetime_sent__lt=until)
+    elif until:
         query = query.filter(datetime_sent__lte=until)
+    # FindItem pages and GetItem chunks are both bounded, so exchangelib streams
+    # items page by page instead of resolving the whole folder up front. They are set before
+    # slicing: a sliced QuerySet is a plain iterator that carries over the settings it had.
+    query.page_size = page_size
+    query.chunk_size = page_size
     if limit and limit > 0:
         query = query[:limit]
 
-    records: list[SourceEmail] = []
-    for item in query:
-        recipients = [addr.email_address for addr in (item.to_recipients or []) if addr and addr.email_address]
-        sender = item.sender.email_address if item.sender else email
-        records.append(
-            SourceEmail(
-                message_id=str(item.message_id or item.id),
-                thread_id=str(item.conversation_id.id if item.conversation_id else item.id),
-                subject=(item.subject or "(no subject)").strip(),
-                body=item.body if isinstance(item.body, str) else str(item.body),
-                sent_at=item.datetime_sent,
-                sender=sender,
-                recipients=recipients,
-            )
+    pending: list[Any] = []
+    for header in query:
+        if should_skip and should_skip(header.datetime_sent, _message_id(header)):
+            continue
+        pending.append(header)
+        if len(pending) >= page_size:
+            yield from _fetch_bodies(account, pending, email)
+            pending = []
+    if pending:
+        yield from _fetch_bodies(account, pending, email)
+
+
+@dataclass
+class SyncProgress:
+    # Filled in by iter_synced_items once the delta has been fully consumed. complete is False
+    # when a limit left part of the delta out, in which case the new state must not be saved.
+    sync_state: str | None = None
+    complete: bool = False
+
+
+def iter_synced_items(
+    account: Any,
+    *,
+    email: str,
+    sync_state: str | None,
+    progress: SyncProgress,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int | None = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    should_skip: SkipPredicate | None = None,
+    folder: str = DEFAULT_FOLDER,
+) -> Iterator[SourceEmail]:
+    # SyncFolderItems returns only the changes since sync_state (everything on the first sync).
+    # Only creations matter here: updates are flag/category changes and deletions leave
+    # already-extracted pairs alone. The delta is metadata only, so it is collected and
+    # sorted into sent order before bodies are fetched in batches.
+    synced_folder = resolve_folder(account, folder)
+    headers = [
+        item
+        for change_type, item in synced_folder.sync_items(
+            sync_state=sync_state,
+            only_fields=list(_SYNC_FIELDS),
+            max_changes_returned=page_size,
         )
-    return records
+        if change_type == "create" and item.datetime_sent is not None
+    ]
+    new_state = synced_folder.item_sync_state
+
+    since = _normalize_filter_datetime(since)
+    until = _normalize_filter_datetime(until)
+    # Items outside the --since/--until window are left out for good, like in a windowed query.
+    # Skip checks run before the limit, so the limit counts only items that still need work
+    # and repeated limited runs move forward through the delta.
+    headers = sorted(
+        (
+            header
+            for header in headers
+            if (since is None or header.datetime_sent >= since) and (until is None or header.datetime_sent <= until)
+        ),
+        key=lambda header: (header.datetime_sent, _message_id(header)),
+    )
+    headers = [
+        header
+        for header in headers
+        if not (should_skip and should_skip(header.datetime_sent, _message_id(header)))
+    ]
+    # The new state is only usable if every remaining creation was offered, so a limit that
+    # cuts the delta short leaves it to be synced again.
+    truncated = bool(limit and limit > 0 and len(headers) > limit)
+    if truncated:
+        headers = headers[:limit]
+
+    pending: list[Any] = []
+    for header in headers:
+        pending.append(header)
+        if len(pending) >= page_size:
+            yield from _fetch_bodies(account, pending, email)
+            pending = []
+    if pending:
+        yield from _fetch_bodies(account, pending, email)
+    progress.sync_state = new_state
+    progress.complete = not truncated
+
+
+def _fetch_bodies(account: Any, headers: list[Any], email: str) -> Iterator[SourceEmail]:
+    ids = [(header.id, header.changekey) for header in headers]
+    for item in account.fetch(ids=ids, only_fields=list(_BODY_FIELDS), chunk_size=len(ids)):
+        # GetItem reports per-item failures (e.g. deleted since phase one) as exceptions.
+        if isinstance(item, Exception):
+            continue
+        yield to_source_email(item, email)
+
+
+def fetch_sent_items(
+    *,
+    server: str,
+    email: str,
+    username: str,
+    password: str,
+    since: datetime | None,
+    until: datetime | None,
+    limit: int | None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    should_skip: SkipPredicate | None = None,
+    folder: str = DEFAULT_FOLDER,
+) -> Iterator[SourceEmail]:
+    account = connect_account(server=server, email=email, username=username, password=password)
+    yield from iter_sent_items(
+        account,
+        email=email,
+        since=since,
+        until=until,
+        limit=limit,
+        page_size=page_size,
+        should_skip=should_skip,
+        folder=folder,
+    )
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import types
+import typing
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from email2qa.output import iter_run_records
+from email2qa.schema import QaRecord, RejectedRecord
+
+EXPORT_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+EXPORT_KINDS: dict[str, type[BaseModel]] = {"accepted": QaRecord, "rejected": RejectedRecord}
+DEFAULT_ROW_GROUP_SIZE = 65536
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError(
+            "pyarrow is required to export runs to Parquet or Arrow (pip install email2qa[parquet])"
+        ) from None
+    return pyarrow
+
+
+def _arrow_type(pa: Any, annotation: Any) -> Any:
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        (inner,) = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _arrow_type(pa, inner)
+    if typing.get_origin(annotation) is list:
+        return pa.list_(_arrow_type(pa, typing.get_args(annotation)[0]))
+    types_by_annotation = {
+        str: pa.string(),
+        float: pa.float64(),
+        int: pa.int64(),
+        bool: pa.bool_(),
+        datetime: pa.timestamp("us", tz="UTC"),
+    }
+    return types_by_annotation[annotation]
+
+
+def arrow_schema(model: type[BaseModel]) -> Any:
+    # Columns follow the record model, so readers can select question/answer/confidence
+    # without touching the rest.
+    pa = _pyarrow()
+    return pa.schema([(name, _arrow_type(pa, field.annotation)) for name, field in model.model_fields.items()])
+
+
+def _row_groups(records: Iterable[dict[str, Any]], model: type[BaseModel], size: int) -> Iterator[dict[str, list]]:
+    datetimes = [name for name, field in model.model_fields.items() if field.annotation is datetime]
+    records = iter(records)
+    while rows := list(islice(records, size)):
+        columns: dict[str, list] = {name: [row.get(name) for row in rows] for name in model.model_fields}
+        for name in datetimes:
+            columns[name] = [datetime.fromisoformat(value) if value else None for value in columns[name]]
+        yield columns
+
+
+def export_run(
+    run_dir: str | Path,
+    *,
+    kind: str = "accepted",
+    fmt: str = "parquet",
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    output: str | Path | None = None,
+) -> tuple[Path, int]:
+    # Records are streamed from the run's (possibly compressed, sharded) JSONL output one row
+    # group at a time, so memory use is bounded by the row group size, not the run size.
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"Unknown record kind: {kind}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    pa = _pyarrow()
+    model = EXPORT_KINDS[kind]
+    schema = arrow_schema(model)
+    run_dir = Path(run_dir)
+    target = Path(output) if output is not None else run_dir / f"{kind}{EXPORT_FORMATS[fmt]}"
+    temp = target.with_name(f".{target.name}.tmp")
+    rows = 0
+    try:
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            writer = pq.ParquetWriter(temp, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_file(str(temp), schema)
+        try:
+            for columns in _row_groups(iter_run_records(run_dir, kind), model, max(1, row_group_size)):
+                table = pa.Table.from_pydict(columns, schema=schema)
+                if fmt == "parquet":
+                    writer.write_table(table, row_group_size=table.num_rows)
+                else:
+                    writer.write_table(table)
+                rows += table.num_rows
+        finally:
+            writer.close()
+        os.replace(temp, target)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+    return target, rows
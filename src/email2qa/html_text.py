@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Callable
+
+from bs4 import BeautifulSoup
+
+HtmlBackend = Callable[[str], str]
+
+# Where Outlook/OWA (and Gmail) start the quoted previous message. Everything after it is
+# discarded by quote stripping anyway, so it is cut from the raw HTML before parsing.
+_REPLY_BOUNDARY = re.compile(
+    r"<div[^>]*\bid=[\"']?(?:divRplyFwdMsg|appendonsend)"
+    r"|<div[^>]*\bclass=[\"']?gmail_quote"
+    r"|<div[^>]*border-top:\s*solid\s+#E1E1E1"
+    r"|<hr[^>]*\bid=[\"']?stopSpelling"
+    r"|<blockquote\b",
+    re.IGNORECASE,
+)
+
+_SKIP_TAGS = frozenset({"head", "style", "script", "title", "template", "xml", "noscript"})
+_BLOCK_TAGS = frozenset(
+    {
+        "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "footer",
+        "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "ol", "p", "pre", "section",
+        "table", "tbody", "td", "th", "thead", "tr", "ul",
+    }
+)
+
+
+def truncate_at_reply_boundary(raw_body: str) -> str:
+    match = _REPLY_BOUNDARY.search(raw_body)
+    return raw_body[: match.start()] if match else raw_body
+
+
+def soup_to_text(raw_body: str) -> str:
+    soup = BeautifulSoup(raw_body, "html.parser")
+    return soup.get_text("\n")
+
+
+def lxml_to_text(raw_body: str) -> str:
+    from lxml import etree
+    from lxml import html as lxml_html
+
+    raw_body = truncate_at_reply_boundary(raw_body)
+    if not raw_body.strip():
+        return ""
+    try:
+        root = lxml_html.document_fromstring(raw_body)
+    except (etree.ParserError, ValueError):
+        return soup_to_text(raw_body)
+
+    # Iterative walk: text of block elements lands on its own lines, inline runs stay joined.
+    # Comments (Outlook conditional <xml> blocks), <head>/<style> and VML/Office-namespaced
+    # elements such as <v:shape> or <o:p> are skipped with their whole subtree.
+    parts: list[str] = []
+    stack: list[tuple[etree._Element, bool]] = [(root, False)]
+    while stack:
+        element, closing = stack.pop()
+        tag = element.tag
+        if closing:
+            if tag in _BLOCK_TAGS:
+                parts.append("\n")
+            if element.tail:
+                parts.append(element.tail)
+            continue
+        if not isinstance(tag, str) or tag in _SKIP_TAGS or ":" in tag:
+            if element.tail:
+                parts.append(element.tail)
+            continue
+        if tag in _BLOCK_TAGS or tag == "br":
+            parts.append("\n")
+        if element.text:
+            parts.append(element.text)
+        stack.append((element, True))
+        stack.extend((child, False) for child in reversed(element))
+    return "".join(parts)
+
+
+def _lxml_available() -> bool:
+    try:
+        import lxml.html  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_html_backend(name: str = "auto") -> HtmlBackend:
+    if name == "soup":
+        return soup_to_text
+    if name == "lxml":
+        if not _lxml_available():
+            raise RuntimeError("lxml is required for the lxml HTML backend")
+        return lxml_to_text
+    if name == "auto":
+        return lxml_to_text if _lxml_available() else soup_to_text
+    raise ValueError(f"Unknown HTML backend: {name}")
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from email2qa.llm_client import LlmExtractor, LlmResult
+from email2qa.prompts import BATCH_SYSTEM_PROMPT, SYSTEM_PROMPT
+
+
+def llm_cache_path(base_dir: str) -> Path:
+    return Path(base_dir).resolve() / "llm_cache.sqlite3"
+
+
+def cache_key(model: str, prompt: str, system_prompt: str = SYSTEM_PROMPT) -> str:
+    digest = hashlib.sha256()
+    for part in (model, system_prompt, prompt):
+        encoded = part.encode("utf-8")
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") never collide.
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class LlmCache:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_entries: int | None = None,
+        max_age_days: float | None = None,
+    ) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets another run read the cache while this one writes to it.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._max_entries = max_entries
+        self._max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.evict()
+
+    def _get_raw(self, key: str) -> object | None:
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            # Committed right away so a hit never leaves a write lock held for other processes.
+            self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def _put_raw(self, key: str, value: object) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, result, created_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> LlmResult | None:
+        raw = self._get_raw(key)
+        return LlmResult(**raw) if isinstance(raw, dict) else None
+
+    def put(self, key: str, result: LlmResult) -> None:
+        self._put_raw(key, asdict(result))
+
+    def get_batch(self, key: str) -> dict[str, LlmResult] | None:
+        raw = self._get_raw(key)
+        if not isinstance(raw, dict):
+            return None
+        return {message_id: LlmResult(**value) for message_id, value in raw.items()}
+
+    def put_batch(self, key: str, results: dict[str, LlmResult]) -> None:
+        self._put_raw(key, {message_id: asdict(result) for message_id, result in results.items()})
+
+    def evict(self) -> int:
+        removed = 0
+        with self._lock:
+            if self._max_age_days is not None:
+                cutoff = time.time() - self._max_age_days * 86400
+                removed += self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,)).rowcount
+            if self._max_entries is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (max(0, self._max_entries),),
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        self.evict()
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class CachedLlmClient:
+    # Drop-in wrapper for OllamaClient: identical (model, system prompt, user prompt)
+    # triples are answered from the on-disk cache instead of calling the model.
+    def __init__(self, client: LlmExtractor, cache: LlmCache, *, variant: str = "") -> None:
+        self._client = client
+        self._cache = cache
+        # Generation settings that change the output (token cap, temperature, ...) get their
+        # own key space; the default profile keeps the plain model name.
+        self._key_model = f"{client.model}#{variant}" if variant else client.model
+
+    @property
+    def model(self) -> str:
+        return self._client.model
+
+    def extract_qa(self, prompt: str) -> LlmResult:
+        key = cache_key(self._key_model, prompt)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        result = self._client.extract_qa(prompt)
+        self._cache.put(key, result)
+        return result
+
+    def extract_qa_batch(self, prompt: str, message_ids: list[str]) -> dict[str, LlmResult]:
+        key = cache_key(self._key_model, prompt, system_prompt=BATCH_SYSTEM_PROMPT)
+        cached = self._cache.get_batch(key)
+        if cached is not None and set(cached) == set(message_ids):
+            return cached
+        results = self._client.extract_qa_batch(prompt, message_ids)
+        # Only complete batches are cached; partial ones are retried per message by the caller.
+        if set(results) == set(message_ids):
+            self._cache.put_batch(key, results)
+        return results
+
+    def close(self) -> None:
+        self._client.close()
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import time
+from collections.abc import Iterator
 from dataclasses import dataclass
+from typing import Any, Protocol, Self
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from email2qa.prompts import SYSTEM_PROMPT
+from email2qa.prompts import BATCH_SYSTEM_PROMPT, SYSTEM_PROMPT
+
+DEFAULT_KEEP_ALIVE = "30m"
 
 
 @dataclass(frozen=True)
@@ -16,41 +23,313 @@ class LlmResult:
     extraction_notes: str
 
 
+class MalformedBatchResponse(ValueError):
+    pass
+
+
+# Failures of a single extraction that should reject the email rather than end the run; the
+# pipeline records `reason` on the rejected record.
+class LlmError(RuntimeError):
+    reason = "llm_error"
+
+
+class LlmTimeout(LlmError):
+    reason = "llm_timeout"
+
+
+class TruncatedOutput(LlmError):
+    reason = "llm_truncated_output"
+
+
+class InvalidOutput(LlmError):
+    reason = "llm_invalid_output"
+
+
+_QA_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "question": {"type": "string"},
+        "answer": {"type": "string"},
+        "confidence": {"type": "number"},
+        "extraction_notes": {"type": "string"},
+    },
+    "required": ["question", "answer", "confidence", "extraction_notes"],
+}
+
+_BATCH_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                **_QA_SCHEMA,
+                "properties": {"message_id": {"type": "string"}, **_QA_SCHEMA["properties"]},
+                "required": ["message_id", *_QA_SCHEMA["required"]],
+            },
+        }
+    },
+    "required": ["results"],
+}
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    num_predict: int | None = None
+    num_ctx: int | None = None
+    temperature: float | None = None
+    json_schema: bool = False
+    stream: bool = False
+
+    def options(self) -> dict[str, Any]:
+        options = {"num_predict": self.num_predict, "num_ctx": self.num_ctx, "temperature": self.temperature}
+        return {name: value for name, value in options.items() if value is not None}
+
+    def cache_variant(self) -> str:
+        # Settings that change what the model generates; streaming only changes transport.
+        parts = [f"{name}={value}" for name, value in sorted(self.options().items())]
+        if self.json_schema:
+            parts.append("format=schema")
+        return ",".join(parts)
+
+
+class LlmExtractor(Protocol):
+    @property
+    def model(self) -> str: ...
+
+    def extract_qa(self, prompt: str) -> LlmResult: ...
+
+    def extract_qa_batch(self, prompt: str, message_ids: list[str]) -> dict[str, LlmResult]: ...
+
+    def close(self) -> None: ...
+
+
+def _content(body: dict[str, Any]) -> str:
+    return body.get("message", {}).get("content", "{}").strip() or "{}"
+
+
+def _load_json(body: dict[str, Any]) -> Any:
+    try:
+        return json.loads(_content(body))
+    except json.JSONDecodeError as exc:
+        if body.get("done_reason") == "length":
+            raise TruncatedOutput("model output hit the token limit before the JSON was complete") from exc
+        raise InvalidOutput("model output is not valid JSON") from exc
+
+
+def _parse_result(body: dict[str, Any]) -> LlmResult:
+    parsed = _load_json(body)
+    if not isinstance(parsed, dict):
+        raise InvalidOutput("model output is not a JSON object")
+    try:
+        return _result_from_dict(parsed)
+    except (TypeError, ValueError) as exc:
+        raise InvalidOutput("model output has invalid field types") from exc
+
+
+class _JsonObjectScanner:
+    # Tracks brace depth outside of strings so a streamed response can be cut off as soon as
+    # the first top-level JSON object is complete.
+    def __init__(self) -> None:
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escaped = False
+        self.text = ""
+
+    def feed(self, chunk: str) -> bool:
+        offset = len(self.text)
+        self.text += chunk
+        for position in range(offset, len(self.text)):
+            char = self.text[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                self._started = True
+            elif char in "}]":
+                self._depth -= 1
+                if self._started and self._depth == 0:
+                    self.text = self.text[: position + 1]
+                    return True
+        return False
+
+
+def _result_from_dict(parsed: dict[str, Any]) -> LlmResult:
+    return LlmResult(
+        question=str(parsed.get("question", "")).strip(),
+        answer=str(parsed.get("answer", "")).strip(),
+        confidence=float(parsed.get("confidence", 0.0)),
+        extraction_notes=str(parsed.get("extraction_notes", "")).strip(),
+    )
+
+
+def _parse_batch(body: dict[str, Any], message_ids: list[str]) -> dict[str, LlmResult]:
+    try:
+        parsed = _load_json(body)
+    except InvalidOutput as exc:
+        raise MalformedBatchResponse("batch response is not valid JSON") from exc
+    entries = parsed.get("results") if isinstance(parsed, dict) else parsed
+    if not isinstance(entries, list):
+        raise MalformedBatchResponse("batch response has no results array")
+
+    expected = set(message_ids)
+    results: dict[str, LlmResult] = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        message_id = str(entry.get("message_id", "")).strip()
+        if message_id in expected and message_id not in results:
+            try:
+                results[message_id] = _result_from_dict(entry)
+            except (TypeError, ValueError):
+                continue
+    if not results:
+        raise MalformedBatchResponse("batch response matched none of the requested message ids")
+    return results
+
+
 class OllamaClient:
-    def __init__(self, base_url: str, model: str, timeout_seconds: int = 60) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        timeout_seconds: float = 60,
+        *,
+        keep_alive: str = DEFAULT_KEEP_ALIVE,
+        pool_size: int = 1,
+        generation: GenerationProfile | None = None,
+        session: requests.Session | None = None,
+    ) -> None:
         self._base_url = base_url.rstrip("/")
         self._model = model
         self._timeout = timeout_seconds
+        self._keep_alive = keep_alive
+        self._generation = generation or GenerationProfile()
+        # One pooled keep-alive session per client; the adapter pool is sized for the
+        # number of threads that may call extract_qa concurrently.
+        self._session = session or requests.Session()
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
 
     @property
     def model(self) -> str:
         return self._model
 
-    def extract_qa(self, prompt: str) -> LlmResult:
-        payload = {
+    def _payload(self, prompt: str, system_prompt: str, schema: dict[str, Any]) -> dict[str, Any]:
+        payload: dict[str, Any] = {
             "model": self._model,
-            "format": "json",
-            "stream": False,
+            "format": schema if self._generation.json_schema else "json",
+            "stream": self._generation.stream,
+            "keep_alive": self._keep_alive,
             "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt},
             ],
         }
+        options = self._generation.options()
+        if options:
+            payload["options"] = options
+        return payload
+
+    def _chat(self, prompt: str, system_prompt: str, schema: dict[str, Any]) -> dict[str, Any]:
+        payload = self._payload(prompt, system_prompt, schema)
+        try:
+            if self._generation.stream:
+                return self._chat_streaming(payload)
+            response = self._session.post(f"{self._base_url}/api/chat", json=payload, timeout=self._timeout)
+            response.raise_for_status()
+            return response.json()
+        except requests.Timeout as exc:
+            raise LlmTimeout(f"no response from {self._base_url} within {self._timeout}s") from exc
+
+    def _chat_streaming(self, payload: dict[str, Any]) -> dict[str, Any]:
+        # Read newline-delimited chunks and stop as soon as one complete JSON object has arrived,
+        # the token cap is reached, or the overall timeout expires, instead of waiting for the
+        # model to finish whatever it generates after the object. Leaving the block closes the
+        # connection, which also makes Ollama stop generating.
+        deadline = time.monotonic() + self._timeout
+        scanner = _JsonObjectScanner()
+        limit = self._generation.num_predict
+        with self._session.post(
+            f"{self._base_url}/api/chat", json=payload, timeout=self._timeout, stream=True
+        ) as response:
+            response.raise_for_status()
+            tokens = 0
+            for line in self._stream_lines(response):
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    raise InvalidOutput(f"malformed stream chunk from {self._base_url}") from exc
+                if not isinstance(chunk, dict):
+                    raise InvalidOutput(f"malformed stream chunk from {self._base_url}")
+                tokens += 1
+                if scanner.feed(chunk.get("message", {}).get("content", "")):
+                    return {"message": {"content": scanner.text}, "done_reason": "stop"}
+                if chunk.get("done"):
+                    return {"message": {"content": scanner.text}, "done_reason": chunk.get("done_reason")}
+                if limit is not None and tokens >= limit:
+                    return {"message": {"content": scanner.text}, "done_reason": "length"}
+                if time.monotonic() > deadline:
+                    raise LlmTimeout(f"response from {self._base_url} exceeded {self._timeout}s")
+        return {"message": {"content": scanner.text}, "done_reason": "length"}
+
+    def _stream_lines(self, response: requests.Response) -> Iterator[bytes]:
+        # A model that stops sending mid-stream surfaces from iter_lines as a ConnectionError
+        # (requests wraps the read timeout) or a ChunkedEncodingError, not as requests.Timeout.
+        try:
+            yield from response.iter_lines()
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as exc:
+            raise LlmTimeout(f"stream from {self._base_url} stalled or was cut off") from exc
+
+    def extract_qa(self, prompt: str) -> LlmResult:
+        return _parse_result(self._chat(prompt, SYSTEM_PROMPT, _QA_SCHEMA))
+
+    def extract_qa_batch(self, prompt: str, message_ids: list[str]) -> dict[str, LlmResult]:
+        return _parse_batch(self._chat(prompt, BATCH_SYSTEM_PROMPT, _BATCH_SCHEMA), message_ids)
+
+    def close(self) -> None:
+        self._session.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class AsyncOllamaClient:
+    # Awaitable facade over the pooled synchronous client. requests has no native asyncio
+    # support, so calls run on the default executor while sharing one connection pool.
+    def __init__(self, client: OllamaClient) -> None:
+        self._client = client
+
+    @classmethod
+    def create(cls, base_url: str, model: str, **kwargs: Any) -> AsyncOllamaClient:
+        return cls(OllamaClient(base_url, model, **kwargs))
+
+    @property
+    def model(self) -> str:
+        return self._client.model
+
+    async def extract_qa(self, prompt: str) -> LlmResult:
+        return await asyncio.to_thread(self._client.extract_qa, prompt)
+
+    async def aclose(self) -> None:
+        self._client.close()
+
+    async def __aenter__(self) -> Self:
+        return self
 
-        response = requests.post(
-            f"{self._base_url}/api/chat",
-            json=payload,
-            timeout=self._timeout,
-        )
-        response.raise_for_status()
-        body = response.json()
-
-        content = body.get("message", {}).get("content", "{}").strip() or "{}"
-        parsed = json.loads(content)
-
-        return LlmResult(
-            question=str(parsed.get("question", "")).strip(),
-            answer=str(parsed.get("answer", "")).strip(),
-            confidence=float(parsed.get("confidence", 0.0)),
-            extraction_notes=str(parsed.get("extraction_notes", "")).strip(),
-        )
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
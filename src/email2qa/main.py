@@ -1,13 +1,25 @@
 from __future__ import annotations
 
 import argparse
+import logging
 from datetime import datetime, timezone
 
 from dateutil.parser import isoparse
 
-from email2qa.checkpoint import checkpoint_path, load_checkpoint, reset_checkpoint
+from email2qa.checkpoint import (
+    checkpoint_path,
+    load_checkpoint,
+    load_sync_state,
+    processed_index_path,
+    reset_checkpoint,
+    reset_processed_index,
+    reset_sync_state,
+    sync_state_path,
+)
 from email2qa.config import RunOptions, get_output_dir, load_config
+from email2qa.export import DEFAULT_ROW_GROUP_SIZE, EXPORT_FORMATS, EXPORT_KINDS, export_run
 from email2qa.pipeline import run_pipeline
+from email2qa.sources import SNAPSHOT_PREFIX, source_state_dir, sources_file_state_dirs
 
 
 def _parse_datetime(value: str | None) -> datetime | None:
@@ -35,7 +47,142 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--verbose",
         action="store_true",
-        help="Print per-step progress and outcomes while processing",
+        help="Print per-step progress and outcomes while processing (same as --log-level info)",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["debug", "info", "warning", "error"],
+        default=None,
+        help="Logging level; debug also prints cleaned bodies and full prompts",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Record per-stage latency histograms (p50/p95/p99) in manifest.json",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        default=None,
+        metavar="PATH",
+        help="Also write stage histograms in Prometheus text format to PATH (implies --metrics)",
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=1,
+        help="Number of concurrent Ollama requests (results are still committed in sent order)",
+    )
+    parser.add_argument(
+        "--preprocess-workers",
+        type=int,
+        default=0,
+        help="Parse and clean bodies in this many worker processes (0 = main process)",
+    )
+    parser.add_argument(
+        "--stage-queue-size",
+        type=int,
+        default=None,
+        help="Messages buffered between fetch and preprocessing (default: the Exchange page size)",
+    )
+    parser.add_argument("--num-predict", type=int, default=None, help="Cap generated tokens per LLM call")
+    parser.add_argument("--num-ctx", type=int, default=None, help="Context window size requested from Ollama")
+    parser.add_argument("--temperature", type=float, default=None, help="Sampling temperature for extraction")
+    parser.add_argument(
+        "--json-schema-format",
+        action="store_true",
+        help="Constrain output with the QA JSON schema instead of bare JSON mode",
+    )
+    parser.add_argument(
+        "--stream-llm",
+        action="store_true",
+        help="Stream responses and stop reading once a complete JSON object has arrived",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        action="store_true",
+        help="Reuse cached LLM responses for byte-identical prompts (clear it after re-pulling a model)",
+    )
+    parser.add_argument(
+        "--persistent-dedupe",
+        action="store_true",
+        help="Reject QA pairs already accepted by previous runs (index kept in the output dir)",
+    )
+    parser.add_argument(
+        "--near-duplicate-threshold",
+        type=float,
+        default=None,
+        help="Reject QA pairs whose estimated Jaccard similarity to an accepted pair is at least this value",
+    )
+    parser.add_argument(
+        "--relevance-threshold",
+        type=float,
+        default=None,
+        help="Skip the LLM for cleaned bodies whose local relevance score is below this value",
+    )
+    parser.add_argument(
+        "--relevance-shadow",
+        action="store_true",
+        help="Score relevance and report what the gate would skip, but still send every email to the LLM",
+    )
+    parser.add_argument(
+        "--group-threads",
+        action="store_true",
+        help=(
+            "Send one combined prompt per conversation instead of one per message. Replies are buffered "
+            "until the conversation leaves the --thread-window-hours window or reaches --thread-max-tokens"
+        ),
+    )
+    parser.add_argument(
+        "--thread-window-hours",
+        type=float,
+        default=168.0,
+        help="Dispatch a conversation once its first buffered reply is this much older than the stream",
+    )
+    parser.add_argument(
+        "--thread-max-tokens",
+        type=int,
+        default=8000,
+        help="Dispatch a conversation once its buffered replies reach this many estimated tokens",
+    )
+    parser.add_argument(
+        "--batch-token-budget",
+        type=int,
+        default=None,
+        help="Pack several emails into one LLM request up to this many estimated tokens",
+    )
+    parser.add_argument(
+        "--batch-max-emails",
+        type=int,
+        default=8,
+        help="Maximum number of emails per batched LLM request",
+    )
+    parser.add_argument(
+        "--source",
+        default="exchange",
+        help="Where to read sent items from: 'exchange' or 'snapshot:<path>' (a recorded snapshot)",
+    )
+    parser.add_argument(
+        "--sources-file",
+        default=None,
+        metavar="PATH",
+        help="JSON list of mailboxes/folders to process in one run, each with its own checkpoint",
+    )
+    parser.add_argument(
+        "--record-snapshot",
+        default=None,
+        metavar="PATH",
+        help="Also write every fetched message to a compressed, indexed snapshot at PATH",
+    )
+    parser.add_argument(
+        "--fetch-shards",
+        type=int,
+        default=1,
+        help="Split the time range into about N shards fetched concurrently (EMAIL2QA_EXCHANGE_MAX_CONNECTIONS caps connections)",
+    )
+    parser.add_argument(
+        "--incremental-sync",
+        action="store_true",
+        help="Fetch only changes since the last run using Exchange folder sync state (sync_state.json)",
     )
     parser.add_argument(
         "--resume",
@@ -58,34 +205,80 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Skip confirmation prompt for destructive actions",
     )
+    parser.add_argument(
+        "--export",
+        metavar="RUN_DIR",
+        default=None,
+        help="Convert a finished run's records to a columnar file and exit",
+    )
+    parser.add_argument("--export-format", choices=list(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--export-records", choices=list(EXPORT_KINDS), default="accepted")
+    parser.add_argument(
+        "--export-row-group-size",
+        type=int,
+        default=DEFAULT_ROW_GROUP_SIZE,
+        help="Records per Parquet row group / Arrow record batch",
+    )
+    parser.add_argument("--export-output", default=None, help="Export path (default: inside RUN_DIR)")
     return parser
 
 
+def _configure_logging(args: argparse.Namespace) -> None:
+    level = args.log_level or ("info" if args.verbose else "warning")
+    logging.basicConfig(level=level.upper(), format="[%(levelname)s] %(message)s")
+
+
 def main() -> None:
     args = build_parser().parse_args()
+    _configure_logging(args)
+
+    if args.export:
+        path, rows = export_run(
+            args.export,
+            kind=args.export_records,
+            fmt=args.export_format,
+            row_group_size=args.export_row_group_size,
+            output=args.export_output,
+        )
+        print(f"Exported {rows} {args.export_records} records to {path}")
+        return
 
-    output_dir = get_output_dir()
-    checkpoint_file = checkpoint_path(output_dir)
+    if args.sources_file:
+        state_dirs = sources_file_state_dirs(args.sources_file, get_output_dir())
+    else:
+        state_dirs = {args.source: source_state_dir(args.source, get_output_dir())}
     if args.checkpoint_inspect:
-        checkpoint = load_checkpoint(checkpoint_file)
-        if checkpoint is None:
-            print(f"No checkpoint found at: {checkpoint_file}")
-        else:
-            print(checkpoint.model_dump_json(indent=2))
+        for name, state_dir in state_dirs.items():
+            if args.sources_file:
+                print(f"[{name}]")
+            checkpoint_file = checkpoint_path(state_dir)
+            checkpoint = load_checkpoint(checkpoint_file)
+            if checkpoint is None:
+                print(f"No checkpoint found at: {checkpoint_file}")
+            else:
+                print(checkpoint.model_dump_json(indent=2))
+            sync_state = load_sync_state(sync_state_path(state_dir))
+            if sync_state is not None:
+                print(f"Sync state for '{sync_state.folder}' saved at {sync_state.updated_at.isoformat()}")
         return
 
     if args.checkpoint_reset:
         if not confirm_checkpoint_reset(args.force):
             print("Checkpoint reset canceled.")
             return
-        deleted = reset_checkpoint(checkpoint_file)
-        if deleted:
-            print(f"Checkpoint deleted: {checkpoint_file}")
-        else:
-            print(f"No checkpoint found to delete at: {checkpoint_file}")
+        for state_dir in state_dirs.values():
+            checkpoint_file = checkpoint_path(state_dir)
+            deleted = reset_checkpoint(checkpoint_file)
+            reset_processed_index(processed_index_path(state_dir))
+            reset_sync_state(sync_state_path(state_dir))
+            if deleted:
+                print(f"Checkpoint deleted: {checkpoint_file}")
+            else:
+                print(f"No checkpoint found to delete at: {checkpoint_file}")
         return
 
-    config = load_config()
+    # Snapshots need no Exchange credentials; a sources file validates each entry itself.
+    config = load_config(require_exchange=not (args.sources_file or args.source.startswith(SNAPSHOT_PREFIX)))
     options = RunOptions(
         since=_parse_datetime(args.since),
         until=_parse_datetime(args.until),
@@ -93,6 +286,31 @@ def main() -> None:
         dry_run=args.dry_run,
         resume=args.resume,
         verbose=args.verbose,
+        llm_concurrency=args.llm_concurrency,
+        preprocess_workers=args.preprocess_workers,
+        stage_queue_size=args.stage_queue_size,
+        llm_cache=args.llm_cache,
+        persistent_dedupe=args.persistent_dedupe,
+        near_duplicate_threshold=args.near_duplicate_threshold,
+        relevance_threshold=args.relevance_threshold,
+        relevance_shadow=args.relevance_shadow,
+        group_threads=args.group_threads,
+        thread_window_hours=args.thread_window_hours,
+        thread_max_tokens=args.thread_max_tokens,
+        batch_token_budget=args.batch_token_budget,
+        batch_max_emails=args.batch_max_emails,
+        source=args.source,
+        record_snapshot=args.record_snapshot,
+        incremental_sync=args.incremental_sync,
+        fetch_shards=args.fetch_shards,
+        sources_file=args.sources_file,
+        metrics=args.metrics,
+        metrics_textfile=args.metrics_textfile,
+        num_predict=args.num_predict,
+        num_ctx=args.num_ctx,
+        temperature=args.temperature,
+        json_schema_format=args.json_schema_format,
+        stream_llm=args.stream_llm,
     )
 
     output_dir = run_pipeline(config, options)
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import math
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+
+from email2qa.schema import QueueDepth, StageTiming
+
+STAGES = ("fetch", "preprocess", "prompt", "llm", "quality", "write")
+# Bounded queues between stages, in pipeline order.
+QUEUES = ("fetch", "preprocess", "llm", "commit")
+
+# Prometheus buckets (seconds), spanning sub-millisecond stages up to slow LLM calls.
+PROMETHEUS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Quantiles come from log-spaced buckets growing 5% per step, so p50/p95/p99 are within ~5%
+# without keeping every sample.
+_GROWTH = math.log(1.05)
+_SMALLEST = 1e-6
+
+_DISABLED = nullcontext()
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._log_buckets: dict[int, int] = {}
+        self._prometheus = [0] * len(PROMETHEUS_BUCKETS)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        index = math.ceil(math.log(max(seconds, _SMALLEST) / _SMALLEST) / _GROWTH)
+        self._log_buckets[index] = self._log_buckets.get(index, 0) + 1
+        for position, bound in enumerate(PROMETHEUS_BUCKETS):
+            if seconds <= bound:
+                self._prometheus[position] += 1
+                break
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self._log_buckets):
+            seen += self._log_buckets[index]
+            if seen >= rank:
+                return min(_SMALLEST * math.exp(index * _GROWTH), self.max)
+        return self.max
+
+    def cumulative_buckets(self) -> list[tuple[float, int]]:
+        running = 0
+        buckets = []
+        for bound, count in zip(PROMETHEUS_BUCKETS, self._prometheus):
+            running += count
+            buckets.append((bound, running))
+        return buckets
+
+    def timing(self) -> StageTiming:
+        return StageTiming(
+            count=self.count,
+            total_seconds=self.total,
+            mean_seconds=self.total / self.count if self.count else 0.0,
+            p50_seconds=self.quantile(0.50),
+            p95_seconds=self.quantile(0.95),
+            p99_seconds=self.quantile(0.99),
+            max_seconds=self.max,
+        )
+
+
+class QueueGauge:
+    # Depth is sampled whenever an item enters or leaves a queue. A queue that sits near its
+    # capacity points at a slow stage downstream; one that stays empty, at a slow stage upstream.
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.samples = 0
+        self.total = 0
+        self.max = 0
+
+    def observe(self, depth: int) -> None:
+        self.samples += 1
+        self.total += depth
+        self.max = max(self.max, depth)
+
+    def depth(self) -> QueueDepth:
+        return QueueDepth(
+            capacity=self.capacity,
+            samples=self.samples,
+            mean_depth=self.total / self.samples if self.samples else 0.0,
+            max_depth=self.max,
+        )
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_stage", "_started")
+
+    def __init__(self, metrics: StageMetrics, stage: str) -> None:
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._metrics.observe(self._stage, time.perf_counter() - self._started)
+
+
+class StageMetrics:
+    # When disabled, time() hands back one shared no-op context manager and observe() returns
+    # immediately, so instrumented code pays for a method call and nothing else.
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: dict[str, Histogram] = {}
+        self._queues: dict[str, QueueGauge] = {}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def time(self, stage: str) -> AbstractContextManager[None]:
+        if not self.enabled:
+            return _DISABLED
+        return _Timer(self, stage)
+
+    def timed_iter(self, stage: str, items: Iterable) -> Iterator:
+        if not self.enabled:
+            return iter(items)
+        return self._timed_iter(stage, iter(items))
+
+    def _timed_iter(self, stage: str, items: Iterator) -> Iterator:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            self.observe(stage, time.perf_counter() - started)
+            yield item
+
+    def observer(self, stage: str) -> Callable[[float], None] | None:
+        if not self.enabled:
+            return None
+        return lambda seconds: self.observe(stage, seconds)
+
+    def observe_depth(self, queue: str, depth: int, capacity: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            gauge = self._queues.get(queue)
+            if gauge is None:
+                gauge = self._queues[queue] = QueueGauge(capacity)
+            gauge.capacity = max(gauge.capacity, capacity)
+            gauge.observe(depth)
+
+    def depth_observer(self, queue: str, capacity: int) -> Callable[[int], None] | None:
+        if not self.enabled:
+            return None
+        return lambda depth: self.observe_depth(queue, depth, capacity)
+
+    def queue_summary(self) -> dict[str, QueueDepth]:
+        with self._lock:
+            return {queue: self._queues[queue].depth() for queue in sorted(self._queues, key=_queue_order)}
+
+    def summary(self) -> dict[str, StageTiming]:
+        with self._lock:
+            return {
+                stage: self._histograms[stage].timing()
+                for stage in sorted(self._histograms, key=_stage_order)
+            }
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP email2qa_stage_duration_seconds Time spent per item in each pipeline stage.",
+            "# TYPE email2qa_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for stage in sorted(self._histograms, key=_stage_order):
+                histogram = self._histograms[stage]
+                for bound, count in histogram.cumulative_buckets():
+                    lines.append(f'email2qa_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'email2qa_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'email2qa_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.total}')
+                lines.append(f'email2qa_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+        depths = self.queue_summary()
+        gauges = (
+            ("capacity", "capacity", "Maximum number of items each stage queue holds."),
+            ("depth_max", "max_depth", "Highest observed number of items waiting in each stage queue."),
+            ("depth_mean", "mean_depth", "Mean observed number of items waiting in each stage queue."),
+        )
+        for name, field, help_text in gauges if depths else ():
+            lines.append(f"# HELP email2qa_queue_{name} {help_text}")
+            lines.append(f"# TYPE email2qa_queue_{name} gauge")
+            for queue, depth in depths.items():
+                lines.append(f'email2qa_queue_{name}{{queue="{queue}"}} {getattr(depth, field)}')
+        return "\n".join(lines) + "\n"
+
+
+def _stage_order(stage: str) -> tuple[int, str]:
+    return (STAGES.index(stage) if stage in STAGES else len(STAGES), stage)
+
+
+def _queue_order(queue: str) -> tuple[int, str]:
+    return (QUEUES.index(queue) if queue in QUEUES else len(QUEUES), queue)
+
+
+def write_prometheus_textfile(path: str | Path, metrics: StageMetrics) -> None:
+    # node_exporter's textfile collector may read at any moment, so replace the file atomically.
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{target.name}.", dir=target.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(metrics.prometheus_text())
+        os.replace(temp_name, target)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
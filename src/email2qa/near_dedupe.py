@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+import random
+from collections import defaultdict
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text: str, size: int = 3) -> set[str]:
+    words = " ".join(text.lower().split()).split(" ")
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[idx : idx + size]) for idx in range(len(words) - size + 1)}
+
+
+def _stable_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _choose_bands(num_perm: int, threshold: float) -> tuple[int, int]:
+    # Pick bands*rows == num_perm whose S-curve midpoint (1/b)^(1/r) is closest to the
+    # requested Jaccard threshold.
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateIndex:
+    # MinHash signatures over word shingles, bucketed with banded LSH so each lookup only
+    # compares against pairs that share at least one band instead of every accepted pair.
+    def __init__(self, threshold: float, num_perm: int = 64, seed: int = 1) -> None:
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("near-duplicate threshold must be in (0, 1]")
+        self.threshold = threshold
+        self._num_perm = num_perm
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+        self._bands, self._rows = _choose_bands(num_perm, threshold)
+        self._buckets: list[dict[tuple[int, ...], list[int]]] = [defaultdict(list) for _ in range(self._bands)]
+        self._signatures: list[tuple[int, ...]] = []
+
+    def signature(self, text: str) -> tuple[int, ...]:
+        hashes = [_stable_hash(shingle) for shingle in shingles(text)]
+        return tuple(
+            min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashes) for a, b in self._perms
+        )
+
+    def _bands_of(self, signature: tuple[int, ...]) -> list[tuple[int, ...]]:
+        return [signature[idx * self._rows : (idx + 1) * self._rows] for idx in range(self._bands)]
+
+    def find(self, signature: tuple[int, ...]) -> float | None:
+        checked: set[int] = set()
+        for band, key in enumerate(self._bands_of(signature)):
+            for candidate in self._buckets[band].get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                other = self._signatures[candidate]
+                similarity = sum(x == y for x, y in zip(signature, other)) / self._num_perm
+                if similarity >= self.threshold:
+                    return similarity
+        return None
+
+    def add(self, signature: tuple[int, ...]) -> None:
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in enumerate(self._bands_of(signature)):
+            self._buckets[band][key].append(position)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
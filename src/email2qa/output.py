@@ -1,11 +1,22 @@
 from __future__ import annotations
 
+import gzip
+import io
 import json
+import os
+import time
+from collections.abc import Iterator
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import IO, Any, Self
 
 from pydantic import BaseModel
 
+from email2qa.schema import OutputShard
+
+DURABILITY_MODES = ("none", "flush", "fsync")
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
 
 def make_run_dir(base_dir: str) -> tuple[str, Path]:
     run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
@@ -20,6 +31,187 @@ def append_jsonl(path: Path, model: BaseModel) -> None:
         handle.write("\n")
 
 
+def _zstandard() -> Any:
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            "zstandard is required for zstd output compression (pip install email2qa[zstd])"
+        ) from None
+    return zstandard
+
+
+class _ShardFile:
+    # One open output file. Compressed shards are written as a stream on top of the raw file,
+    # which stays reachable for fsync.
+    def __init__(self, path: Path, compression: str) -> None:
+        self.path = path
+        self.records = 0
+        self.uncompressed_bytes = 0
+        self._raw = path.open("ab")
+        self._stream: IO[bytes]
+        if compression == "gzip":
+            self._stream = gzip.GzipFile(filename="", mode="ab", fileobj=self._raw)
+        elif compression == "zstd":
+            self._stream = _zstandard().ZstdCompressor().stream_writer(self._raw, closefd=False)
+        else:
+            self._stream = self._raw
+
+    def write(self, data: bytes) -> None:
+        self._stream.write(data)
+
+    def flush(self, durability: str) -> None:
+        if durability == "none":
+            return
+        self._stream.flush()
+        self._raw.flush()
+        if durability == "fsync":
+            os.fsync(self._raw.fileno())
+
+    def close(self, durability: str) -> None:
+        try:
+            if self._stream is not self._raw:
+                self._stream.close()
+            if durability == "fsync":
+                self._raw.flush()
+                os.fsync(self._raw.fileno())
+        finally:
+            self._raw.close()
+
+
+class JsonlWriter:
+    # Keeps one handle open for the run and writes serialized records in batches once
+    # `flush_bytes` are buffered or `flush_seconds` have passed. Durability per batch:
+    # "none" leaves data in the file object, "flush" hands it to the OS, "fsync" forces it to disk.
+    # Output can be streamed through gzip or zstd, and with `shard_bytes` it rotates to a new
+    # numbered file (accepted-00000.jsonl.gz, ...) once that much JSON has been written to one.
+    def __init__(
+        self,
+        path: Path,
+        *,
+        durability: str = "flush",
+        flush_bytes: int = 1 << 20,
+        flush_seconds: float = 5.0,
+        compression: str = "none",
+        shard_bytes: int | None = None,
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown output durability: {durability}")
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown output compression: {compression}")
+        if compression == "zstd":
+            _zstandard()
+        self.path = path
+        self._durability = durability
+        self._flush_bytes = flush_bytes
+        self._flush_seconds = flush_seconds
+        self._compression = compression
+        self._shard_bytes = shard_bytes
+        self._shard: _ShardFile | None = None
+        self._buffer: list[bytes] = []
+        self._buffered_bytes = 0
+        self._last_flush = time.monotonic()
+        self.records_written = 0
+        self.shards: list[OutputShard] = []
+
+    @property
+    def kind(self) -> str:
+        return self.path.name.removesuffix(".jsonl")
+
+    def _shard_path(self) -> Path:
+        suffix = ".jsonl" + COMPRESSION_SUFFIXES[self._compression]
+        if self._shard_bytes is None:
+            return self.path.with_name(self.kind + suffix)
+        return self.path.with_name(f"{self.kind}-{len(self.shards):05d}{suffix}")
+
+    def write(self, model: BaseModel) -> None:
+        line = (model.model_dump_json() + "\n").encode("utf-8")
+        self._buffer.append(line)
+        self._buffered_bytes += len(line)
+        self.records_written += 1
+        if (
+            self._buffered_bytes >= self._flush_bytes
+            or time.monotonic() - self._last_flush >= self._flush_seconds
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        chunk: list[bytes] = []
+        for line in self._buffer:
+            if self._shard is None:
+                self._shard = _ShardFile(self._shard_path(), self._compression)
+            chunk.append(line)
+            self._shard.records += 1
+            self._shard.uncompressed_bytes += len(line)
+            if self._shard_bytes is not None and self._shard.uncompressed_bytes >= self._shard_bytes:
+                self._shard.write(b"".join(chunk))
+                chunk = []
+                self._close_shard()
+        self._buffer.clear()
+        self._buffered_bytes = 0
+        if chunk and self._shard is not None:
+            self._shard.write(b"".join(chunk))
+            self._shard.flush(self._durability)
+
+    def _close_shard(self) -> None:
+        shard, self._shard = self._shard, None
+        if shard is None:
+            return
+        shard.close(self._durability)
+        self.shards.append(
+            OutputShard(
+                kind=self.kind,
+                file=shard.path.name,
+                compression=self._compression,
+                records=shard.records,
+                uncompressed_bytes=shard.uncompressed_bytes,
+                bytes=shard.path.stat().st_size,
+            )
+        )
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._close_shard()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def open_jsonl(path: Path) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.suffix == ".zst":
+        reader = _zstandard().ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return path.open("r", encoding="utf-8")
+
+
+def run_output_files(run_dir: Path, kind: str) -> list[Path]:
+    # The manifest lists shards in write order; runs without that list have a single file.
+    manifest = run_dir / "manifest.json"
+    if manifest.exists():
+        shards = json.loads(manifest.read_text(encoding="utf-8")).get("output_shards")
+        if shards:
+            return [run_dir / shard["file"] for shard in shards if shard["kind"] == kind]
+    return sorted(path for path in run_dir.glob(f"{kind}*.jsonl*") if path.is_file())
+
+
+def iter_run_records(run_dir: Path, kind: str) -> Iterator[dict[str, Any]]:
+    for path in run_output_files(run_dir, kind):
+        with open_jsonl(path) as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
 def write_manifest(path: Path, content: BaseModel) -> None:
     with path.open("w", encoding="utf-8") as handle:
         json.dump(content.model_dump(mode="json"), handle, indent=2)
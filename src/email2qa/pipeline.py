@@ -1,151 +1,763 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
 
-from email2qa.checkpoint import Checkpoint, checkpoint_path, load_checkpoint, write_checkpoint
+from email2qa.checkpoint import (
+    Checkpoint,
+    CheckpointTracker,
+    ProcessedIndex,
+    checkpoint_path,
+    load_checkpoint,
+    processed_index_path,
+    sync_state_path,
+    write_checkpoint,
+)
 from email2qa.config import AppConfig, RunOptions
-from email2qa.exchange_client import fetch_sent_items
-from email2qa.llm_client import LlmResult, OllamaClient
-from email2qa.output import append_jsonl, make_run_dir, write_manifest
-from email2qa.preprocess import preprocess_email_body
-from email2qa.prompts import build_user_prompt
-from email2qa.quality import evaluate_candidate, new_quality_state
-from email2qa.schema import Manifest, RejectedRecord
+from email2qa.dedupe_index import DedupeIndex, dedupe_index_path
+from email2qa.exchange_client import SourceEmail
+from email2qa.html_text import get_html_backend
+from email2qa.llm_cache import CachedLlmClient, LlmCache, llm_cache_path
+from email2qa.llm_client import (
+    GenerationProfile,
+    LlmError,
+    LlmExtractor,
+    LlmResult,
+    MalformedBatchResponse,
+    OllamaClient,
+)
+from email2qa.metrics import StageMetrics, write_prometheus_textfile
+from email2qa.output import JsonlWriter, make_run_dir, write_manifest
+from email2qa.preprocess import PreprocessRules
+from email2qa.preprocess_pool import iter_preprocessed
+from email2qa.prompts import (
+    PromptBudget,
+    build_batch_prompt,
+    build_thread_prompt,
+    build_user_prompt,
+    estimate_tokens,
+    fit_email_to_budget,
+    fit_thread_to_budget,
+)
+from email2qa.quality import QualityState, evaluate_candidate, new_quality_state
+from email2qa.relevance import DEFAULT_RELEVANCE_THRESHOLD, relevance_score
+from email2qa.scheduler import FairScheduler
+from email2qa.schema import Manifest, QaRecord, RejectedRecord, SourceSummary
+from email2qa.sources import (
+    ExchangeSyncSource,
+    MailSource,
+    SnapshotWriter,
+    SourceEntry,
+    load_sources_file,
+    mailbox_state_dir,
+    open_source,
+    recording,
+    source_state_dir,
+)
+from email2qa.streaming import BackgroundConsumer, prefetch
 
+logger = logging.getLogger(__name__)
+
+_DRY_RUN_RESULT = LlmResult(question="", answer="", confidence=0.0, extraction_notes="dry_run")
+
+
+@dataclass
+class _Pending:
+    message: SourceEmail
+    future: Future[LlmResult] | None = None
+    candidate: LlmResult | None = None
+    reject: RejectedRecord | None = None
+    members: list[SourceEmail] | None = None
+    awaiting_batch: bool = False
+    batch: Future[dict[str, LlmResult | LlmError]] | None = None
+    truncation: str = ""
+
+
+@dataclass
+class _SourceStats:
+    fetched: int = 0
+    skipped: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    dispatched: int = 0
+    batch_fallbacks: int = 0
+    llm_errors: int = 0
+    relevance_gated: int = 0
+    relevance_shadow_gated: int = 0
+    relevance_shadow_missed: int = 0
+    prompts_truncated: int = 0
+    # Ids the shadow gate would have skipped, held only until their message is committed.
+    shadow_gated: set[str] = field(default_factory=set)
+
+
+@dataclass
+class _Lane:
+    entry: SourceEntry
+    source: MailSource
+    state_dir: str
+    stats: _SourceStats = field(default_factory=_SourceStats)
+
+
+@dataclass
+class _Shared:
+    # Run-wide resources used by every source lane. The output lock covers both writers and the
+    # quality state, so dedupe decisions stay consistent across sources.
+    config: AppConfig
+    options: RunOptions
+    accepted_writer: JsonlWriter
+    rejected_writer: JsonlWriter
+    output_lock: threading.Lock
+    state: QualityState
+    dedupe_index: DedupeIndex | None
+    ollama: LlmExtractor
+    scheduler: FairScheduler
+    metrics: StageMetrics
+    rules: PreprocessRules
+    budget: PromptBudget
+    relevance_threshold: float | None
+
+
+def _source_entries(config: AppConfig, options: RunOptions) -> list[tuple[SourceEntry, str]]:
+    if options.sources_file is None:
+        entry = SourceEntry(name=options.source, spec=options.source, config=config)
+        return [(entry, source_state_dir(options.source, config.output_dir))]
+    if options.record_snapshot:
+        raise ValueError("--record-snapshot cannot be combined with a sources file")
+    return [
+        (entry, mailbox_state_dir(config.output_dir, entry.name))
+        for entry in load_sources_file(options.sources_file, config)
+    ]
 
-def run_pipeline(config: AppConfig, options: RunOptions) -> str:
-    def log(message: str) -> None:
-        if options.verbose:
-            print(f"[verbose] {message}")
 
+def run_pipeline(config: AppConfig, options: RunOptions) -> str:
     started_at = datetime.now(timezone.utc)
+    lanes = [
+        _Lane(
+            entry=entry,
+            source=open_source(
+                entry.spec,
+                entry.config,
+                sync_state_file=sync_state_path(state_dir) if options.incremental_sync else None,
+                use_stored_state=options.resume,
+                fetch_shards=options.fetch_shards,
+            ),
+            state_dir=state_dir,
+        )
+        for entry, state_dir in _source_entries(config, options)
+    ]
     run_id, run_dir = make_run_dir(config.output_dir)
-    checkpoint_file = checkpoint_path(config.output_dir)
-    accepted_path = run_dir / "accepted.jsonl"
-    rejected_path = run_dir / "rejected.jsonl"
-    log(f"Run initialized (run_id={run_id}, output={run_dir})")
+    writer_options = {
+        "durability": config.output_durability,
+        "flush_bytes": config.output_flush_bytes,
+        "flush_seconds": config.output_flush_seconds,
+        "compression": config.output_compression,
+        "shard_bytes": config.output_shard_bytes,
+    }
+    accepted_writer = JsonlWriter(run_dir / "accepted.jsonl", **writer_options)
+    rejected_writer = JsonlWriter(run_dir / "rejected.jsonl", **writer_options)
+    logger.info("Run initialized (run_id=%s, output=%s)", run_id, run_dir)
+
+    # Exact-pair dedupe is shared by all sources of a run; a single-source run keeps its index
+    # next to that source's checkpoint.
+    dedupe_dir = lanes[0].state_dir if options.sources_file is None else config.output_dir
+    dedupe_index = DedupeIndex(dedupe_index_path(dedupe_dir)) if options.persistent_dedupe else None
+    generation = GenerationProfile(
+        num_predict=options.num_predict,
+        num_ctx=options.num_ctx,
+        temperature=options.temperature,
+        json_schema=options.json_schema_format,
+        stream=options.stream_llm,
+    )
+    ollama: LlmExtractor = OllamaClient(
+        config.ollama_base_url,
+        config.ollama_model,
+        timeout_seconds=config.ollama_timeout_seconds,
+        keep_alive=config.ollama_keep_alive,
+        pool_size=options.llm_concurrency,
+        generation=generation,
+    )
+    cache: LlmCache | None = None
+    if options.llm_cache and not options.dry_run:
+        cache = LlmCache(
+            llm_cache_path(config.output_dir),
+            max_entries=config.llm_cache_max_entries,
+            max_age_days=config.llm_cache_max_age_days,
+        )
+        ollama = CachedLlmClient(ollama, cache, variant=generation.cache_variant())
+    logger.info(
+        "Quality/LLM initialized (dry_run=%s, model=%s, min_confidence=%s, llm_concurrency=%d)",
+        options.dry_run,
+        config.ollama_model,
+        config.min_confidence,
+        options.llm_concurrency,
+    )
+
+    # The relevance gate rejects low-scoring bodies before any prompt is built. In shadow mode
+    # every email still reaches the LLM, and accepted pairs the gate would have skipped are
+    # counted so its recall can be measured before enabling it.
+    relevance_threshold = options.relevance_threshold
+    if relevance_threshold is None and options.relevance_shadow:
+        relevance_threshold = DEFAULT_RELEVANCE_THRESHOLD
+    # Stage timings are only collected when asked for; a disabled StageMetrics turns every
+    # timing call into a no-op.
+    metrics = StageMetrics(enabled=options.metrics or options.metrics_textfile is not None)
+    shared = _Shared(
+        config=config,
+        options=options,
+        accepted_writer=accepted_writer,
+        rejected_writer=rejected_writer,
+        output_lock=threading.Lock(),
+        state=new_quality_state(dedupe_index, options.near_duplicate_threshold),
+        dedupe_index=dedupe_index,
+        ollama=ollama,
+        # One set of LLM workers for the whole run, taking requests round-robin across sources.
+        scheduler=FairScheduler(max(1, options.llm_concurrency)),
+        metrics=metrics,
+        rules=PreprocessRules(
+            quote_patterns=config.extra_quote_patterns,
+            signature_patterns=config.extra_signature_patterns,
+            disclaimer_markers=config.extra_disclaimer_markers,
+            html_backend=get_html_backend(config.html_backend),
+        ),
+        # Oversized bodies and recipient lists are cut down before prompting so prefill time (and
+        # with it tail latency) stays bounded; what was cut is recorded on the output record.
+        budget=PromptBudget(config.prompt_token_budget, config.prompt_max_recipients),
+        relevance_threshold=relevance_threshold,
+    )
+
+    try:
+        if len(lanes) == 1:
+            _run_source(shared, lanes[0])
+        else:
+            _run_sources_concurrently(shared, lanes)
+    finally:
+        shared.scheduler.shutdown(wait=True, cancel_futures=True)
+        try:
+            accepted_writer.close()
+            rejected_writer.close()
+        finally:
+            ollama.close()
+            if cache is not None:
+                cache.close()
+            if dedupe_index is not None:
+                dedupe_index.close()
+
+    totals = [lane.stats for lane in lanes]
+    fetched = sum(stats.fetched for stats in totals)
+    accepted = sum(stats.accepted for stats in totals)
+    rejected = sum(stats.rejected for stats in totals)
+    finished_at = datetime.now(timezone.utc)
+    manifest = Manifest(
+        run_id=run_id,
+        started_at=started_at,
+        finished_at=finished_at,
+        total_processed=fetched,
+        accepted_count=accepted,
+        rejected_count=rejected,
+        skipped_count=sum(stats.skipped for stats in totals),
+        llm_cache_hits=cache.hits if cache is not None else 0,
+        llm_cache_misses=cache.misses if cache is not None else 0,
+        prompts_dispatched=sum(stats.dispatched for stats in totals),
+        batch_fallbacks=sum(stats.batch_fallbacks for stats in totals),
+        relevance_gated=sum(stats.relevance_gated for stats in totals),
+        relevance_shadow_gated=sum(stats.relevance_shadow_gated for stats in totals),
+        relevance_shadow_missed=sum(stats.relevance_shadow_missed for stats in totals),
+        prompts_truncated=sum(stats.prompts_truncated for stats in totals),
+        llm_errors=sum(stats.llm_errors for stats in totals),
+        stage_timings=metrics.summary(),
+        queue_depths=metrics.queue_summary(),
+        sources=[
+            SourceSummary(
+                name=lane.entry.name,
+                total_processed=lane.stats.fetched,
+                accepted_count=lane.stats.accepted,
+                rejected_count=lane.stats.rejected,
+                skipped_count=lane.stats.skipped,
+                llm_errors=lane.stats.llm_errors,
+            )
+            for lane in lanes
+        ],
+        output_shards=accepted_writer.shards + rejected_writer.shards,
+        dry_run=options.dry_run,
+        model=config.ollama_model,
+        min_confidence=config.min_confidence,
+    )
+    write_manifest(run_dir / "manifest.json", manifest)
+    logger.info("Manifest written")
+    if options.metrics_textfile is not None:
+        write_prometheus_textfile(options.metrics_textfile, metrics)
+        logger.info("Metrics written to %s", options.metrics_textfile)
+
+    logger.info("Run complete (accepted=%d, rejected=%d, total=%d)", accepted, rejected, fetched)
+
+    return str(run_dir)
+
+
+def _run_sources_concurrently(shared: _Shared, lanes: list[_Lane]) -> None:
+    # Each source fetches and preprocesses on its own thread and commits in its own sent order.
+    # A failing source does not stop the others; the first error is raised once all are done.
+    errors: list[BaseException] = []
+
+    def run(lane: _Lane) -> None:
+        try:
+            _run_source(shared, lane)
+        except BaseException as exc:  # noqa: BLE001 - re-raised after the other sources finish
+            logger.error("Source %s failed: %s", lane.entry.name, exc)
+            errors.append(exc)
+
+    threads = [
+        threading.Thread(target=run, args=(lane,), name=f"email2qa-source-{lane.entry.name}") for lane in lanes
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def _run_source(shared: _Shared, lane: _Lane) -> None:
+    config = shared.config
+    options = shared.options
+    metrics = shared.metrics
+    budget = shared.budget
+    relevance_threshold = shared.relevance_threshold
+    accepted_writer = shared.accepted_writer
+    rejected_writer = shared.rejected_writer
+    source = lane.source
+    stats = lane.stats
+    key = lane.entry.name
+    checkpoint_file = checkpoint_path(lane.state_dir)
 
-    checkpoint = load_checkpoint(checkpoint_file) if options.resume else None
+    # In incremental sync mode Exchange decides what is new, so the datetime checkpoint is
+    # neither used as a lower bound nor to skip items (it is still written for inspection).
+    checkpoint = load_checkpoint(checkpoint_file) if options.resume and not options.incremental_sync else None
     since = options.since
     if checkpoint and (since is None or checkpoint.last_sent_at > since):
         since = checkpoint.last_sent_at
-    if options.resume:
+    if options.incremental_sync:
+        logger.info("Incremental sync enabled (%s)", source.name)
+    elif options.resume:
         if checkpoint:
-            log(
-                "Loaded checkpoint "
-                f"(last_sent_at={checkpoint.last_sent_at.isoformat()}, message_id={checkpoint.last_message_id})"
+            logger.info(
+                "Loaded checkpoint (last_sent_at=%s, message_id=%s)",
+                checkpoint.last_sent_at.isoformat(),
+                checkpoint.last_message_id,
             )
         else:
-            log("Resume enabled but no checkpoint file found")
+            logger.info("Resume enabled but no checkpoint file found")
     else:
-        log("Resume disabled; processing from provided time window")
-
-    log("Fetching sent items from Exchange")
-    messages = fetch_sent_items(
-        server=config.exchange_server,
-        email=config.exchange_email,
-        username=config.exchange_username,
-        password=config.exchange_password,
-        since=since,
-        until=options.until,
-        limit=options.limit,
-    )
-    log(f"Fetched {len(messages)} messages")
+        logger.info("Resume disabled; processing from provided time window")
+
+    processed = ProcessedIndex(processed_index_path(lane.state_dir))
+
+    # Exchange orders by datetime_sent only, so messages sharing the checkpoint's sent time can
+    # arrive in any message_id order. Those are left to the processed index; only strictly
+    # older messages are skipped by the checkpoint alone.
+    def before_checkpoint(sent_at: datetime) -> bool:
+        return bool(checkpoint and sent_at < checkpoint.last_sent_at)
 
-    state = new_quality_state()
-    ollama = OllamaClient(config.ollama_base_url, config.ollama_model)
-    log(
-        f"Quality/LLM initialized (dry_run={options.dry_run}, model={config.ollama_model}, min_confidence={config.min_confidence})"
+    def should_skip(sent_at: datetime, message_id: str) -> bool:
+        already_done = before_checkpoint(sent_at) or (options.resume and message_id in processed)
+        if already_done:
+            stats.skipped += 1
+        return already_done
+
+    logger.info("Streaming sent items from %s (page_size=%d)", source.name, config.exchange_page_size)
+    fetched_messages = metrics.timed_iter(
+        "fetch",
+        source.fetch(
+            since=since,
+            until=options.until,
+            limit=options.limit,
+            page_size=config.exchange_page_size,
+            should_skip=should_skip,
+        ),
+    )
+    snapshot: SnapshotWriter | None = None
+    if options.record_snapshot:
+        snapshot = SnapshotWriter(options.record_snapshot)
+        fetched_messages = recording(fetched_messages, snapshot)
+        logger.info("Recording fetched messages to snapshot %s", options.record_snapshot)
+    # Stages are joined by bounded queues, so a fast fetch blocks once its buffer is full
+    # rather than running ahead of the LLM, and memory stays flat for any mailbox size.
+    fetch_capacity = options.stage_queue_size or config.exchange_page_size
+    messages = prefetch(
+        fetched_messages,
+        buffer_size=fetch_capacity,
+        observe_depth=metrics.depth_observer("fetch", fetch_capacity),
     )
 
-    accepted = 0
-    rejected = 0
-    last_processed: tuple[datetime, str] | None = None
+    tracker = CheckpointTracker()
+    saved_watermark: tuple[datetime, str] | None = None
+    commits_since_save = 0
+    last_save = time.monotonic()
+
+    def save_progress() -> None:
+        nonlocal saved_watermark, commits_since_save, last_save
+        # Output, the processed index and the dedupe digests of the flushed pairs are made
+        # durable together, before the checkpoint moves past them.
+        with shared.output_lock:
+            accepted_writer.flush()
+            rejected_writer.flush()
+            if shared.dedupe_index is not None:
+                shared.dedupe_index.commit()
+        processed.commit()
+        commits_since_save = 0
+        last_save = time.monotonic()
+        watermark = tracker.watermark
+        if watermark is None or watermark == saved_watermark:
+            return
+        write_checkpoint(checkpoint_file, Checkpoint(last_sent_at=watermark[0], last_message_id=watermark[1]))
+        saved_watermark = watermark
+        logger.info("Checkpoint updated (last_sent_at=%s, message_id=%s)", watermark[0].isoformat(), watermark[1])
 
-    for message in messages:
-        log(f"Processing message {message.message_id} sent {message.sent_at.isoformat()}")
-        if checkpoint and (message.sent_at, message.message_id) <= (
-            checkpoint.last_sent_at,
-            checkpoint.last_message_id,
+    def finish(members: list[SourceEmail]) -> None:
+        nonlocal commits_since_save
+        for member in members:
+            processed.add(member.message_id)
+            tracker.mark_done((member.sent_at, member.message_id))
+            stats.shadow_gated.discard(member.message_id)
+        commits_since_save += 1
+        if (
+            commits_since_save >= config.checkpoint_every
+            or time.monotonic() - last_save >= config.checkpoint_seconds
         ):
-            log(f"Skipped by checkpoint: {message.message_id}")
-            continue
+            save_progress()
 
-        if last_processed is None or (message.sent_at, message.message_id) > last_processed:
-            last_processed = (message.sent_at, message.message_id)
+    def admitted(stream: Iterable[SourceEmail]) -> Iterator[SourceEmail]:
+        for message in stream:
+            stats.fetched += 1
+            logger.info("Processing message %s sent %s", message.message_id, message.sent_at.isoformat())
+            if before_checkpoint(message.sent_at):
+                logger.info("Skipped by checkpoint: %s", message.message_id)
+                continue
+            tracker.register((message.sent_at, message.message_id))
+            yield message
 
-        pre = preprocess_email_body(message.body)
-        if not pre.has_enough_content:
-            reject = RejectedRecord(
-                reason="insufficient_content",
+    def reject_before_llm(message: SourceEmail, reason: str) -> _Pending:
+        return _Pending(
+            message=message,
+            reject=RejectedRecord(
+                reason=reason,
                 message_id=message.message_id,
                 thread_id=message.thread_id,
                 subject=message.subject,
                 sent_at=message.sent_at,
-            )
-            append_jsonl(rejected_path, reject)
-            rejected += 1
-            log(f"Rejected {message.message_id}: insufficient_content")
-            continue
-        log(f"Preprocess passed for {message.message_id}")
-        log(f"message={message}")
-        log(f"pre.cleaned_text={pre.cleaned_text}")
-
-        prompt = build_user_prompt(message, pre.cleaned_text)
-        log(f"prompt={prompt}")
+            ),
+        )
 
+    def dispatch(
+        message: SourceEmail,
+        prompt: str,
+        members: list[SourceEmail] | None = None,
+        truncation: str = "",
+    ) -> _Pending:
+        logger.debug("prompt=%s", prompt)
+        if truncation:
+            stats.prompts_truncated += 1
+            logger.info("Prompt for %s truncated: %s", message.message_id, truncation)
         if options.dry_run:
-            candidate = LlmResult(
-                question="",
-                answer="",
-                confidence=0.0,
-                extraction_notes="dry_run",
-            )
-            log(f"LLM step skipped for {message.message_id} (dry-run)")
+            return _Pending(message=message, candidate=_DRY_RUN_RESULT, members=members, truncation=truncation)
+        stats.dispatched += 1
+        return _Pending(
+            message=message,
+            future=submit_llm(call_llm, prompt),
+            members=members,
+            truncation=truncation,
+        )
+
+    def submit_llm(fn: Callable[..., Any], *args: Any) -> Future[Any]:
+        future = shared.scheduler.submit(key, fn, *args)
+        if observe_llm_depth is not None:
+            observe_llm_depth(shared.scheduler.pending(key))
+        return future
+
+    def call_llm(prompt: str) -> LlmResult:
+        with metrics.time("llm"):
+            return shared.ollama.extract_qa(prompt)
+
+    def extract_batch(batch_prompt: str, prompts_by_id: dict[str, str]) -> dict[str, LlmResult | LlmError]:
+        results: dict[str, LlmResult | LlmError] = {}
+        try:
+            with metrics.time("llm"):
+                results.update(shared.ollama.extract_qa_batch(batch_prompt, list(prompts_by_id)))
+        except (MalformedBatchResponse, LlmError):
+            pass
+        missing = [message_id for message_id in prompts_by_id if message_id not in results]
+        for message_id in missing:
+            # Per-email failures are kept as values so one bad email does not reject its batch.
+            try:
+                results[message_id] = call_llm(prompts_by_id[message_id])
+            except LlmError as exc:
+                results[message_id] = exc
+        with fallback_lock:
+            stats.batch_fallbacks += len(missing)
+        return results
+
+    def flush_batch() -> None:
+        nonlocal batch_tokens
+        if not batch:
+            return
+        with metrics.time("prompt"):
+            prompts_by_id = {
+                pending.message.message_id: build_user_prompt(prompt_message, text)
+                for pending, prompt_message, text in batch
+            }
+            if len(batch) > 1:
+                batch_prompt = build_batch_prompt([(prompt_message, text) for _, prompt_message, text in batch])
+        if len(batch) == 1:
+            pending = batch[0][0]
+            pending.future = submit_llm(call_llm, prompts_by_id[pending.message.message_id])
         else:
-            candidate = ollama.extract_qa(prompt)
-            log(f"LLM extraction completed for {message.message_id} (confidence={candidate.confidence:.2f})")
+            logger.info("Dispatching batch of %d messages", len(batch))
+            future = submit_llm(extract_batch, batch_prompt, prompts_by_id)
+            for pending, _, _ in batch:
+                pending.batch = future
+        for pending, _, _ in batch:
+            pending.awaiting_batch = False
+        stats.dispatched += 1
+        batch.clear()
+        batch_tokens = 0
 
-        qa, reject = evaluate_candidate(
-            message=message,
-            candidate=candidate,
-            min_confidence=config.min_confidence,
-            state=state,
+    def add_to_batch(
+        message: SourceEmail,
+        prompt_message: SourceEmail,
+        cleaned_text: str,
+        truncation: str,
+    ) -> _Pending:
+        nonlocal batch_tokens
+        if truncation:
+            stats.prompts_truncated += 1
+            logger.info("Prompt for %s truncated: %s", message.message_id, truncation)
+        tokens = estimate_tokens(cleaned_text)
+        if batch and (
+            batch_tokens + tokens > options.batch_token_budget or len(batch) >= options.batch_max_emails
+        ):
+            flush_batch()
+        pending = _Pending(message=message, awaiting_batch=True, truncation=truncation)
+        batch.append((pending, prompt_message, cleaned_text))
+        batch_tokens += tokens
+        return pending
+
+    def dispatch_thread(thread_id: str) -> None:
+        replies = threads.pop(thread_id)
+        thread_tokens.pop(thread_id, None)
+        latest = max(replies, key=lambda reply: (reply[0].sent_at, reply[0].message_id))[0]
+        logger.info("Dispatching thread %s (%d replies)", latest.thread_id, len(replies))
+        with metrics.time("prompt"):
+            fitted, truncation = fit_thread_to_budget(replies, budget)
+            prompt = build_thread_prompt(fitted)
+        enqueue(
+            dispatch(
+                latest,
+                prompt,
+                members=[reply[0] for reply in replies],
+                truncation=truncation,
+            )
         )
 
+    def commit(pending: _Pending) -> None:
+        message = pending.message
+        if pending.reject is not None:
+            write_record(rejected_writer, pending.reject)
+            stats.rejected += 1
+            logger.info("Rejected %s: %s", message.message_id, pending.reject.reason)
+            finish([message])
+            return
+
+        members = pending.members or [message]
+        try:
+            if pending.batch is not None:
+                candidate = pending.batch.result()[message.message_id]
+                if isinstance(candidate, LlmError):
+                    raise candidate
+            elif pending.future is not None:
+                candidate = pending.future.result()
+            else:
+                candidate = pending.candidate
+                logger.info("LLM step skipped for %s (dry-run)", message.message_id)
+        except LlmError as exc:
+            stats.llm_errors += 1
+            logger.warning("LLM extraction failed for %s: %s", message.message_id, exc)
+            write_record(
+                rejected_writer,
+                RejectedRecord(
+                    reason=exc.reason,
+                    message_id=message.message_id,
+                    thread_id=message.thread_id,
+                    subject=message.subject,
+                    sent_at=message.sent_at,
+                    source_message_ids=[member.message_id for member in members] if pending.members else [],
+                    prompt_truncation=pending.truncation,
+                ),
+            )
+            stats.rejected += 1
+            finish(members)
+            return
+        if pending.batch is not None or pending.future is not None:
+            logger.info("LLM extraction completed for %s (confidence=%.2f)", message.message_id, candidate.confidence)
+
+        with metrics.time("quality"), shared.output_lock:
+            qa, reject = evaluate_candidate(
+                message=message,
+                candidate=candidate,
+                min_confidence=config.min_confidence,
+                state=shared.state,
+                source_message_ids=[member.message_id for member in members] if pending.members else None,
+                prompt_truncation=pending.truncation,
+            )
+
         if qa:
-            append_jsonl(accepted_path, qa)
-            accepted += 1
-            log(f"Accepted {message.message_id}")
+            write_record(accepted_writer, qa)
+            stats.accepted += 1
+            if stats.shadow_gated and all(member.message_id in stats.shadow_gated for member in members):
+                stats.relevance_shadow_missed += 1
+            logger.info("Accepted %s", message.message_id)
         else:
-            append_jsonl(rejected_path, reject)
-            rejected += 1
-            log(f"Rejected {message.message_id}: {reject.reason}")
+            write_record(rejected_writer, reject)
+            stats.rejected += 1
+            logger.info("Rejected %s: %s", message.message_id, reject.reason)
+        finish(members)
 
-    finished_at = datetime.now(timezone.utc)
-    manifest = Manifest(
-        run_id=run_id,
-        started_at=started_at,
-        finished_at=finished_at,
-        total_processed=len(messages),
-        accepted_count=accepted,
-        rejected_count=rejected,
-        dry_run=options.dry_run,
-        model=config.ollama_model,
-        min_confidence=config.min_confidence,
-    )
-    write_manifest(run_dir / "manifest.json", manifest)
-    log("Manifest written")
+    def write_record(writer: JsonlWriter, record: QaRecord | RejectedRecord) -> None:
+        with metrics.time("write"), shared.output_lock:
+            writer.write(record)
 
-    if last_processed:
-        write_checkpoint(
-            checkpoint_file,
-            Checkpoint(last_sent_at=last_processed[0], last_message_id=last_processed[1]),
-        )
-        log(
-            f"Checkpoint updated (last_sent_at={last_processed[0].isoformat()}, message_id={last_processed[1]})"
+    def enqueue(pending: _Pending) -> None:
+        # Messages waiting for their batch to be dispatched are held back, together with
+        # everything behind them, so the commit stage only ever waits on submitted LLM work.
+        held.append(pending)
+        if len(held) > max_in_flight:
+            flush_batch()
+        release()
+
+    def release() -> None:
+        while held and not held[0].awaiting_batch:
+            pending = held.popleft()
+            if committer is not None:
+                committer.put(pending)
+                continue
+            window.append(pending)
+            if observe_commit_depth is not None:
+                observe_commit_depth(len(window))
+            while len(window) > max_in_flight:
+                commit(window.popleft())
+
+    # LLM calls run concurrently, but results are committed strictly in fetch order so that
+    # dedupe decisions and the (sent_at, message_id) checkpoint match a sequential run. The
+    # commit queue is what bounds the LLM work in flight for this source.
+    concurrency = max(1, options.llm_concurrency)
+    use_batches = options.batch_token_budget is not None and not options.dry_run
+    max_in_flight = concurrency * 2 * (max(1, options.batch_max_emails) if use_batches else 1)
+    observe_llm_depth = metrics.depth_observer("llm", max_in_flight)
+    observe_commit_depth = metrics.depth_observer("commit", max_in_flight)
+    held: deque[_Pending] = deque()
+    window: deque[_Pending] = deque()
+    # With one worker per stage (the default) quality checks and writes run inline on this
+    # thread, as a plain sequential loop; otherwise they get a commit thread of their own.
+    committer: BackgroundConsumer[_Pending] | None = None
+    if concurrency > 1 or options.preprocess_workers > 1:
+        committer = BackgroundConsumer(
+            commit,
+            capacity=max_in_flight,
+            name=f"email2qa-commit-{key}",
+            observe_depth=observe_commit_depth,
         )
+    # Thread mode holds cleaned text (not raw bodies) per conversation. A conversation is
+    # dispatched once its first buffered reply falls out of the time window or its text reaches
+    # the token cap; later replies start a new group. Insertion order is first-reply order, so
+    # expired conversations are always at the front.
+    threads: dict[str, list[tuple[SourceEmail, str]]] = {}
+    thread_tokens: dict[str, int] = {}
+    thread_window = timedelta(hours=options.thread_window_hours)
+    # Batch mode packs consecutive single-message prompts into one request up to a token budget.
+    batch: list[tuple[_Pending, SourceEmail, str]] = []
+    batch_tokens = 0
+    fallback_lock = threading.Lock()
+    try:
+        for message, pre in iter_preprocessed(
+            admitted(messages),
+            shared.rules,
+            workers=options.preprocess_workers,
+            observe=metrics.observer("preprocess"),
+            observe_depth=metrics.depth_observer("preprocess", max(1, options.preprocess_workers) * 2 + 1),
+        ):
+            if not pre.has_enough_content:
+                enqueue(reject_before_llm(message, "insufficient_content"))
+                continue
+            if relevance_threshold is not None:
+                score = relevance_score(pre.cleaned_text)
+                if score < relevance_threshold:
+                    if not options.relevance_shadow:
+                        stats.relevance_gated += 1
+                        enqueue(reject_before_llm(message, f"low_relevance:{score:.2f}"))
+                        continue
+                    stats.relevance_shadow_gated += 1
+                    stats.shadow_gated.add(message.message_id)
+            logger.info("Preprocess passed for %s", message.message_id)
+            logger.debug("message=%s", message)
+            logger.debug("pre.cleaned_text=%s", pre.cleaned_text)
 
-    log(f"Run complete (accepted={accepted}, rejected={rejected}, total={len(messages)})")
+            if options.group_threads:
+                while threads:
+                    oldest = next(iter(threads))
+                    if threads[oldest][0][0].sent_at > message.sent_at - thread_window:
+                        break
+                    dispatch_thread(oldest)
+                threads.setdefault(message.thread_id, []).append((message, pre.cleaned_text))
+                thread_tokens[message.thread_id] = thread_tokens.get(message.thread_id, 0) + estimate_tokens(
+                    pre.cleaned_text
+                )
+                if thread_tokens[message.thread_id] >= options.thread_max_tokens:
+                    dispatch_thread(message.thread_id)
+                continue
+            if use_batches:
+                with metrics.time("prompt"):
+                    prompt_message, cleaned_text, truncation = fit_email_to_budget(message, pre.cleaned_text, budget)
+                enqueue(add_to_batch(message, prompt_message, cleaned_text, truncation))
+                continue
+            with metrics.time("prompt"):
+                prompt_message, cleaned_text, truncation = fit_email_to_budget(message, pre.cleaned_text, budget)
+                prompt = build_user_prompt(prompt_message, cleaned_text)
+            enqueue(dispatch(message, prompt, truncation=truncation))
 
-    return str(run_dir)
+        for thread_id in list(threads):
+            dispatch_thread(thread_id)
+
+        flush_batch()
+        release()
+        if committer is not None:
+            committer.close()
+        while window:
+            commit(window.popleft())
+    finally:
+        # The LLM workers are shared with other sources, so this source cancels what has not
+        # started and waits for what has before saving its progress.
+        abandoned = list(held) + list(window) + (committer.abort() if committer is not None else [])
+        started = [
+            future
+            for pending in abandoned
+            for future in (pending.future, pending.batch)
+            if future is not None and not future.cancel()
+        ]
+        wait(started)
+        try:
+            save_progress()
+        finally:
+            messages.close()
+            if snapshot is not None:
+                snapshot.close()
+            processed.close()
+
+    logger.info("Fetched %d messages (%d skipped before body download)", stats.fetched, stats.skipped)
+    # Only reached when every fetched message was committed, so the next sync starts after them.
+    if isinstance(source, ExchangeSyncSource) and source.save_state():
+        logger.info("Sync state saved to %s", source.state_file)
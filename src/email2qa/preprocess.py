@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import re
+from collections.abc import Iterable
 from dataclasses import dataclass
 
-from bs4 import BeautifulSoup
+from email2qa.html_text import HtmlBackend, get_html_backend
 
 _QUOTE_PATTERNS = [
     re.compile(r"^On .+wrote:$", re.IGNORECASE),
@@ -31,11 +32,13 @@ class PreprocessResult:
     has_enough_content: bool
 
 
-def html_to_text(raw_body: str) -> str:
+_DEFAULT_HTML_BACKEND = get_html_backend("auto")
+
+
+def html_to_text(raw_body: str, backend: HtmlBackend | None = None) -> str:
     if "<" not in raw_body and ">" not in raw_body:
         return raw_body
-    soup = BeautifulSoup(raw_body, "html.parser")
-    return soup.get_text("\n")
+    return (backend or _DEFAULT_HTML_BACKEND)(raw_body)
 
 
 def strip_quoted_text(text: str) -> str:
@@ -75,12 +78,61 @@ def normalize_whitespace(text: str) -> str:
     return text.strip()
 
 
-def preprocess_email_body(raw_body: str) -> PreprocessResult:
-    text = html_to_text(raw_body)
-    text = strip_disclaimer(text)
-    text = strip_quoted_text(text)
-    text = trim_signature(text)
-    text = normalize_whitespace(text)
+# Only runs that actually change are matched: single spaces between words are left alone,
+# which is where most of normalize_whitespace's time goes on large bodies.
+_SPACE_RUNS = re.compile(r"[\t ]{2,}|\t")
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+class PreprocessRules:
+    # Compiles the quote and signature rules into one line-level alternation, so cleaning is
+    # a single pass over the lines that stops at the first cutoff. Output matches
+    # strip_disclaimer -> strip_quoted_text -> trim_signature -> normalize_whitespace.
+    # Extra patterns are matched case-insensitively against stripped lines, like the
+    # built-in ones.
+    def __init__(
+        self,
+        quote_patterns: Iterable[str] = (),
+        signature_patterns: Iterable[str] = (),
+        disclaimer_markers: Iterable[str] = (),
+        html_backend: HtmlBackend | None = None,
+    ) -> None:
+        self.html_backend = html_backend
+        line_patterns = [
+            *(pattern.pattern for pattern in _QUOTE_PATTERNS),
+            *quote_patterns,
+            *(pattern.pattern for pattern in _SIGNATURE_PATTERNS),
+            *signature_patterns,
+            r">",
+        ]
+        self._cutoff_line = re.compile("|".join(f"(?:{pattern})" for pattern in line_patterns), re.IGNORECASE)
+
+        # Disclaimers stay plain substring searches in priority order: str.find outperforms
+        # a regex alternation over the same literals.
+        self._markers = tuple(dict.fromkeys([*_DISCLAIMER_MARKERS, *disclaimer_markers]))
+
+    def clean(self, text: str) -> str:
+        for marker in self._markers:
+            index = text.find(marker)
+            if index >= 0:
+                text = text[:index]
+                break
+
+        kept: list[str] = []
+        cutoff_line = self._cutoff_line.match
+        for line in text.splitlines():
+            if cutoff_line(line.strip()):
+                break
+            kept.append(line)
+        return _BLANK_RUNS.sub("\n\n", _SPACE_RUNS.sub(" ", "\n".join(kept))).strip()
+
+
+DEFAULT_RULES = PreprocessRules()
+
+
+def preprocess_email_body(raw_body: str, rules: PreprocessRules | None = None) -> PreprocessResult:
+    rules = rules or DEFAULT_RULES
+    text = rules.clean(html_to_text(raw_body, rules.html_backend))
 
     enough = len(text) >= 50 and len(text.split()) >= 10
     return PreprocessResult(cleaned_text=text, has_enough_content=enough)
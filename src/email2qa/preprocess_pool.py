@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import multiprocessing
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from email2qa.exchange_client import SourceEmail
+from email2qa.preprocess import PreprocessResult, PreprocessRules, preprocess_email_body
+
+DEFAULT_CHUNK_SIZE = 16
+
+_worker_rules: PreprocessRules | None = None
+
+
+def _init_worker(rules: PreprocessRules) -> None:
+    global _worker_rules
+    _worker_rules = rules
+
+
+def _preprocess_chunk(bodies: list[str]) -> list[tuple[PreprocessResult, float]]:
+    timed = []
+    for body in bodies:
+        started = time.perf_counter()
+        result = preprocess_email_body(body, _worker_rules)
+        timed.append((result, time.perf_counter() - started))
+    return timed
+
+
+def iter_preprocessed(
+    messages: Iterable[SourceEmail],
+    rules: PreprocessRules,
+    *,
+    workers: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    observe: Callable[[float], None] | None = None,
+    observe_depth: Callable[[int], None] | None = None,
+) -> Iterator[tuple[SourceEmail, PreprocessResult]]:
+    if workers <= 1:
+        for message in messages:
+            if observe is None:
+                yield message, preprocess_email_body(message.body, rules)
+                continue
+            started = time.perf_counter()
+            result = preprocess_email_body(message.body, rules)
+            observe(time.perf_counter() - started)
+            yield message, result
+        return
+
+    # Rules are shipped once per worker through the initializer; each task carries only the
+    # raw bodies of one chunk and returns results positionally, so SourceEmail objects never
+    # cross the process boundary. Chunks are yielded back in submission order.
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(rules,),
+    )
+    in_flight: deque[tuple[list[SourceEmail], Future[list[tuple[PreprocessResult, float]]]]] = deque()
+
+    def submit(chunk: list[SourceEmail]) -> None:
+        in_flight.append((chunk, pool.submit(_preprocess_chunk, [message.body for message in chunk])))
+        if observe_depth is not None:
+            observe_depth(len(in_flight))
+
+    def drain_head() -> Iterator[tuple[SourceEmail, PreprocessResult]]:
+        chunk, future = in_flight.popleft()
+        for message, (result, seconds) in zip(chunk, future.result()):
+            if observe is not None:
+                observe(seconds)
+            yield message, result
+
+    try:
+        chunk: list[SourceEmail] = []
+        for message in messages:
+            chunk.append(message)
+            if len(chunk) < chunk_size:
+                continue
+            submit(chunk)
+            chunk = []
+            while len(in_flight) > workers * 2:
+                yield from drain_head()
+        if chunk:
+            submit(chunk)
+        while in_flight:
+            yield from drain_head()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
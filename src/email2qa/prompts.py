@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, replace
+
 from email2qa.exchange_client import SourceEmail
 
 SYSTEM_PROMPT = """You extract one user question and one support answer from an outbound support email.
@@ -7,6 +9,20 @@ Return STRICT JSON only. No markdown. No extra keys.
 If no clear question/answer can be extracted, return empty strings and confidence 0.
 """
 
+BATCH_SYSTEM_PROMPT = """You extract one user question and one support answer from each outbound support email.
+Return STRICT JSON only. No markdown. No extra keys.
+Return exactly one result per email, identified by its MessageId.
+If no clear question/answer can be extracted from an email, return empty strings and confidence 0 for it.
+"""
+
+_JSON_SCHEMA_HINT = """JSON schema:
+{
+  "question": "string",
+  "answer": "string",
+  "confidence": 0.0,
+  "extraction_notes": "string"
+}"""
+
 
 def build_user_prompt(message: SourceEmail, cleaned_text: str) -> str:
     return f"""
@@ -22,11 +38,159 @@ MessageId: {message.message_id}
 EmailBody:
 {cleaned_text}
 
+{_JSON_SCHEMA_HINT}
+""".strip()
+
+
+def build_thread_prompt(replies: list[tuple[SourceEmail, str]]) -> str:
+    ordered = sorted(replies, key=lambda reply: (reply[0].sent_at, reply[0].message_id))
+    latest, latest_text = ordered[-1]
+    earlier = "\n---\n".join(
+        f"SentAt: {message.sent_at.isoformat()}\n{text}" for message, text in ordered[:-1]
+    )
+    return f"""
+Extract a single best QA pair from this support conversation. The latest reply is the primary
+source; earlier replies are context only.
+
+Subject: {latest.subject}
+Sender: {latest.sender}
+Recipients: {", ".join(latest.recipients)}
+SentAt: {latest.sent_at.isoformat()}
+ThreadId: {latest.thread_id}
+MessageIds: {", ".join(message.message_id for message, _ in ordered)}
+
+EarlierReplies:
+{earlier or "(none)"}
+
+LatestReply:
+{latest_text}
+
+{_JSON_SCHEMA_HINT}
+""".strip()
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English mail; cheap enough to run per message.
+    return len(text) // 4 + 1
+
+
+def build_batch_prompt(entries: list[tuple[SourceEmail, str]]) -> str:
+    emails = "\n\n".join(
+        f"""=== Email {index} ===
+MessageId: {message.message_id}
+Subject: {message.subject}
+Sender: {message.sender}
+SentAt: {message.sent_at.isoformat()}
+ThreadId: {message.thread_id}
+
+EmailBody:
+{cleaned_text}"""
+        for index, (message, cleaned_text) in enumerate(entries, start=1)
+    )
+    return f"""
+Extract a single best QA pair from each of these {len(entries)} sent emails.
+
+{emails}
+
 JSON schema:
 {{
-  "question": "string",
-  "answer": "string",
-  "confidence": 0.0,
-  "extraction_notes": "string"
+  "results": [
+    {{
+      "message_id": "string",
+      "question": "string",
+      "answer": "string",
+      "confidence": 0.0,
+      "extraction_notes": "string"
+    }}
+  ]
 }}
 """.strip()
+
+
+# Bodies are never squeezed below this, even if headers alone exceed the budget.
+_MIN_BODY_TOKENS = 64
+
+
+@dataclass(frozen=True)
+class PromptBudget:
+    max_tokens: int | None = None
+    max_recipients: int | None = None
+
+
+def truncate_head_tail(text: str, max_tokens: int) -> str:
+    max_chars = max(0, (max_tokens - 1) * 4)
+    if len(text) <= max_chars:
+        return text
+    # Keep the opening (where the answer usually is) and the end (where pasted logs put the
+    # actual error), preferring to cut on line boundaries.
+    keep = max(0, max_chars - 48)
+    head = text[: keep * 2 // 3]
+    tail = text[len(text) - (keep - len(head)) :]
+    newline = head.rfind("\n")
+    if newline >= len(head) * 3 // 4:
+        head = head[:newline]
+    newline = tail.find("\n")
+    if 0 <= newline <= len(tail) // 4:
+        tail = tail[newline + 1 :]
+    omitted = len(text) - len(head) - len(tail)
+    return f"{head.rstrip()}\n[... {omitted} characters omitted ...]\n{tail.lstrip()}"
+
+
+def _cap_recipients(message: SourceEmail, budget: PromptBudget, notes: list[str]) -> SourceEmail:
+    limit = budget.max_recipients
+    if limit is None or len(message.recipients) <= limit:
+        return message
+    hidden = len(message.recipients) - limit
+    notes.append(f"recipients capped at {limit} of {len(message.recipients)}")
+    return replace(message, recipients=[*message.recipients[:limit], f"(+{hidden} more)"])
+
+
+def fit_email_to_budget(
+    message: SourceEmail,
+    cleaned_text: str,
+    budget: PromptBudget,
+) -> tuple[SourceEmail, str, str]:
+    # Returns the message as it should appear in the prompt, the (possibly truncated) body and a
+    # note describing what was cut, empty if nothing was.
+    notes: list[str] = []
+    message = _cap_recipients(message, budget, notes)
+    if budget.max_tokens is not None:
+        allowed = max(budget.max_tokens - estimate_tokens(build_user_prompt(message, "")), _MIN_BODY_TOKENS)
+        if estimate_tokens(cleaned_text) > allowed:
+            truncated = truncate_head_tail(cleaned_text, allowed)
+            notes.append(f"body truncated from {len(cleaned_text)} to {len(truncated)} characters")
+            cleaned_text = truncated
+    return message, cleaned_text, "; ".join(notes)
+
+
+def fit_thread_to_budget(
+    replies: list[tuple[SourceEmail, str]],
+    budget: PromptBudget,
+) -> tuple[list[tuple[SourceEmail, str]], str]:
+    ordered = sorted(replies, key=lambda reply: (reply[0].sent_at, reply[0].message_id))
+    latest, latest_text = ordered[-1]
+    notes: list[str] = []
+    latest = _cap_recipients(latest, budget, notes)
+    if budget.max_tokens is None:
+        return [*ordered[:-1], (latest, latest_text)], "; ".join(notes)
+
+    # The latest reply is truncated like a single email; earlier replies are context and are
+    # kept newest-first while they fit in what is left.
+    overhead = estimate_tokens(build_thread_prompt([(latest, "")]))
+    allowed = max(budget.max_tokens - overhead, _MIN_BODY_TOKENS)
+    if estimate_tokens(latest_text) > allowed:
+        truncated = truncate_head_tail(latest_text, allowed)
+        notes.append(f"latest reply truncated from {len(latest_text)} to {len(truncated)} characters")
+        latest_text = truncated
+    remaining = budget.max_tokens - overhead - estimate_tokens(latest_text)
+    kept: list[tuple[SourceEmail, str]] = []
+    for message, text in reversed(ordered[:-1]):
+        cost = estimate_tokens(f"SentAt: {message.sent_at.isoformat()}\n{text}\n---\n")
+        if cost > remaining:
+            break
+        kept.append((message, text))
+        remaining -= cost
+    dropped = len(ordered) - 1 - len(kept)
+    if dropped:
+        notes.append(f"dropped {dropped} earlier replies")
+    return [*reversed(kept), (latest, latest_text)], "; ".join(notes)
@@ -1,21 +1,38 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Protocol
 
 from pydantic import ValidationError
 
 from email2qa.exchange_client import SourceEmail
 from email2qa.llm_client import LlmResult
+from email2qa.near_dedupe import NearDuplicateIndex
 from email2qa.schema import QaRecord, RejectedRecord
 
 
-@dataclass
-class QualityState:
-    seen_pairs: set[tuple[str, str]]
+class PairIndex(Protocol):
+    def __contains__(self, key: object) -> bool: ...
+
+    def add(self, key: tuple[str, str]) -> None: ...
 
 
-def new_quality_state() -> QualityState:
-    return QualityState(seen_pairs=set())
+@dataclass
+class QualityState:
+    seen_pairs: PairIndex
+    near_duplicates: NearDuplicateIndex | None = None
+
+
+def new_quality_state(
+    seen_pairs: PairIndex | None = None,
+    near_duplicate_threshold: float | None = None,
+) -> QualityState:
+    return QualityState(
+        seen_pairs=seen_pairs if seen_pairs is not None else set(),
+        near_duplicates=(
+            NearDuplicateIndex(near_duplicate_threshold) if near_duplicate_threshold is not None else None
+        ),
+    )
 
 
 def evaluate_candidate(
@@ -24,34 +41,51 @@ def evaluate_candidate(
     candidate: LlmResult,
     min_confidence: float,
     state: QualityState,
+    source_message_ids: list[str] | None = None,
+    prompt_truncation: str = "",
 ) -> tuple[QaRecord | None, RejectedRecord | None]:
+    sources = source_message_ids or []
     if not candidate.question or not candidate.answer:
-        return None, _reject(message, "missing_question_or_answer", candidate)
+        return None, _reject(message, "missing_question_or_answer", candidate, sources, prompt_truncation)
 
     if candidate.confidence < min_confidence:
-        return None, _reject(message, f"low_confidence:{candidate.confidence:.2f}", candidate)
+        reason = f"low_confidence:{candidate.confidence:.2f}"
+        return None, _reject(message, reason, candidate, sources, prompt_truncation)
 
     dedupe_key = (_normalize_key(candidate.question), _normalize_key(candidate.answer))
     if dedupe_key in state.seen_pairs:
-        return None, _reject(message, "duplicate_pair", candidate)
+        return None, _reject(message, "duplicate_pair", candidate, sources, prompt_truncation)
+
+    signature = None
+    if state.near_duplicates is not None:
+        signature = state.near_duplicates.signature(f"{dedupe_key[0]} {dedupe_key[1]}")
+        if state.near_duplicates.find(signature) is not None:
+            return None, _reject(message, "near_duplicate", candidate, sources, prompt_truncation)
+
+    notes = candidate.extraction_notes
+    if prompt_truncation:
+        notes = f"{notes} [prompt truncated: {prompt_truncation}]".strip()
 
     try:
         qa = QaRecord(
             question=candidate.question,
             answer=candidate.answer,
             confidence=candidate.confidence,
-            extraction_notes=candidate.extraction_notes,
+            extraction_notes=notes,
             message_id=message.message_id,
             thread_id=message.thread_id,
             subject=message.subject,
             sent_at=message.sent_at,
             sender=message.sender,
             recipients=message.recipients,
+            source_message_ids=sources,
         )
     except ValidationError:
-        return None, _reject(message, "schema_validation_failed", candidate)
+        return None, _reject(message, "schema_validation_failed", candidate, sources, prompt_truncation)
 
     state.seen_pairs.add(dedupe_key)
+    if state.near_duplicates is not None and signature is not None:
+        state.near_duplicates.add(signature)
     return qa, None
 
 
@@ -59,7 +93,13 @@ def _normalize_key(value: str) -> str:
     return " ".join(value.lower().split())
 
 
-def _reject(message: SourceEmail, reason: str, candidate: LlmResult) -> RejectedRecord:
+def _reject(
+    message: SourceEmail,
+    reason: str,
+    candidate: LlmResult,
+    source_message_ids: list[str],
+    prompt_truncation: str,
+) -> RejectedRecord:
     return RejectedRecord(
         reason=reason,
         message_id=message.message_id,
@@ -68,4 +108,6 @@ def _reject(message: SourceEmail, reason: str, candidate: LlmResult) -> Rejected
         sent_at=message.sent_at,
         candidate_question=candidate.question,
         candidate_answer=candidate.answer,
+        source_message_ids=source_message_ids,
+        prompt_truncation=prompt_truncation,
     )
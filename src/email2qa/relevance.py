@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import math
+import re
+from collections.abc import Mapping
+
+DEFAULT_RELEVANCE_THRESHOLD = 0.3
+
+_SOLUTION_TERMS = re.compile(
+    r"\b(?:try|run|restart|reboot|reinstall|install|configure|enable|disable|update|upgrade|click|select"
+    r"|open|set|change|clear|delete|remove|add|check|verify|fix(?:ed)?|resolved?|workaround|caused?"
+    r"|because|error|issue|problem|setting|option|version|log|steps?)\b"
+)
+_ACKNOWLEDGEMENT_TERMS = re.compile(
+    r"\b(?:thanks|thank you|you'?re welcome|see attached|please find attached|attached (?:is|are)"
+    r"|will do|noted|got it|sounds good|no problem|received)\b"
+)
+_LOGISTICS_TERMS = re.compile(
+    r"\b(?:meeting|calendar|invite|invitation|reschedule|call me|available|availability|zoom|teams"
+    r"|dial-in|out of (?:the )?office|lunch|tomorrow|next week)\b"
+)
+_TECHNICAL_TOKENS = re.compile(r"https?://|[A-Za-z]:\\|(?<!\w)/\w+|\b\w+\.\w{2,4}\b|\b\d+\.\d+\b|`|=")
+_LIST_LINES = re.compile(r"^\s*(?:\d+[.)]|[-*\u2022])\s+", re.MULTILINE)
+
+# Hand-tuned weights over the features below; each feature is scaled to [0, 1].
+DEFAULT_WEIGHTS: Mapping[str, float] = {
+    "bias": -1.0,
+    "length": 1.5,
+    "solution": 4.0,
+    "technical": 1.5,
+    "steps": 1.5,
+    "acknowledgement": -2.5,
+    "logistics": -2.5,
+}
+
+
+def relevance_features(text: str) -> dict[str, float]:
+    lowered = text.lower()
+    return {
+        "bias": 1.0,
+        "length": min(len(lowered.split()), 200) / 200,
+        "solution": min(len(_SOLUTION_TERMS.findall(lowered)), 5) / 5,
+        "technical": min(len(_TECHNICAL_TOKENS.findall(lowered)), 5) / 5,
+        "steps": min(len(_LIST_LINES.findall(lowered)), 5) / 5,
+        "acknowledgement": min(len(_ACKNOWLEDGEMENT_TERMS.findall(lowered)), 3) / 3,
+        "logistics": min(len(_LOGISTICS_TERMS.findall(lowered)), 3) / 3,
+    }
+
+
+def relevance_score(text: str, weights: Mapping[str, float] = DEFAULT_WEIGHTS) -> float:
+    features = relevance_features(text)
+    logit = sum(weights.get(name, 0.0) * value for name, value in features.items())
+    return 1.0 / (1.0 + math.exp(-logit))
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any
+
+
+class FairScheduler:
+    # LLM worker threads shared by every source of a run. Each source has its own FIFO and
+    # workers take from the sources in round-robin order, so a mailbox with a deep backlog
+    # delays another mailbox's next request by at most one turn instead of its whole queue.
+    def __init__(self, workers: int, *, thread_name_prefix: str = "email2qa-llm") -> None:
+        self._queues: dict[str, deque[tuple[Future[Any], Callable[..., Any], tuple[Any, ...]]]] = {}
+        self._turns: deque[str] = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{thread_name_prefix}-{index}", daemon=True)
+            for index in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key: str, fn: Callable[..., Any], *args: Any) -> Future[Any]:
+        future: Future[Any] = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("cannot schedule new work after shutdown")
+            queue = self._queues.setdefault(key, deque())
+            if not queue:
+                self._turns.append(key)
+            queue.append((future, fn, args))
+            self._condition.notify()
+        return future
+
+    def pending(self, key: str | None = None) -> int:
+        with self._condition:
+            if key is not None:
+                return len(self._queues.get(key, ()))
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _next(self) -> tuple[Future[Any], Callable[..., Any], tuple[Any, ...]] | None:
+        with self._condition:
+            while not self._turns and not self._closed:
+                self._condition.wait()
+            if not self._turns:
+                return None
+            key = self._turns.popleft()
+            queue = self._queues[key]
+            work = queue.popleft()
+            if queue:
+                self._turns.append(key)
+            return work
+
+    def _work(self) -> None:
+        while (work := self._next()) is not None:
+            future, fn, args = work
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args)
+            except BaseException as exc:  # noqa: BLE001 - delivered through the future
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def shutdown(self, *, wait: bool = True, cancel_futures: bool = False) -> None:
+        # Without cancel_futures the workers drain every queue before exiting.
+        with self._condition:
+            self._closed = True
+            if cancel_futures:
+                for queue in self._queues.values():
+                    for future, _, _ in queue:
+                        future.cancel()
+                    queue.clear()
+                self._turns.clear()
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
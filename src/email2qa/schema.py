@@ -19,6 +19,7 @@ class QaRecord(BaseModel):
     sent_at: datetime
     sender: str = Field(min_length=1)
     recipients: list[str] = Field(default_factory=list)
+    source_message_ids: list[str] = Field(default_factory=list)
 
     @field_validator("question", "answer", "extraction_notes")
     @classmethod
@@ -36,6 +37,51 @@ class RejectedRecord(BaseModel):
     sent_at: datetime
     candidate_question: str = ""
     candidate_answer: str = ""
+    source_message_ids: list[str] = Field(default_factory=list)
+    prompt_truncation: str = ""
+
+
+class StageTiming(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    count: int
+    total_seconds: float
+    mean_seconds: float
+    p50_seconds: float
+    p95_seconds: float
+    p99_seconds: float
+    max_seconds: float
+
+
+class QueueDepth(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    capacity: int
+    samples: int
+    mean_depth: float
+    max_depth: int
+
+
+class OutputShard(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    kind: str
+    file: str
+    compression: str = "none"
+    records: int
+    uncompressed_bytes: int
+    bytes: int
+
+
+class SourceSummary(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    name: str
+    total_processed: int
+    accepted_count: int
+    rejected_count: int
+    skipped_count: int = 0
+    llm_errors: int = 0
 
 
 class Manifest(BaseModel):
@@ -47,6 +93,20 @@ class Manifest(BaseModel):
     total_processed: int
     accepted_count: int
     rejected_count: int
+    skipped_count: int = 0
+    llm_cache_hits: int = 0
+    llm_cache_misses: int = 0
+    prompts_dispatched: int = 0
+    batch_fallbacks: int = 0
+    relevance_gated: int = 0
+    relevance_shadow_gated: int = 0
+    relevance_shadow_missed: int = 0
+    prompts_truncated: int = 0
+    llm_errors: int = 0
+    stage_timings: dict[str, StageTiming] = Field(default_factory=dict)
+    queue_depths: dict[str, QueueDepth] = Field(default_factory=dict)
+    sources: list[SourceSummary] = Field(default_factory=list)
+    output_shards: list[OutputShard] = Field(default_factory=list)
     dry_run: bool
     model: str
     min_confidence: float
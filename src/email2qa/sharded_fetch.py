@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import logging
+import math
+import pickle
+import tempfile
+import threading
+import zlib
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from itertools import pairwise
+from pathlib import Path
+from typing import Any
+
+from email2qa.exchange_client import (
+    DEFAULT_FOLDER,
+    DEFAULT_PAGE_SIZE,
+    SkipPredicate,
+    SourceEmail,
+    _normalize_filter_datetime,
+    connect_account,
+    iter_sent_items,
+    resolve_folder,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 4
+# Dense windows are bisected until they fit the per-shard target or get this narrow.
+_MIN_SHARD_WIDTH = timedelta(hours=1)
+
+
+@dataclass(frozen=True)
+class Shard:
+    start: datetime
+    end: datetime
+    count: int
+    # Shards are half-open [start, end) so adjacent ones never overlap; the last one also
+    # includes its end, matching the inclusive --until of a sequential fetch.
+    inclusive_end: bool = False
+
+
+def _count(folder: Any, start: datetime, end: datetime, inclusive_end: bool) -> int:
+    query = folder.filter(datetime_sent__gte=start)
+    if inclusive_end:
+        return query.filter(datetime_sent__lte=end).count()
+    return query.filter(datetime_sent__lt=end).count()
+
+
+def _oldest_sent_at(folder: Any) -> datetime | None:
+    for item in folder.all().order_by("datetime_sent").only("datetime_sent")[:1]:
+        return item.datetime_sent
+    return None
+
+
+def _month_bounds(start: datetime, end: datetime) -> list[datetime]:
+    bounds = [start]
+    cursor = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while True:
+        cursor = (cursor + timedelta(days=32)).replace(day=1)
+        if cursor >= end:
+            break
+        bounds.append(cursor)
+    bounds.append(end)
+    return bounds
+
+
+def plan_shards(
+    account: Any,
+    *,
+    since: datetime | None,
+    until: datetime | None,
+    shards: int,
+    pool: ThreadPoolExecutor,
+    folder: str = DEFAULT_FOLDER,
+) -> list[Shard]:
+    # Start from calendar months, bisect the dense ones, then merge neighbours back together
+    # until each shard holds roughly total/shards items. Counts are ID-only FindItem pages.
+    source_folder = resolve_folder(account, folder)
+    start = _normalize_filter_datetime(since) or _oldest_sent_at(source_folder)
+    end = _normalize_filter_datetime(until) or datetime.now(timezone.utc)
+    if start is None or start > end:
+        return []
+    bounds = _month_bounds(start, end)
+    windows = [
+        Shard(start=low, end=high, count=0, inclusive_end=index == len(bounds) - 2)
+        for index, (low, high) in enumerate(pairwise(bounds))
+    ]
+    counts = pool.map(lambda window: _count(source_folder, window.start, window.end, window.inclusive_end), windows)
+    windows = [replace(window, count=count) for window, count in zip(windows, counts)]
+    total = sum(window.count for window in windows)
+    if not total:
+        return []
+    target = max(1, math.ceil(total / max(1, shards)))
+
+    while True:
+        dense = [
+            index
+            for index, window in enumerate(windows)
+            if window.count > target and window.end - window.start >= 2 * _MIN_SHARD_WIDTH
+        ]
+        if not dense:
+            break
+        middles = {index: windows[index].start + (windows[index].end - windows[index].start) / 2 for index in dense}
+        # Only the first half is counted; the second half is the remainder.
+        halves = [(windows[index].start, middles[index]) for index in dense]
+        firsts = dict(zip(dense, pool.map(lambda bounds: _count(source_folder, *bounds, False), halves)))
+        split: list[Shard] = []
+        for index, window in enumerate(windows):
+            if index not in middles:
+                split.append(window)
+                continue
+            split.append(Shard(start=window.start, end=middles[index], count=firsts[index]))
+            split.append(replace(window, start=middles[index], count=window.count - firsts[index]))
+        windows = split
+
+    planned: list[Shard] = []
+    for window in windows:
+        if planned and planned[-1].count + window.count <= target:
+            previous = planned[-1]
+            planned[-1] = replace(
+                previous, end=window.end, count=previous.count + window.count, inclusive_end=window.inclusive_end
+            )
+        else:
+            planned.append(window)
+    return planned
+
+
+class _Spool:
+    # Disk-backed, append-only buffer for one shard. The fetch thread appends compressed records
+    # while the merge reads them back in order, so shards ahead of the one being consumed keep
+    # downloading at full speed without holding their bodies in memory.
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._handle = path.open("wb")
+        self._frames: list[tuple[int, int]] = []
+        self._size = 0
+        self._condition = threading.Condition()
+        self._finished = False
+        self._error: BaseException | None = None
+
+    def append(self, message: SourceEmail) -> None:
+        frame = zlib.compress(pickle.dumps(message), 1)
+        self._handle.write(frame)
+        self._handle.flush()
+        with self._condition:
+            self._frames.append((self._size, len(frame)))
+            self._size += len(frame)
+            self._condition.notify_all()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self._handle.close()
+        with self._condition:
+            self._finished = True
+            self._error = error
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        self._handle.close()
+
+    def read(self) -> Iterator[SourceEmail]:
+        with self._path.open("rb") as handle:
+            position = 0
+            while True:
+                with self._condition:
+                    while position >= len(self._frames) and not self._finished:
+                        self._condition.wait()
+                    if position >= len(self._frames):
+                        if self._error is not None:
+                            raise self._error
+                        return
+                    offset, length = self._frames[position]
+                handle.seek(offset)
+                yield pickle.loads(zlib.decompress(handle.read(length)))
+                position += 1
+
+
+def iter_sharded_items(
+    account: Any,
+    *,
+    email: str,
+    since: datetime | None,
+    until: datetime | None,
+    shards: int,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    should_skip: SkipPredicate | None = None,
+    folder: str = DEFAULT_FOLDER,
+) -> Iterator[SourceEmail]:
+    # Shards cover consecutive, disjoint time ranges and each is fetched oldest first, so
+    # reading them back one after another yields exactly the sequential sent order.
+    stop = threading.Event()
+    skip_lock = threading.Lock()
+
+    def skip(sent_at: datetime, message_id: str) -> bool:
+        with skip_lock:
+            return bool(should_skip and should_skip(sent_at, message_id))
+
+    def fetch_shard(shard: Shard, spool: _Spool) -> None:
+        try:
+            for message in iter_sent_items(
+                account,
+                email=email,
+                since=shard.start,
+                until=shard.end,
+                until_exclusive=not shard.inclusive_end,
+                limit=None,
+                page_size=page_size,
+                should_skip=skip if should_skip else None,
+                folder=folder,
+            ):
+                if stop.is_set():
+                    break
+                spool.append(message)
+        except BaseException as exc:  # noqa: BLE001 - re-raised when the merge reaches this shard
+            spool.finish(exc)
+            return
+        spool.finish()
+
+    pool = ThreadPoolExecutor(max_workers=max(1, max_connections), thread_name_prefix="email2qa-fetch")
+    spool_dir = tempfile.TemporaryDirectory(prefix="email2qa-shards-")
+    spools: list[_Spool] = []
+    try:
+        planned = plan_shards(account, since=since, until=until, shards=shards, pool=pool, folder=folder)
+        logger.info("Fetching %d shards over up to %d connections", len(planned), max_connections)
+        for index, shard in enumerate(planned):
+            logger.debug(
+                "Shard %d: %s .. %s (~%d items)", index, shard.start.isoformat(), shard.end.isoformat(), shard.count
+            )
+            spool = _Spool(Path(spool_dir.name) / f"shard-{index}.bin")
+            spools.append(spool)
+            pool.submit(fetch_shard, shard, spool)
+        for spool in spools:
+            yield from spool.read()
+    finally:
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        # Shards cancelled before they started still hold an open spool file.
+        for spool in spools:
+            spool.close()
+        spool_dir.cleanup()
+
+
+def fetch_sharded_sent_items(
+    *,
+    server: str,
+    email: str,
+    username: str,
+    password: str,
+    since: datetime | None,
+    until: datetime | None,
+    shards: int,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    should_skip: SkipPredicate | None = None,
+    folder: str = DEFAULT_FOLDER,
+) -> Iterator[SourceEmail]:
+    account = connect_account(
+        server=server, email=email, username=username, password=password, max_connections=max_connections
+    )
+    yield from iter_sharded_items(
+        account,
+        email=email,
+        since=since,
+        until=until,
+        shards=shards,
+        max_connections=max_connections,
+        page_size=page_size,
+        should_skip=should_skip,
+        folder=folder,
+    )
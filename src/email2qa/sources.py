@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import zlib
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Protocol, Self
+
+from email2qa.checkpoint import SyncState, load_sync_state, write_sync_state
+from email2qa.config import AppConfig
+from email2qa.exchange_client import (
+    DEFAULT_FOLDER,
+    DEFAULT_PAGE_SIZE,
+    SkipPredicate,
+    SourceEmail,
+    SyncProgress,
+    _normalize_filter_datetime,
+    connect_account,
+    fetch_sent_items,
+    iter_synced_items,
+)
+from email2qa.sharded_fetch import DEFAULT_MAX_CONNECTIONS, fetch_sharded_sent_items
+
+SNAPSHOT_PREFIX = "snapshot:"
+_INDEX_SUFFIX = ".idx"
+_SOURCE_NAME = re.compile(r"[A-Za-z0-9._-]+")
+_SOURCE_KEYS = {"name", "source", "server", "email", "username", "password_env", "folder"}
+
+
+class MailSource(Protocol):
+    @property
+    def name(self) -> str: ...
+
+    def fetch(
+        self,
+        *,
+        since: datetime | None,
+        until: datetime | None,
+        limit: int | None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        should_skip: SkipPredicate | None = None,
+    ) -> Iterator[SourceEmail]: ...
+
+
+@dataclass(frozen=True)
+class ExchangeSource:
+    server: str
+    email: str
+    username: str
+    password: str
+    # More than one shard fetches time windows concurrently (see sharded_fetch); a --limit run
+    # stays sequential because the limit applies to the oldest items overall.
+    shards: int = 1
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+    folder: str = DEFAULT_FOLDER
+
+    @property
+    def name(self) -> str:
+        if self.folder == DEFAULT_FOLDER:
+            return f"Exchange ({self.email})"
+        return f"Exchange ({self.email}, {self.folder})"
+
+    def fetch(
+        self,
+        *,
+        since: datetime | None,
+        until: datetime | None,
+        limit: int | None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        should_skip: SkipPredicate | None = None,
+    ) -> Iterator[SourceEmail]:
+        if self.shards > 1 and not (limit and limit > 0):
+            return fetch_sharded_sent_items(
+                server=self.server,
+                email=self.email,
+                username=self.username,
+                password=self.password,
+                since=since,
+                until=until,
+                shards=self.shards,
+                max_connections=self.max_connections,
+                page_size=page_size,
+                should_skip=should_skip,
+                folder=self.folder,
+            )
+        return fetch_sent_items(
+            server=self.server,
+            email=self.email,
+            username=self.username,
+            password=self.password,
+            since=since,
+            until=until,
+            limit=limit,
+            page_size=page_size,
+            should_skip=should_skip,
+            folder=self.folder,
+        )
+
+
+# Incremental mode: instead of a datetime-filtered FindItem over the whole folder, ask Exchange
+# for the changes since the stored SyncFolderItems state. The new state is only written by
+# save_state(), which the pipeline calls after the run's output and processed index are durable;
+# a crashed run therefore re-syncs the same delta and the processed index skips what was done.
+class ExchangeSyncSource:
+    def __init__(
+        self,
+        *,
+        server: str,
+        email: str,
+        username: str,
+        password: str,
+        state_file: Path,
+        use_stored_state: bool = True,
+        folder: str = DEFAULT_FOLDER,
+    ) -> None:
+        self.server = server
+        self.email = email
+        self.username = username
+        self.password = password
+        self.state_file = state_file
+        self.folder = folder
+        stored = load_sync_state(state_file) if use_stored_state else None
+        # A saved state belongs to one folder; switching folders starts a fresh sync.
+        if stored is not None and stored.folder != folder:
+            stored = None
+        self.stored_state = stored.sync_state if stored else None
+        self._progress = SyncProgress()
+
+    @property
+    def name(self) -> str:
+        mode = "incremental" if self.stored_state else "initial"
+        return f"Exchange sync ({self.email}, {self.folder}, {mode})"
+
+    def fetch(
+        self,
+        *,
+        since: datetime | None,
+        until: datetime | None,
+        limit: int | None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        should_skip: SkipPredicate | None = None,
+    ) -> Iterator[SourceEmail]:
+        self._progress = SyncProgress()
+        account = connect_account(
+            server=self.server, email=self.email, username=self.username, password=self.password
+        )
+        yield from iter_synced_items(
+            account,
+            email=self.email,
+            sync_state=self.stored_state,
+            progress=self._progress,
+            since=since,
+            until=until,
+            limit=limit,
+            page_size=page_size,
+            should_skip=should_skip,
+            folder=self.folder,
+        )
+
+    def save_state(self) -> bool:
+        if not self._progress.complete or not self._progress.sync_state:
+            return False
+        write_sync_state(
+            self.state_file,
+            SyncState(folder=self.folder, sync_state=self._progress.sync_state, updated_at=datetime.now(timezone.utc)),
+        )
+        return True
+
+
+def snapshot_index_path(path: str | Path) -> Path:
+    return Path(f"{path}{_INDEX_SUFFIX}")
+
+
+# A snapshot is a data file of individually zlib-compressed JSON records plus a JSONL index of
+# (offset, length, sent_at, message_id). Filtering and skip checks run on the index alone, and
+# records are decompressed straight from a memory map, so replays mirror Exchange's
+# metadata-first fetch without reading bodies that are never used.
+class SnapshotWriter:
+    def __init__(self, path: str | Path) -> None:
+        self._path = Path(path)
+        self._index_path = snapshot_index_path(self._path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._data: IO[bytes] = self._temp(self._path).open("wb")
+        self._index: IO[str] = self._temp(self._index_path).open("w", encoding="utf-8")
+        self._offset = 0
+        self.records_written = 0
+
+    @staticmethod
+    def _temp(path: Path) -> Path:
+        return path.with_name(f"{path.name}.tmp")
+
+    def write(self, message: SourceEmail) -> None:
+        record = asdict(message)
+        record["sent_at"] = message.sent_at.isoformat()
+        frame = zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        self._data.write(frame)
+        entry = {
+            "offset": self._offset,
+            "length": len(frame),
+            "sent_at": record["sent_at"],
+            "message_id": message.message_id,
+        }
+        self._index.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._offset += len(frame)
+        self.records_written += 1
+
+    def close(self) -> None:
+        if self._data.closed:
+            return
+        self._data.close()
+        self._index.close()
+        # Data first: an index never points past the end of the data file it is paired with.
+        os.replace(self._temp(self._path), self._path)
+        os.replace(self._temp(self._index_path), self._index_path)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def recording(messages: Iterator[SourceEmail], writer: SnapshotWriter) -> Iterator[SourceEmail]:
+    for message in messages:
+        writer.write(message)
+        yield message
+
+
+@dataclass(frozen=True)
+class _IndexEntry:
+    offset: int
+    length: int
+    sent_at: datetime
+    message_id: str
+
+
+@dataclass(frozen=True)
+class SnapshotSource:
+    path: Path
+
+    @property
+    def name(self) -> str:
+        return f"snapshot {self.path}"
+
+    def _entries(self) -> list[_IndexEntry]:
+        entries = []
+        with snapshot_index_path(self.path).open("r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                raw = json.loads(line)
+                entries.append(
+                    _IndexEntry(
+                        offset=raw["offset"],
+                        length=raw["length"],
+                        sent_at=datetime.fromisoformat(raw["sent_at"]),
+                        message_id=raw["message_id"],
+                    )
+                )
+        entries.sort(key=lambda entry: (entry.sent_at, entry.message_id))
+        return entries
+
+    def fetch(
+        self,
+        *,
+        since: datetime | None,
+        until: datetime | None,
+        limit: int | None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        should_skip: SkipPredicate | None = None,
+    ) -> Iterator[SourceEmail]:
+        since = _normalize_filter_datetime(since)
+        until = _normalize_filter_datetime(until)
+        entries = [
+            entry
+            for entry in self._entries()
+            if (since is None or entry.sent_at >= since) and (until is None or entry.sent_at <= until)
+        ]
+        if limit and limit > 0:
+            entries = entries[:limit]
+        if not entries:
+            return
+
+        with self.path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for entry in entries:
+                if should_skip and should_skip(entry.sent_at, entry.message_id):
+                    continue
+                record = json.loads(zlib.decompress(data[entry.offset : entry.offset + entry.length]))
+                record["sent_at"] = datetime.fromisoformat(record["sent_at"])
+                yield SourceEmail(**record)
+
+
+def source_state_dir(spec: str, output_dir: str) -> str:
+    # Snapshot replays keep their own checkpoint and processed index, so experiments never
+    # advance (or get skipped by) the production Exchange state.
+    if spec.startswith(SNAPSHOT_PREFIX):
+        return str(Path(output_dir) / "snapshot-state" / Path(spec[len(SNAPSHOT_PREFIX) :]).name)
+    return output_dir
+
+
+def open_source(
+    spec: str,
+    config: AppConfig,
+    *,
+    sync_state_file: Path | None = None,
+    use_stored_state: bool = True,
+    fetch_shards: int = 1,
+) -> MailSource:
+    # sync_state_file switches the Exchange source to incremental SyncFolderItems mode.
+    if sync_state_file is not None and spec != "exchange":
+        raise ValueError("Incremental sync is only supported for the 'exchange' source")
+    if spec.startswith(SNAPSHOT_PREFIX):
+        path = Path(spec[len(SNAPSHOT_PREFIX) :])
+        if not path.exists() or not snapshot_index_path(path).exists():
+            raise ValueError(f"Snapshot not found (expected {path} and {snapshot_index_path(path)})")
+        return SnapshotSource(path)
+    if spec == "exchange" and sync_state_file is not None:
+        return ExchangeSyncSource(
+            server=config.exchange_server,
+            email=config.exchange_email,
+            username=config.exchange_username,
+            password=config.exchange_password,
+            state_file=sync_state_file,
+            use_stored_state=use_stored_state,
+            folder=config.exchange_folder,
+        )
+    if spec == "exchange":
+        return ExchangeSource(
+            server=config.exchange_server,
+            email=config.exchange_email,
+            username=config.exchange_username,
+            password=config.exchange_password,
+            shards=fetch_shards,
+            max_connections=config.exchange_max_connections,
+            folder=config.exchange_folder,
+        )
+    raise ValueError(f"Unsupported source: {spec!r} (expected 'exchange' or 'snapshot:<path>')")
+
+
+@dataclass(frozen=True)
+class SourceEntry:
+    name: str
+    spec: str
+    config: AppConfig
+
+
+def mailbox_state_dir(output_dir: str, name: str) -> str:
+    # Each source in a multi-source run keeps its own checkpoint, processed index and sync state.
+    return str(Path(output_dir) / "sources" / name)
+
+
+def _read_sources_file(path: str | Path) -> list[dict]:
+    raw = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(raw, list) or not raw:
+        raise ValueError(f"{path} must contain a non-empty JSON list of sources")
+    names: set[str] = set()
+    for item in raw:
+        if not isinstance(item, dict) or not item.get("name"):
+            raise ValueError(f"Every source in {path} needs a 'name'")
+        name = str(item["name"])
+        if not _SOURCE_NAME.fullmatch(name):
+            raise ValueError(f"Source name {name!r} may only contain letters, digits, '.', '_' and '-'")
+        if name in names:
+            raise ValueError(f"Duplicate source name: {name!r}")
+        names.add(name)
+        unknown = sorted(set(item) - _SOURCE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown keys for source {name!r}: {', '.join(unknown)}")
+    return raw
+
+
+def sources_file_state_dirs(path: str | Path, output_dir: str) -> dict[str, str]:
+    return {
+        str(item["name"]): mailbox_state_dir(output_dir, str(item["name"])) for item in _read_sources_file(path)
+    }
+
+
+def load_sources_file(path: str | Path, config: AppConfig) -> list[SourceEntry]:
+    # A JSON list of sources. Exchange settings not given for an entry fall back to the
+    # EMAIL2QA_EXCHANGE_* values; passwords are read from the variable named in password_env.
+    entries: list[SourceEntry] = []
+    for item in _read_sources_file(path):
+        name = str(item["name"])
+        password = config.exchange_password
+        if "password_env" in item:
+            password = os.getenv(str(item["password_env"]), "")
+            if not password:
+                raise ValueError(f"Environment variable {item['password_env']} (source {name!r}) is not set")
+        email = str(item.get("email", config.exchange_email))
+        entry_config = replace(
+            config,
+            exchange_server=str(item.get("server", config.exchange_server)),
+            exchange_email=email,
+            exchange_username=str(item.get("username", email if "email" in item else config.exchange_username)),
+            exchange_password=password,
+            exchange_folder=str(item.get("folder", config.exchange_folder)),
+        )
+        spec = str(item.get("source", "exchange"))
+        if not spec.startswith(SNAPSHOT_PREFIX) and not (
+            entry_config.exchange_server and entry_config.exchange_email and entry_config.exchange_password
+        ):
+            raise ValueError(f"Source {name!r} needs an Exchange server, email and password")
+        entries.append(SourceEntry(name=name, spec=spec, config=entry_config))
+    return entries
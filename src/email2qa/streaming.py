@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import queue
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException) -> None:
+        self.exc = exc
+
+
+def prefetch(
+    items: Iterable[T],
+    buffer_size: int,
+    *,
+    observe_depth: Callable[[int], None] | None = None,
+) -> Iterator[T]:
+    # Drain `items` on a background thread so the consumer can work on buffered items
+    # while the producer blocks on I/O. Producer errors are re-raised in the consumer.
+    buffer: queue.Queue[object] = queue.Queue(maxsize=max(1, buffer_size))
+    stop = threading.Event()
+
+    def put(value: object) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as exc:  # noqa: BLE001 - forwarded to the consumer
+            put(_Failure(exc))
+            return
+        put(_DONE)
+
+    worker = threading.Thread(target=produce, name="email2qa-prefetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            if observe_depth is not None:
+                observe_depth(buffer.qsize())
+            value = buffer.get()
+            if value is _DONE:
+                return
+            if isinstance(value, _Failure):
+                raise value.exc
+            yield value  # type: ignore[misc]
+    finally:
+        stop.set()
+        worker.join(timeout=1.0)
+
+
+class BackgroundConsumer(Generic[T]):
+    # Hands items to `handle` on one background thread through a bounded queue. put() blocks
+    # while the queue is full, so a slow consumer holds the producer back instead of letting
+    # work pile up in memory. After a failure the remaining items are set aside unhandled and
+    # the error is re-raised by the next put() or by close().
+    def __init__(
+        self,
+        handle: Callable[[T], None],
+        *,
+        capacity: int,
+        name: str = "email2qa-consumer",
+        observe_depth: Callable[[int], None] | None = None,
+    ) -> None:
+        self._handle = handle
+        self._observe_depth = observe_depth
+        self._queue: queue.Queue[object] = queue.Queue(maxsize=max(1, capacity))
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self._abandoned: list[T] = []
+        self._worker = threading.Thread(target=self._consume, name=name, daemon=True)
+        self._worker.start()
+
+    def _consume(self) -> None:
+        while True:
+            try:
+                value = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if value is _DONE:
+                return
+            if self._stop.is_set():
+                self._abandoned.append(value)  # type: ignore[arg-type]
+                continue
+            try:
+                self._handle(value)  # type: ignore[arg-type]
+            except BaseException as exc:  # noqa: BLE001 - re-raised by put() or close()
+                self._error = exc
+                self._stop.set()
+
+    def put(self, item: T) -> None:
+        if self._error is not None:
+            raise self._error
+        if self._observe_depth is not None:
+            self._observe_depth(self._queue.qsize())
+        self._queue.put(item)
+
+    def close(self) -> None:
+        # Waits until every queued item has been handled.
+        if self._error is None:
+            self._queue.put(_DONE)
+        self._worker.join()
+        if self._error is not None:
+            raise self._error
+
+    def abort(self) -> list[T]:
+        # Stops after the item in hand and returns the ones that were never handled.
+        self._stop.set()
+        self._worker.join()
+        while True:
+            try:
+                value = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if value is not _DONE:
+                self._abandoned.append(value)  # type: ignore[arg-type]
+        abandoned, self._abandoned = self._abandoned, []
+        return abandoned
@@ -3,10 +3,16 @@ from pathlib import Path
 
 from email2qa.checkpoint import (
     Checkpoint,
+    CheckpointTracker,
+    ProcessedIndex,
+    SyncState,
     checkpoint_path,
     load_checkpoint,
+    load_sync_state,
     reset_checkpoint,
+    sync_state_path,
     write_checkpoint,
+    write_sync_state,
 )
 
 
@@ -52,3 +58,55 @@ def test_reset_checkpoint_missing_file_returns_false(tmp_path: Path) -> None:
     path = tmp_path / "checkpoint.json"
     deleted = reset_checkpoint(path)
     assert deleted is False
+
+
+def test_processed_index_persists_across_instances(tmp_path: Path) -> None:
+    path = tmp_path / "processed.sqlite3"
+    index = ProcessedIndex(path)
+    index.add("m1")
+    index.close()
+
+    reopened = ProcessedIndex(path)
+    assert "m1" in reopened
+    assert "m2" not in reopened
+    reopened.close()
+
+
+def test_write_checkpoint_replaces_atomically(tmp_path: Path) -> None:
+    path = tmp_path / "checkpoint.json"
+    write_checkpoint(path, Checkpoint(last_sent_at=datetime(2026, 2, 1, tzinfo=timezone.utc), last_message_id="m1"))
+    write_checkpoint(path, Checkpoint(last_sent_at=datetime(2026, 2, 2, tzinfo=timezone.utc), last_message_id="m2"))
+
+    loaded = load_checkpoint(path)
+    assert loaded is not None
+    assert loaded.last_message_id == "m2"
+    assert [entry.name for entry in tmp_path.iterdir()] == ["checkpoint.json"]
+
+
+def test_tracker_advances_only_over_contiguous_commits() -> None:
+    keys = [(datetime(2026, 2, 1, hour, tzinfo=timezone.utc), f"m{hour}") for hour in range(1, 5)]
+    tracker = CheckpointTracker()
+    for key in keys:
+        tracker.register(key)
+
+    tracker.mark_done(keys[1])
+    tracker.mark_done(keys[3])
+    assert tracker.watermark is None
+
+    tracker.mark_done(keys[0])
+    assert tracker.watermark == keys[1]
+
+    tracker.mark_done(keys[2])
+    assert tracker.watermark == keys[3]
+    assert tracker.pending == 0
+
+
+def test_sync_state_roundtrip_next_to_checkpoint(tmp_path: Path) -> None:
+    path = sync_state_path(str(tmp_path))
+    state = SyncState(folder="sent", sync_state="H4sIAAAA", updated_at=datetime(2026, 2, 1, tzinfo=timezone.utc))
+
+    assert load_sync_state(path) is None
+    write_sync_state(path, state)
+
+    assert path.parent == checkpoint_path(str(tmp_path)).parent
+    assert load_sync_state(path) == state
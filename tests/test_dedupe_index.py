@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from email2qa.dedupe_index import DedupeIndex
+
+
+def test_dedupe_index_persists_pairs_across_instances(tmp_path: Path) -> None:
+    path = tmp_path / "dedupe.sqlite3"
+    index = DedupeIndex(path)
+    index.add(("how do i reset?", "use the portal."))
+    assert ("how do i reset?", "use the portal.") in index
+    index.close()
+
+    reopened = DedupeIndex(path)
+    assert ("how do i reset?", "use the portal.") in reopened
+    assert ("how do i reset?", "call support.") not in reopened
+    assert len(reopened) == 1
+    reopened.close()
+
+
+def test_dedupe_index_is_opened_lazily(tmp_path: Path) -> None:
+    path = tmp_path / "dedupe.sqlite3"
+    index = DedupeIndex(path)
+    index.close()
+    assert path.exists() is False
+
+
+def test_dedupe_index_additions_are_durable_only_after_commit(tmp_path: Path) -> None:
+    path = tmp_path / "dedupe.sqlite3"
+    writer = DedupeIndex(path)
+    reader = DedupeIndex(path)
+    for index in range(600):
+        writer.add((f"question {index}", "answer"))
+    assert len(reader) == 0
+
+    writer.commit()
+    assert len(reader) == 600
+    writer.close()
+    reader.close()
@@ -0,0 +1,244 @@
+from datetime import datetime, timezone
+from itertools import islice
+from types import SimpleNamespace
+
+from email2qa.exchange_client import (
+    SyncProgress,
+    iter_sent_items,
+    iter_synced_items,
+    resolve_folder,
+)
+
+
+class _FakeQuery:
+    def __init__(self, items: list[SimpleNamespace]) -> None:
+        self.items = items
+        self.page_size = None
+        self.chunk_size = None
+        self.filters: list[dict] = []
+        self.consumed = 0
+        self.sliced_page_size = None
+
+    def all(self) -> "_FakeQuery":
+        return self
+
+    def order_by(self, *_fields: str) -> "_FakeQuery":
+        return self
+
+    def only(self, *_fields: str) -> "_FakeQuery":
+        return self
+
+    def filter(self, **kwargs) -> "_FakeQuery":
+        self.filters.append(kwargs)
+        return self
+
+    def __getitem__(self, key: slice):
+        # Like exchangelib's QuerySet, a slice is a plain iterator with the current settings.
+        self.sliced_page_size = self.page_size
+        return islice(iter(self), key.start, key.stop)
+
+    def __iter__(self):
+        for item in self.items:
+            self.consumed += 1
+            yield item
+
+
+class _FakeAccount:
+    def __init__(self, items: list[SimpleNamespace]) -> None:
+        self.sent = _FakeQuery(items)
+        self._by_id = {item.id: item for item in items}
+        self.fetched_ids: list[str] = []
+
+    def fetch(self, ids, only_fields=None, chunk_size=None):
+        for item_id, _changekey in ids:
+            self.fetched_ids.append(item_id)
+            yield self._by_id[item_id]
+
+
+class _FakeSyncFolder:
+    # Mimics exchangelib's Folder.sync_items: the state is an offset into a change log, and
+    # item_sync_state is only updated once the generator has been exhausted.
+    def __init__(self, changes: list[tuple[str, SimpleNamespace]]) -> None:
+        self.changes = changes
+        self.item_sync_state: str | None = None
+        self.requested_states: list[str | None] = []
+
+    def sync_items(self, sync_state=None, only_fields=None, max_changes_returned=None):
+        self.requested_states.append(sync_state)
+        yield from self.changes[int(sync_state or 0) :]
+        self.item_sync_state = str(len(self.changes))
+
+
+class _FakeSyncAccount(_FakeAccount):
+    def __init__(self, changes: list[tuple[str, SimpleNamespace]]) -> None:
+        super().__init__([item for _change, item in changes])
+        self.sent = _FakeSyncFolder(changes)
+
+
+def _item(index: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=f"id-{index}",
+        changekey=f"ck-{index}",
+        message_id=f"m{index}",
+        conversation_id=SimpleNamespace(id=f"t{index}"),
+        subject=f"Re: ticket {index}",
+        body="body",
+        datetime_sent=datetime(2026, 2, 1, index, tzinfo=timezone.utc),
+        sender=SimpleNamespace(email_address="agent@example.com"),
+        to_recipients=[SimpleNamespace(email_address="user@example.com")],
+    )
+
+
+def test_iter_sent_items_is_lazy_and_sets_page_size() -> None:
+    account = _FakeAccount([_item(i) for i in range(5)])
+
+    stream = iter_sent_items(account, email="agent@example.com", since=None, until=None, limit=None, page_size=2)
+    first = next(stream)
+
+    assert first.message_id == "m0"
+    assert first.thread_id == "t0"
+    assert account.sent.consumed == 2
+    assert account.sent.page_size == 2
+
+
+def test_iter_sent_items_applies_window_and_limit() -> None:
+    account = _FakeAccount([_item(i) for i in range(5)])
+    query = account.sent
+
+    records = list(
+        iter_sent_items(
+            account,
+            email="agent@example.com",
+            since=datetime(2026, 1, 1),
+            until=None,
+            limit=3,
+            page_size=2,
+        )
+    )
+
+    assert [record.message_id for record in records] == ["m0", "m1", "m2"]
+    assert query.sliced_page_size == 2
+    assert query.filters == [{"datetime_sent__gte": datetime(2026, 1, 1, tzinfo=timezone.utc)}]
+
+
+def test_iter_sent_items_skips_before_fetching_bodies() -> None:
+    account = _FakeAccount([_item(i) for i in range(6)])
+
+    records = list(
+        iter_sent_items(
+            account,
+            email="agent@example.com",
+            since=None,
+            until=None,
+            limit=None,
+            page_size=2,
+            should_skip=lambda _sent_at, message_id: message_id in {"m1", "m2", "m4"},
+        )
+    )
+
+    assert [record.message_id for record in records] == ["m0", "m3", "m5"]
+    assert account.fetched_ids == ["id-0", "id-3", "id-5"]
+
+
+def test_iter_synced_items_yields_creations_in_sent_order_and_reports_state() -> None:
+    account = _FakeSyncAccount(
+        [("create", _item(3)), ("create", _item(1)), ("update", _item(0)), ("delete", _item(5)), ("create", _item(2))]
+    )
+    progress = SyncProgress()
+
+    records = list(
+        iter_synced_items(
+            account,
+            email="agent@example.com",
+            sync_state=None,
+            progress=progress,
+            page_size=2,
+            should_skip=lambda _sent_at, message_id: message_id == "m2",
+        )
+    )
+
+    assert [record.message_id for record in records] == ["m1", "m3"]
+    assert account.fetched_ids == ["id-1", "id-3"]
+    assert progress.sync_state == "5"
+    assert progress.complete
+
+
+def test_iter_synced_items_resumes_from_state_and_flags_limited_delta() -> None:
+    account = _FakeSyncAccount([("create", _item(i)) for i in range(4)])
+    progress = SyncProgress()
+
+    records = list(
+        iter_synced_items(account, email="agent@example.com", sync_state="1", progress=progress, limit=2)
+    )
+
+    assert [record.message_id for record in records] == ["m1", "m2"]
+    assert account.sent.requested_states == ["1"]
+    assert progress.sync_state == "4"
+    assert not progress.complete
+
+
+def test_iter_synced_items_limited_runs_move_past_processed_items() -> None:
+    account = _FakeSyncAccount([("create", _item(i)) for i in range(5)])
+    processed: set[str] = set()
+    batches = []
+
+    for _run in range(3):
+        progress = SyncProgress()
+        records = list(
+            iter_synced_items(
+                account,
+                email="agent@example.com",
+                sync_state=None,
+                progress=progress,
+                limit=2,
+                should_skip=lambda _sent_at, message_id: message_id in processed,
+            )
+        )
+        processed.update(record.message_id for record in records)
+        batches.append(([record.message_id for record in records], progress.complete))
+
+    assert batches == [(["m0", "m1"], False), (["m2", "m3"], False), (["m4"], True)]
+
+
+def test_iter_synced_items_keeps_state_when_window_filters_delta() -> None:
+    account = _FakeSyncAccount([("create", _item(i)) for i in range(1, 5)])
+    progress = SyncProgress()
+
+    records = list(
+        iter_synced_items(
+            account,
+            email="agent@example.com",
+            sync_state=None,
+            progress=progress,
+            until=datetime(2026, 2, 1, 2, tzinfo=timezone.utc),
+        )
+    )
+
+    assert [record.message_id for record in records] == ["m1", "m2"]
+    assert progress.sync_state == "4"
+    assert progress.complete
+
+
+def test_iter_synced_items_reports_nothing_until_consumed() -> None:
+    account = _FakeSyncAccount([("create", _item(i)) for i in range(3)])
+    progress = SyncProgress()
+
+    stream = iter_synced_items(account, email="agent@example.com", sync_state=None, progress=progress)
+    next(stream)
+
+    assert progress.sync_state is None
+
+
+def test_resolve_folder_supports_well_known_names_and_paths() -> None:
+    class _Folder:
+        def __init__(self, path: str) -> None:
+            self.path = path
+
+        def __truediv__(self, name: str) -> "_Folder":
+            return _Folder(f"{self.path}/{name}")
+
+    account = SimpleNamespace(sent="sent-folder", inbox="inbox-folder", msg_folder_root=_Folder("root"))
+
+    assert resolve_folder(account) == "sent-folder"
+    assert resolve_folder(account, "Inbox") == "inbox-folder"
+    assert resolve_folder(account, "/Inbox/Escalations/").path == "root/Inbox/Escalations"
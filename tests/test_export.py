@@ -0,0 +1,58 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from email2qa.export import export_run
+from email2qa.output import JsonlWriter
+from email2qa.schema import QaRecord
+
+
+def _record(index: int) -> QaRecord:
+    return QaRecord(
+        question=f"How do I fix issue {index}?",
+        answer=f"Restart the service for issue {index}.",
+        confidence=0.8,
+        message_id=f"m{index}",
+        thread_id=f"t{index}",
+        subject="Re: ticket",
+        sent_at=datetime(2026, 2, 1, tzinfo=timezone.utc),
+        sender="agent@example.com",
+        recipients=["user@example.com"],
+    )
+
+
+def _write_run(run_dir: Path, count: int) -> None:
+    with JsonlWriter(run_dir / "accepted.jsonl", compression="gzip", shard_bytes=1024) as writer:
+        for index in range(count):
+            writer.write(_record(index))
+
+
+def test_export_requires_pyarrow(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    _write_run(tmp_path, 1)
+
+    with pytest.raises(RuntimeError, match="pyarrow is required"):
+        export_run(tmp_path)
+
+
+def test_export_writes_parquet_row_groups(tmp_path: Path) -> None:
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    _write_run(tmp_path, 25)
+
+    path, rows = export_run(tmp_path, row_group_size=10)
+    parquet = pq.ParquetFile(path)
+    table = pq.read_table(path, columns=["question", "answer", "confidence"])
+
+    assert rows == 25
+    assert parquet.num_row_groups == 3
+    assert table.column_names == ["question", "answer", "confidence"]
+    assert table.column("question")[24].as_py() == "How do I fix issue 24?"
+
+
+def test_export_rejects_unknown_format(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        export_run(tmp_path, fmt="csv")
@@ -0,0 +1,43 @@
+import pytest
+
+from email2qa.html_text import (
+    get_html_backend,
+    lxml_to_text,
+    soup_to_text,
+    truncate_at_reply_boundary,
+)
+
+_OUTLOOK = """<html xmlns:v="urn:schemas-microsoft-com:vml"><head><title>Ticket</title>
+<style>p.MsoNormal {margin:0cm}</style><!--[if gte mso 9]><xml><o:shapedefaults /></xml><![endif]--></head>
+<body><div class=WordSection1><p class=MsoNormal>Hello <b>team</b>,<o:p></o:p></p>
+<p class=MsoNormal>Restart the service.<br>Then retry.</p><v:shape><v:imagedata src="x.png"/></v:shape>
+<div id="divRplyFwdMsg"><p><b>From:</b> customer@example.com</p></div><p>Old quoted text</p></div></body></html>"""
+
+
+def test_lxml_backend_skips_head_style_and_vml() -> None:
+    text = lxml_to_text(_OUTLOOK)
+
+    assert "Hello team," in text
+    assert "Restart the service.\nThen retry." in text
+    assert "MsoNormal" not in text
+    assert "Ticket" not in text
+    assert "shapedefaults" not in text
+
+
+def test_lxml_backend_stops_at_reply_boundary() -> None:
+    text = lxml_to_text(_OUTLOOK)
+
+    assert "customer@example.com" not in text
+    assert "Old quoted text" not in text
+    assert truncate_at_reply_boundary("<p>a</p><blockquote>b</blockquote>") == "<p>a</p>"
+
+
+def test_soup_backend_keeps_previous_behavior() -> None:
+    assert soup_to_text("<p>Hello</p><p>World</p>") == "Hello\nWorld"
+
+
+def test_backend_selection() -> None:
+    assert get_html_backend("soup") is soup_to_text
+    assert get_html_backend("auto") is lxml_to_text
+    with pytest.raises(ValueError):
+        get_html_backend("regex")
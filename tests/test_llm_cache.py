@@ -0,0 +1,70 @@
+import sqlite3
+from pathlib import Path
+
+from email2qa.llm_cache import CachedLlmClient, LlmCache, cache_key
+from email2qa.llm_client import LlmResult
+
+_RESULT = LlmResult(question="How do I reset?", answer="Use the portal.", confidence=0.9, extraction_notes="")
+
+
+class _CountingClient:
+    model = "m"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def extract_qa(self, prompt: str) -> LlmResult:
+        self.calls += 1
+        return _RESULT
+
+    def close(self) -> None:
+        pass
+
+
+def test_cache_key_depends_on_model_and_prompt() -> None:
+    assert cache_key("m", "p") == cache_key("m", "p")
+    assert cache_key("m", "p") != cache_key("m2", "p")
+    assert cache_key("m", "p") != cache_key("m", "p2")
+    assert cache_key("m", "p", system_prompt="a") != cache_key("m", "p", system_prompt="b")
+
+
+def test_cached_client_persists_across_instances(tmp_path: Path) -> None:
+    path = tmp_path / "cache.sqlite3"
+    inner = _CountingClient()
+
+    cache = LlmCache(path)
+    assert CachedLlmClient(inner, cache).extract_qa("prompt") == _RESULT
+    cache.close()
+
+    reopened = LlmCache(path)
+    assert CachedLlmClient(inner, reopened).extract_qa("prompt") == _RESULT
+    assert inner.calls == 1
+    assert (reopened.hits, reopened.misses) == (1, 0)
+    reopened.close()
+
+
+def test_cache_evicts_by_size_and_age(tmp_path: Path) -> None:
+    cache = LlmCache(tmp_path / "cache.sqlite3", max_entries=2)
+    for index in range(4):
+        cache.put(f"k{index}", _RESULT)
+    cache.evict()
+    assert len(cache) == 2
+    cache.close()
+
+    expired = LlmCache(tmp_path / "cache.sqlite3", max_age_days=-1)
+    assert len(expired) == 0
+    expired.close()
+
+
+def test_cache_hit_does_not_hold_a_write_lock(tmp_path: Path) -> None:
+    path = tmp_path / "cache.sqlite3"
+    cache = LlmCache(path)
+    cache.put("k", _RESULT)
+    assert cache.get("k") == _RESULT
+
+    other = sqlite3.connect(path, timeout=0)
+    other.execute("INSERT INTO responses (key, result, created_at, used_at) VALUES ('k2', '{}', 0, 0)")
+    other.commit()
+    other.close()
+    assert len(cache) == 2
+    cache.close()
@@ -0,0 +1,222 @@
+import asyncio
+import json
+from typing import Self
+
+import pytest
+import requests
+
+from email2qa.llm_client import (
+    AsyncOllamaClient,
+    GenerationProfile,
+    InvalidOutput,
+    LlmTimeout,
+    MalformedBatchResponse,
+    OllamaClient,
+    TruncatedOutput,
+)
+
+
+class _FakeResponse:
+    def __init__(self, body: dict) -> None:
+        self._body = body
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def json(self) -> dict:
+        return self._body
+
+
+class _FakeSession:
+    def __init__(self) -> None:
+        self.calls: list[dict] = []
+        self.closed = False
+
+    def post(self, url: str, json: dict, timeout: int) -> _FakeResponse:
+        self.calls.append({"url": url, "json": json})
+        content = '{"question": "How do I reset?", "answer": "Use the portal.", "confidence": 0.8}'
+        return _FakeResponse({"message": {"content": content}})
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_extract_qa_reuses_session_and_sends_keep_alive() -> None:
+    session = _FakeSession()
+    client = OllamaClient("http://ollama:11434/", "m", keep_alive="10m", session=session)
+
+    first = client.extract_qa("prompt one")
+    client.extract_qa("prompt two")
+
+    assert first.question == "How do I reset?"
+    assert first.confidence == 0.8
+    assert len(session.calls) == 2
+    assert session.calls[0]["url"] == "http://ollama:11434/api/chat"
+    assert session.calls[0]["json"]["keep_alive"] == "10m"
+
+
+def test_async_client_awaits_pooled_client() -> None:
+    session = _FakeSession()
+    client = AsyncOllamaClient(OllamaClient("http://ollama:11434", "m", session=session))
+
+    async def run() -> list:
+        async with client:
+            return await asyncio.gather(*(client.extract_qa(f"p{i}") for i in range(3)))
+
+    results = asyncio.run(run())
+
+    assert [result.answer for result in results] == ["Use the portal."] * 3
+    assert session.closed is True
+
+
+def test_extract_qa_batch_keeps_only_requested_ids() -> None:
+    session = _FakeSession()
+    content = (
+        '{"results": ['
+        '{"message_id": "m1", "question": "How do I reset?", "answer": "Use the portal.", "confidence": 0.9},'
+        '{"message_id": "other", "question": "q", "answer": "a", "confidence": 0.9}'
+        "]}"
+    )
+    session.post = lambda url, json, timeout: _FakeResponse({"message": {"content": content}})
+    client = OllamaClient("http://ollama:11434", "m", session=session)
+
+    results = client.extract_qa_batch("prompt", ["m1", "m2"])
+
+    assert list(results) == ["m1"]
+    assert results["m1"].answer == "Use the portal."
+
+
+def test_extract_qa_batch_raises_on_malformed_response() -> None:
+    session = _FakeSession()
+    session.post = lambda url, json, timeout: _FakeResponse({"message": {"content": '{"question": "x"}'}})
+    client = OllamaClient("http://ollama:11434", "m", session=session)
+
+    with pytest.raises(MalformedBatchResponse):
+        client.extract_qa_batch("prompt", ["m1"])
+
+
+class _StreamingResponse:
+    def __init__(self, lines: list[str], error: Exception | None = None) -> None:
+        self._lines = lines
+        self._error = error
+        self.read = 0
+        self.closed = False
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def iter_lines(self):
+        for line in self._lines:
+            self.read += 1
+            yield line.encode("utf-8")
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.closed = True
+
+
+class _StreamingSession:
+    def __init__(self, content_chunks: list[str], done_reason: str = "stop") -> None:
+        lines = [json.dumps({"message": {"content": chunk}, "done": False}) for chunk in content_chunks]
+        lines.append(json.dumps({"message": {"content": ""}, "done": True, "done_reason": done_reason}))
+        self.response = _StreamingResponse(lines)
+        self.calls: list[dict] = []
+
+    def post(self, url: str, json: dict, timeout: float, stream: bool = False) -> _StreamingResponse:
+        self.calls.append({"url": url, "json": json, "stream": stream})
+        return self.response
+
+    def close(self) -> None:
+        pass
+
+
+class _BodySession(_FakeSession):
+    def __init__(self, body: dict | None = None, error: Exception | None = None) -> None:
+        super().__init__()
+        self._body = body
+        self._error = error
+
+    def post(self, url: str, json: dict, timeout: float) -> _FakeResponse:
+        self.calls.append({"url": url, "json": json})
+        if self._error is not None:
+            raise self._error
+        return _FakeResponse(self._body)
+
+
+def test_generation_profile_sets_options_and_schema_format() -> None:
+    session = _FakeSession()
+    profile = GenerationProfile(num_predict=256, num_ctx=4096, temperature=0.0, json_schema=True)
+    client = OllamaClient("http://ollama:11434", "m", generation=profile, session=session)
+
+    client.extract_qa("prompt")
+    payload = session.calls[0]["json"]
+
+    assert payload["options"] == {"num_predict": 256, "num_ctx": 4096, "temperature": 0.0}
+    assert payload["format"]["required"] == ["question", "answer", "confidence", "extraction_notes"]
+    assert profile.cache_variant() == "num_ctx=4096,num_predict=256,temperature=0.0,format=schema"
+    assert GenerationProfile().cache_variant() == ""
+
+
+def test_default_profile_keeps_plain_json_mode() -> None:
+    session = _FakeSession()
+    OllamaClient("http://ollama:11434", "m", session=session).extract_qa("prompt")
+
+    assert session.calls[0]["json"]["format"] == "json"
+    assert "options" not in session.calls[0]["json"]
+
+
+def test_streaming_stops_after_first_complete_object() -> None:
+    chunks = ['{"question": "How do I reset?", ', '"answer": "Use the {portal}.", ', '"confidence": 0.8}', " and more"]
+    session = _StreamingSession(chunks + ["filler"] * 50)
+    client = OllamaClient("http://ollama:11434", "m", generation=GenerationProfile(stream=True), session=session)
+
+    result = client.extract_qa("prompt")
+
+    assert result.answer == "Use the {portal}."
+    assert session.calls[0]["stream"] is True
+    assert session.calls[0]["json"]["stream"] is True
+    assert session.response.read == 3
+    assert session.response.closed is True
+
+
+def test_streaming_token_cap_maps_to_truncated_output() -> None:
+    session = _StreamingSession(['{"question": ', '"How do', " I reset", '?", "answer"'])
+    profile = GenerationProfile(num_predict=3, stream=True)
+    client = OllamaClient("http://ollama:11434", "m", generation=profile, session=session)
+
+    with pytest.raises(TruncatedOutput):
+        client.extract_qa("prompt")
+    assert session.response.read == 3
+
+
+def test_streaming_stall_and_malformed_chunks_map_to_llm_errors() -> None:
+    # requests reports a read timeout inside iter_lines as a ConnectionError.
+    stalled = _StreamingSession(['{"question": '])
+    stalled.response = _StreamingResponse(stalled.response._lines[:1], error=requests.ConnectionError("read timed out"))
+    malformed = _StreamingSession([])
+    malformed.response = _StreamingResponse(['{"message": {"content": "{"}, "done": false}', "{not json"])
+    profile = GenerationProfile(stream=True)
+
+    with pytest.raises(LlmTimeout):
+        OllamaClient("http://o", "m", generation=profile, session=stalled).extract_qa("p")
+    with pytest.raises(InvalidOutput):
+        OllamaClient("http://o", "m", generation=profile, session=malformed).extract_qa("p")
+    assert stalled.response.closed and malformed.response.closed
+
+
+def test_non_streaming_failures_map_to_distinct_errors() -> None:
+    truncated = _BodySession({"message": {"content": '{"question": "How'}, "done_reason": "length"})
+    invalid = _BodySession({"message": {"content": "Sure! Here is the JSON"}, "done_reason": "stop"})
+    timed_out = _BodySession(error=requests.ReadTimeout("slow"))
+
+    with pytest.raises(TruncatedOutput):
+        OllamaClient("http://o", "m", session=truncated).extract_qa("p")
+    with pytest.raises(InvalidOutput):
+        OllamaClient("http://o", "m", session=invalid).extract_qa("p")
+    with pytest.raises(LlmTimeout) as excinfo:
+        OllamaClient("http://o", "m", session=timed_out).extract_qa("p")
+    assert excinfo.value.reason == "llm_timeout"
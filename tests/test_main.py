@@ -24,3 +24,18 @@ def test_parser_verbose_defaults_to_false() -> None:
 def test_parser_verbose_can_be_enabled() -> None:
     args = build_parser().parse_args(["--verbose"])
     assert args.verbose is True
+
+
+def test_parser_source_defaults_to_exchange() -> None:
+    assert build_parser().parse_args([]).source == "exchange"
+    assert build_parser().parse_args(["--source", "snapshot:sent.snap"]).source == "snapshot:sent.snap"
+
+
+def test_parser_record_snapshot_defaults_to_none() -> None:
+    assert build_parser().parse_args([]).record_snapshot is None
+    assert build_parser().parse_args(["--record-snapshot", "copy.snap"]).record_snapshot == "copy.snap"
+
+
+def test_parser_llm_cache_is_opt_in() -> None:
+    assert build_parser().parse_args([]).llm_cache is False
+    assert build_parser().parse_args(["--llm-cache"]).llm_cache is True
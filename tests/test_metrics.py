@@ -0,0 +1,86 @@
+from pathlib import Path
+
+from email2qa.metrics import Histogram, StageMetrics, write_prometheus_textfile
+
+
+def test_histogram_quantiles_are_close_to_exact() -> None:
+    histogram = Histogram()
+    samples = [index / 1000 for index in range(1, 1001)]
+    for sample in samples:
+        histogram.observe(sample)
+
+    timing = histogram.timing()
+
+    assert timing.count == 1000
+    assert abs(timing.p50_seconds - 0.5) <= 0.5 * 0.05
+    assert abs(timing.p95_seconds - 0.95) <= 0.95 * 0.05
+    assert abs(timing.p99_seconds - 0.99) <= 0.99 * 0.05
+    assert timing.max_seconds == 1.0
+    assert abs(timing.mean_seconds - 0.5005) < 1e-9
+
+
+def test_disabled_metrics_record_nothing() -> None:
+    metrics = StageMetrics(enabled=False)
+
+    with metrics.time("llm"):
+        pass
+    metrics.observe("write", 0.1)
+    items = list(metrics.timed_iter("fetch", [1, 2, 3]))
+
+    assert items == [1, 2, 3]
+    assert metrics.observer("preprocess") is None
+    assert metrics.summary() == {}
+
+
+def test_enabled_metrics_summarize_in_stage_order() -> None:
+    metrics = StageMetrics()
+
+    with metrics.time("write"):
+        pass
+    assert list(metrics.timed_iter("fetch", ["a", "b"])) == ["a", "b"]
+    observe = metrics.observer("llm")
+    assert observe is not None
+    observe(0.2)
+
+    summary = metrics.summary()
+
+    assert list(summary) == ["fetch", "llm", "write"]
+    assert summary["fetch"].count == 2
+    assert summary["llm"].p99_seconds == 0.2
+
+
+def test_prometheus_textfile_has_cumulative_buckets(tmp_path: Path) -> None:
+    metrics = StageMetrics()
+    for seconds in (0.003, 0.2, 7.0):
+        metrics.observe("llm", seconds)
+    path = tmp_path / "textfile" / "email2qa.prom"
+
+    write_prometheus_textfile(path, metrics)
+    text = path.read_text(encoding="utf-8")
+
+    assert "# TYPE email2qa_stage_duration_seconds histogram" in text
+    assert 'email2qa_stage_duration_seconds_bucket{stage="llm",le="0.005"} 1' in text
+    assert 'email2qa_stage_duration_seconds_bucket{stage="llm",le="0.25"} 2' in text
+    assert 'email2qa_stage_duration_seconds_bucket{stage="llm",le="+Inf"} 3' in text
+    assert 'email2qa_stage_duration_seconds_count{stage="llm"} 3' in text
+    assert list(tmp_path.joinpath("textfile").iterdir()) == [path]
+
+
+def test_queue_depths_are_summarized_and_exported() -> None:
+    metrics = StageMetrics()
+    observe = metrics.depth_observer("commit", 8)
+    assert observe is not None
+    for depth in (0, 8, 4):
+        observe(depth)
+    metrics.observe_depth("fetch", 3, 100)
+
+    depths = metrics.queue_summary()
+    text = metrics.prometheus_text()
+
+    assert list(depths) == ["fetch", "commit"]
+    assert depths["commit"].max_depth == 8
+    assert depths["commit"].mean_depth == 4.0
+    assert depths["commit"].capacity == 8
+    assert "# TYPE email2qa_queue_depth_max gauge" in text
+    assert 'email2qa_queue_depth_max{queue="commit"} 8' in text
+    assert StageMetrics(enabled=False).depth_observer("commit", 8) is None
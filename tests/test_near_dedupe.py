@@ -0,0 +1,26 @@
+from email2qa.near_dedupe import NearDuplicateIndex
+
+_ANSWER = (
+    "how do i reset my password? open the account portal, choose security settings, "
+    "click reset password and follow the link we email to your registered address"
+)
+
+
+def test_near_duplicate_is_found_after_small_edit() -> None:
+    index = NearDuplicateIndex(threshold=0.7)
+    index.add(index.signature(_ANSWER))
+
+    edited = _ANSWER.replace("registered address", "registered email address")
+    assert index.find(index.signature(edited)) is not None
+
+
+def test_unrelated_text_is_not_a_near_duplicate() -> None:
+    index = NearDuplicateIndex(threshold=0.7)
+    index.add(index.signature(_ANSWER))
+
+    other = "why is my invoice late? billing runs on the first business day and invoices follow within a week"
+    assert index.find(index.signature(other)) is None
+
+
+def test_signatures_are_deterministic() -> None:
+    assert NearDuplicateIndex(0.8).signature(_ANSWER) == NearDuplicateIndex(0.8).signature(_ANSWER)
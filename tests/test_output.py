@@ -0,0 +1,93 @@
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from email2qa.output import JsonlWriter, iter_run_records
+from email2qa.schema import RejectedRecord
+
+
+def _record(index: int) -> RejectedRecord:
+    return RejectedRecord(
+        reason="insufficient_content",
+        message_id=f"m{index}",
+        thread_id="t1",
+        subject="Re: ticket",
+        sent_at=datetime(2026, 2, 1, tzinfo=timezone.utc),
+    )
+
+
+def test_writer_buffers_until_threshold(tmp_path: Path) -> None:
+    path = tmp_path / "rejected.jsonl"
+    writer = JsonlWriter(path, flush_bytes=1 << 20, flush_seconds=3600)
+
+    writer.write(_record(1))
+    writer.write(_record(2))
+    assert path.exists() is False
+
+    writer.close()
+    assert [line for line in path.read_text(encoding="utf-8").splitlines()] == [
+        _record(1).model_dump_json(),
+        _record(2).model_dump_json(),
+    ]
+
+
+def test_writer_flushes_on_size_threshold(tmp_path: Path) -> None:
+    path = tmp_path / "rejected.jsonl"
+    with JsonlWriter(path, durability="fsync", flush_bytes=1, flush_seconds=3600) as writer:
+        writer.write(_record(1))
+        assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_writer_closes_on_exception(tmp_path: Path) -> None:
+    path = tmp_path / "rejected.jsonl"
+    with pytest.raises(RuntimeError), JsonlWriter(path, flush_seconds=3600) as writer:
+        writer.write(_record(1))
+        raise RuntimeError("boom")
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_writer_rejects_unknown_durability(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        JsonlWriter(tmp_path / "x.jsonl", durability="sometimes")
+
+
+def test_writer_rotates_gzip_shards_and_reads_them_back(tmp_path: Path) -> None:
+    record_bytes = len(_record(0).model_dump_json()) + 1
+    with JsonlWriter(
+        tmp_path / "rejected.jsonl",
+        flush_bytes=1 << 20,
+        flush_seconds=3600,
+        compression="gzip",
+        shard_bytes=record_bytes * 4,
+    ) as writer:
+        for index in range(10):
+            writer.write(_record(index))
+
+    assert [shard.file for shard in writer.shards] == [
+        "rejected-00000.jsonl.gz",
+        "rejected-00001.jsonl.gz",
+        "rejected-00002.jsonl.gz",
+    ]
+    assert [shard.records for shard in writer.shards] == [4, 4, 2]
+    assert all(shard.bytes == (tmp_path / shard.file).stat().st_size for shard in writer.shards)
+    manifest = {"output_shards": [shard.model_dump() for shard in writer.shards]}
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+    assert [record["message_id"] for record in iter_run_records(tmp_path, "rejected")] == [
+        f"m{index}" for index in range(10)
+    ]
+
+
+def test_zstd_output_roundtrips(tmp_path: Path) -> None:
+    pytest.importorskip("zstandard")
+    with JsonlWriter(tmp_path / "rejected.jsonl", compression="zstd", flush_seconds=3600) as writer:
+        writer.write(_record(1))
+
+    assert [shard.file for shard in writer.shards] == ["rejected.jsonl.zst"]
+    assert [record["message_id"] for record in iter_run_records(tmp_path, "rejected")] == ["m1"]
+
+
+def test_writer_rejects_unknown_compression(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        JsonlWriter(tmp_path / "x.jsonl", compression="lz4")
@@ -0,0 +1,648 @@
+import json
+import threading
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from email2qa import pipeline, sources
+from email2qa.checkpoint import load_checkpoint, load_sync_state, sync_state_path
+from email2qa.config import AppConfig, RunOptions
+from email2qa.exchange_client import SourceEmail
+from email2qa.llm_client import LlmResult, LlmTimeout, TruncatedOutput
+from email2qa.output import iter_run_records
+
+_BODY = "Please restart the sync service and clear the local cache before retrying the upload."
+
+
+def _config(tmp_path: Path) -> AppConfig:
+    return AppConfig(
+        exchange_server="mail.example.com",
+        exchange_email="agent@example.com",
+        exchange_username="agent@example.com",
+        exchange_password="secret",
+        ollama_base_url="http://localhost:11434",
+        ollama_model="test-model",
+        output_dir=str(tmp_path),
+        min_confidence=0.65,
+    )
+
+
+def _message(index: int, body: str = _BODY) -> SourceEmail:
+    return SourceEmail(
+        message_id=f"m{index}",
+        thread_id=f"t{index}",
+        subject=f"Re: ticket {index}",
+        body=body,
+        sent_at=datetime(2026, 2, 1, index, tzinfo=timezone.utc),
+        sender="agent@example.com",
+        recipients=["user@example.com"],
+    )
+
+
+def _read_manifest(run_dir: str) -> dict:
+    return json.loads((Path(run_dir) / "manifest.json").read_text(encoding="utf-8"))
+
+
+def test_dry_run_counts_streamed_messages(tmp_path: Path, monkeypatch) -> None:
+    def fake_fetch(**kwargs):
+        yield _message(1)
+        yield _message(2, body="ok thanks")
+        yield _message(3)
+
+    monkeypatch.setattr(sources, "fetch_sent_items", fake_fetch)
+
+    run_dir = pipeline.run_pipeline(_config(tmp_path), RunOptions(dry_run=True))
+    manifest = _read_manifest(run_dir)
+
+    assert manifest["total_processed"] == 3
+    assert manifest["accepted_count"] == 0
+    assert manifest["rejected_count"] == 3
+
+
+def test_rerun_skips_processed_messages_before_download(tmp_path: Path, monkeypatch) -> None:
+    messages = [_message(1), _message(2)]
+
+    def fake_fetch(*, should_skip=None, **kwargs):
+        for message in messages:
+            if should_skip and should_skip(message.sent_at, message.message_id):
+                continue
+            yield message
+
+    monkeypatch.setattr(sources, "fetch_sent_items", fake_fetch)
+    pipeline.run_pipeline(_config(tmp_path / "out"), RunOptions(dry_run=True))
+
+    messages.append(_message(0))
+    run_dir = pipeline.run_pipeline(_config(tmp_path / "out"), RunOptions(dry_run=True, resume=True))
+    manifest = _read_manifest(run_dir)
+
+    assert manifest["skipped_count"] == 3
+    assert manifest["total_processed"] == 0
+
+
+class _SlowFakeOllama:
+    active = 0
+    peak = 0
+
+    def __init__(self, base_url: str, model: str, **kwargs) -> None:
+        self.model = model
+        self._lock = threading.Lock()
+
+    def extract_qa(self, prompt: str) -> LlmResult:
+        with self._lock:
+            type(self).active += 1
+            type(self).peak = max(type(self).peak, type(self).active)
+        message_id = prompt.split("MessageId: ", 1)[1].split("\n", 1)[0]
+        # Earlier messages finish last so out-of-order completion is exercised.
+        time.sleep(0.05 / int(message_id[1:]))
+        with self._lock:
+            type(self).active -= 1
+        return LlmResult(
+            question=f"How do I fix issue {message_id}?",
+            answer=f"Restart the service for {message_id}.",
+            confidence=0.9,
+            extraction_notes="",
+        )
+
+    def close(self) -> None:
+        pass
+
+
+def test_concurrent_llm_commits_in_fetch_order(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: iter([_message(i) for i in range(1, 7)]))
+    monkeypatch.setattr(pipeline, "OllamaClient", _SlowFakeOllama)
+
+    run_dir = pipeline.run_pipeline(_config(tmp_path), RunOptions(llm_concurrency=4))
+    lines = (Path(run_dir) / "accepted.jsonl").read_text(encoding="utf-8").splitlines()
+
+    assert [json.loads(line)["message_id"] for line in lines] == [f"m{i}" for i in range(1, 7)]
+    assert _SlowFakeOllama.peak > 1
+
+
+def test_rerun_reuses_cached_llm_responses(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: iter([_message(1), _message(2)]))
+    monkeypatch.setattr(pipeline, "OllamaClient", _SlowFakeOllama)
+
+    options = RunOptions(resume=False, llm_cache=True)
+    first = _read_manifest(pipeline.run_pipeline(_config(tmp_path), options))
+    second = _read_manifest(pipeline.run_pipeline(_config(tmp_path), options))
+
+    assert (first["llm_cache_hits"], first["llm_cache_misses"]) == (0, 2)
+    assert (second["llm_cache_hits"], second["llm_cache_misses"]) == (2, 0)
+
+
+def test_group_threads_sends_one_prompt_per_conversation(tmp_path: Path, monkeypatch) -> None:
+    thread_messages = [
+        SourceEmail(
+            message_id=f"m{index}",
+            thread_id="t-shared" if index < 4 else "t-other",
+            subject="Re: sync issue",
+            body=_BODY,
+            sent_at=datetime(2026, 2, 1, index, tzinfo=timezone.utc),
+            sender="agent@example.com",
+            recipients=["user@example.com"],
+        )
+        for index in range(1, 6)
+    ]
+    prompts: list[str] = []
+
+    class _RecordingOllama(_SlowFakeOllama):
+        def extract_qa(self, prompt: str) -> LlmResult:
+            prompts.append(prompt)
+            return LlmResult(
+                question=f"How do I fix sync {len(prompts)}?",
+                answer="Restart the sync service and clear the cache.",
+                confidence=0.9,
+                extraction_notes="",
+            )
+
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: iter(thread_messages))
+    monkeypatch.setattr(pipeline, "OllamaClient", _RecordingOllama)
+
+    run_dir = pipeline.run_pipeline(_config(tmp_path), RunOptions(group_threads=True, llm_cache=False))
+    records = [json.loads(line) for line in (Path(run_dir) / "accepted.jsonl").read_text().splitlines()]
+    manifest = _read_manifest(run_dir)
+
+    assert manifest["prompts_dispatched"] == 2
+    assert manifest["total_processed"] == 5
+    assert records[0]["message_id"] == "m3"
+    assert records[0]["source_message_ids"] == ["m1", "m2", "m3"]
+    assert "LatestReply:" in prompts[0]
+
+
+def test_batch_mode_fans_out_results_and_falls_back_for_missing(tmp_path: Path, monkeypatch) -> None:
+    batch_calls: list[list[str]] = []
+    single_calls: list[str] = []
+
+    class _BatchOllama(_SlowFakeOllama):
+        def extract_qa(self, prompt: str) -> LlmResult:
+            single_calls.append(prompt.split("MessageId: ", 1)[1].split("\n", 1)[0])
+            return super().extract_qa(prompt)
+
+        def extract_qa_batch(self, prompt: str, message_ids: list[str]) -> dict[str, LlmResult]:
+            batch_calls.append(message_ids)
+            # Drop the last id to simulate an incomplete batch response.
+            return {
+                message_id: LlmResult(
+                    question=f"How do I fix issue {message_id}?",
+                    answer=f"Restart the service for {message_id}.",
+                    confidence=0.9,
+                    extraction_notes="batched",
+                )
+                for message_id in message_ids[:-1]
+            }
+
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: iter([_message(i) for i in range(1, 6)]))
+    monkeypatch.setattr(pipeline, "OllamaClient", _BatchOllama)
+
+    options = RunOptions(batch_token_budget=10_000, batch_max_emails=3, llm_cache=False)
+    run_dir = pipeline.run_pipeline(_config(tmp_path), options)
+    records = [json.loads(line) for line in (Path(run_dir) / "accepted.jsonl").read_text().splitlines()]
+    manifest = _read_manifest(run_dir)
+
+    assert batch_calls == [["m1", "m2", "m3"], ["m4", "m5"]]
+    assert single_calls == ["m3", "m5"]
+    assert [record["message_id"] for record in records] == ["m1", "m2", "m3", "m4", "m5"]
+    assert manifest["prompts_dispatched"] == 2
+    assert manifest["batch_fallbacks"] == 2
+
+
+def test_checkpoint_advances_during_run_and_survives_crash(tmp_path: Path, monkeypatch) -> None:
+    class _CrashingOllama(_SlowFakeOllama):
+        def extract_qa(self, prompt: str) -> LlmResult:
+            if "MessageId: m4" in prompt:
+                raise RuntimeError("ollama went away")
+            return super().extract_qa(prompt)
+
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: iter([_message(i) for i in range(1, 7)]))
+    monkeypatch.setattr(pipeline, "OllamaClient", _CrashingOllama)
+    config = replace(_config(tmp_path), checkpoint_every=1)
+
+    with pytest.raises(RuntimeError):
+        pipeline.run_pipeline(config, RunOptions(llm_cache=False))
+
+    saved = load_checkpoint(tmp_path.resolve() / "checkpoint.json")
+    assert saved is not None
+    assert saved.last_message_id == "m3"
+    run_dirs = [entry for entry in tmp_path.iterdir() if entry.is_dir()]
+    accepted = (run_dirs[0] / "accepted.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["message_id"] for line in accepted] == ["m1", "m2", "m3"]
+
+
+_ACK_BODY = "Thanks, got it. See attached the report you asked for, will do the rest tomorrow."
+
+
+def test_relevance_gate_skips_llm_and_shadow_mode_counts_misses(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(
+        sources,
+        "fetch_sent_items",
+        lambda **kwargs: iter([_message(1), _message(2, body=_ACK_BODY), _message(3)]),
+    )
+    monkeypatch.setattr(pipeline, "OllamaClient", _SlowFakeOllama)
+    options = RunOptions(relevance_threshold=0.3, llm_cache=False, resume=False)
+
+    gated = _read_manifest(pipeline.run_pipeline(_config(tmp_path / "gated"), options))
+    shadow_dir = pipeline.run_pipeline(_config(tmp_path / "shadow"), replace(options, relevance_shadow=True))
+    shadow = _read_manifest(shadow_dir)
+
+    assert gated["relevance_gated"] == 1
+    assert gated["prompts_dispatched"] == 2
+    assert gated["accepted_count"] == 2
+    assert shadow["relevance_gated"] == 0
+    assert shadow["prompts_dispatched"] == 3
+    assert shadow["relevance_shadow_gated"] == 1
+    assert shadow["relevance_shadow_missed"] == 1
+
+
+def test_recorded_snapshot_replays_without_exchange(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: iter([_message(i) for i in range(1, 4)]))
+    monkeypatch.setattr(pipeline, "OllamaClient", _SlowFakeOllama)
+    snapshot = tmp_path / "mailbox.snap"
+    config = _config(tmp_path / "out")
+
+    recorded = _read_manifest(pipeline.run_pipeline(config, RunOptions(record_snapshot=str(snapshot))))
+
+    def no_exchange(**kwargs):
+        raise AssertionError("snapshot replay must not contact Exchange")
+
+    monkeypatch.setattr(sources, "fetch_sent_items", no_exchange)
+    replayed = _read_manifest(
+        pipeline.run_pipeline(config, RunOptions(source=f"snapshot:{snapshot}", llm_cache=False))
+    )
+
+    assert recorded["accepted_count"] == 3
+    assert replayed["total_processed"] == 3
+    assert replayed["accepted_count"] == 3
+
+
+def test_stage_metrics_are_written_to_manifest_and_textfile(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: iter([_message(i) for i in range(1, 4)]))
+    monkeypatch.setattr(pipeline, "OllamaClient", _SlowFakeOllama)
+    textfile = tmp_path / "metrics.prom"
+
+    plain = _read_manifest(pipeline.run_pipeline(_config(tmp_path / "plain"), RunOptions(llm_cache=False)))
+    timed = _read_manifest(
+        pipeline.run_pipeline(
+            _config(tmp_path / "timed"),
+            RunOptions(llm_cache=False, metrics_textfile=str(textfile)),
+        )
+    )
+
+    assert plain["stage_timings"] == {}
+    assert list(timed["stage_timings"]) == ["fetch", "preprocess", "prompt", "llm", "quality", "write"]
+    assert timed["stage_timings"]["llm"]["count"] == 3
+    assert timed["stage_timings"]["llm"]["p50_seconds"] > 0
+    assert 'email2qa_stage_duration_seconds_count{stage="write"} 3' in textfile.read_text(encoding="utf-8")
+
+
+class _FlakyOllama(_SlowFakeOllama):
+    def extract_qa(self, prompt: str) -> LlmResult:
+        if "MessageId: m2\n" in prompt:
+            raise LlmTimeout("no response within 60s")
+        if "MessageId: m3\n" in prompt:
+            raise TruncatedOutput("token limit")
+        return super().extract_qa(prompt)
+
+
+def test_llm_failures_become_rejects_without_stopping_the_run(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: iter([_message(i) for i in range(1, 5)]))
+    monkeypatch.setattr(pipeline, "OllamaClient", _FlakyOllama)
+
+    run_dir = pipeline.run_pipeline(_config(tmp_path), RunOptions(llm_cache=False))
+    manifest = _read_manifest(run_dir)
+    rejected = [json.loads(line) for line in (Path(run_dir) / "rejected.jsonl").read_text().splitlines()]
+
+    assert manifest["accepted_count"] == 2
+    assert manifest["llm_errors"] == 2
+    assert [(record["message_id"], record["reason"]) for record in rejected] == [
+        ("m2", "llm_timeout"),
+        ("m3", "llm_truncated_output"),
+    ]
+    assert load_checkpoint(tmp_path / "checkpoint.json").last_message_id == "m4"
+
+
+class _FakeSyncMailbox:
+    # Account stand-in whose sent folder replays a change log from an offset sync state,
+    # like exchangelib's Folder.sync_items.
+    def __init__(self) -> None:
+        self.changes: list[tuple[str, SimpleNamespace]] = []
+        self.items: dict[str, SimpleNamespace] = {}
+        self.item_sync_state: str | None = None
+        self.sent = self
+        self.fetched_ids: list[str] = []
+
+    def add(self, index: int) -> None:
+        message = _message(index)
+        item = SimpleNamespace(
+            id=f"id-{index}",
+            changekey="ck",
+            message_id=message.message_id,
+            conversation_id=SimpleNamespace(id=message.thread_id),
+            subject=message.subject,
+            body=message.body,
+            datetime_sent=message.sent_at,
+            sender=SimpleNamespace(email_address=message.sender),
+            to_recipients=[SimpleNamespace(email_address=address) for address in message.recipients],
+        )
+        self.items[item.id] = item
+        self.changes.append(("create", item))
+
+    def sync_items(self, sync_state=None, only_fields=None, max_changes_returned=None):
+        yield from self.changes[int(sync_state or 0) :]
+        self.item_sync_state = str(len(self.changes))
+
+    def fetch(self, ids, only_fields=None, chunk_size=None):
+        for item_id, _changekey in ids:
+            self.fetched_ids.append(item_id)
+            yield self.items[item_id]
+
+
+def test_incremental_sync_fetches_only_the_delta(tmp_path: Path, monkeypatch) -> None:
+    mailbox = _FakeSyncMailbox()
+    for index in (2, 3):
+        mailbox.add(index)
+    monkeypatch.setattr(sources, "connect_account", lambda **kwargs: mailbox)
+    monkeypatch.setattr(pipeline, "OllamaClient", _SlowFakeOllama)
+    config = _config(tmp_path)
+    options = RunOptions(incremental_sync=True, llm_cache=False)
+
+    first = _read_manifest(pipeline.run_pipeline(config, options))
+    assert load_sync_state(sync_state_path(str(tmp_path))).sync_state == "2"
+
+    # An item older than the checkpoint still arrives, because sync state, not sent time, decides.
+    mailbox.add(1)
+    mailbox.fetched_ids.clear()
+    second = _read_manifest(pipeline.run_pipeline(config, options))
+
+    assert first["accepted_count"] == 2
+    assert second["total_processed"] == 1
+    assert second["accepted_count"] == 1
+    assert mailbox.fetched_ids == ["id-1"]
+    assert load_sync_state(sync_state_path(str(tmp_path))).sync_state == "3"
+
+
+def test_incremental_sync_state_is_not_saved_for_a_limited_run(tmp_path: Path, monkeypatch) -> None:
+    mailbox = _FakeSyncMailbox()
+    for index in (1, 2, 3):
+        mailbox.add(index)
+    monkeypatch.setattr(sources, "connect_account", lambda **kwargs: mailbox)
+    monkeypatch.setattr(pipeline, "OllamaClient", _SlowFakeOllama)
+
+    pipeline.run_pipeline(_config(tmp_path), RunOptions(incremental_sync=True, llm_cache=False, limit=2))
+
+    assert load_sync_state(sync_state_path(str(tmp_path))) is None
+
+
+def test_sources_file_runs_each_mailbox_with_its_own_checkpoint(tmp_path: Path, monkeypatch) -> None:
+    mailboxes = {
+        "alice@example.com": [_message(1), _message(3)],
+        "support@example.com": [_message(index) for index in range(10, 16)],
+    }
+
+    def fake_fetch(*, email, folder, should_skip=None, **kwargs):
+        for message in mailboxes[email]:
+            if should_skip and should_skip(message.sent_at, message.message_id):
+                continue
+            yield message
+
+    monkeypatch.setattr(sources, "fetch_sent_items", fake_fetch)
+    monkeypatch.setattr(pipeline, "OllamaClient", _SlowFakeOllama)
+    sources_file = tmp_path / "sources.json"
+    sources_file.write_text(
+        json.dumps(
+            [
+                {"name": "alice", "email": "alice@example.com"},
+                {"name": "support", "email": "support@example.com", "folder": "inbox"},
+            ]
+        ),
+        encoding="utf-8",
+    )
+    config = _config(tmp_path / "out")
+    options = RunOptions(sources_file=str(sources_file), llm_cache=False, llm_concurrency=2)
+
+    manifest = _read_manifest(pipeline.run_pipeline(config, options))
+    mailboxes["alice@example.com"].append(_message(4))
+    rerun = _read_manifest(pipeline.run_pipeline(config, options))
+
+    assert manifest["accepted_count"] == 8
+    assert [(source["name"], source["accepted_count"]) for source in manifest["sources"]] == [
+        ("alice", 2),
+        ("support", 6),
+    ]
+    alice_checkpoint = load_checkpoint(tmp_path / "out" / "sources" / "alice" / "checkpoint.json")
+    support_checkpoint = load_checkpoint(tmp_path / "out" / "sources" / "support" / "checkpoint.json")
+    assert alice_checkpoint.last_message_id == "m4"
+    assert support_checkpoint.last_message_id == "m15"
+    assert rerun["total_processed"] == 1
+    assert rerun["sources"][0]["accepted_count"] == 1
+
+
+def test_staged_run_applies_backpressure_and_reports_queue_depths(tmp_path: Path, monkeypatch) -> None:
+    fetched: list[str] = []
+    lead: list[int] = []
+
+    def fake_fetch(**kwargs):
+        for index in range(60):
+            message = replace(
+                _message(1),
+                message_id=f"m{index}",
+                sent_at=datetime(2026, 2, 1, tzinfo=timezone.utc) + timedelta(minutes=index),
+            )
+            fetched.append(message.message_id)
+            yield message
+
+    class _CountingOllama(_SlowFakeOllama):
+        calls = 0
+
+        def extract_qa(self, prompt: str) -> LlmResult:
+            with self._lock:
+                type(self).calls += 1
+                lead.append(len(fetched) - type(self).calls)
+            time.sleep(0.002)
+            message_id = prompt.split("MessageId: ", 1)[1].split("\n", 1)[0]
+            return LlmResult(
+                question=f"How do I fix issue {message_id}?",
+                answer=f"Restart the service for {message_id}.",
+                confidence=0.9,
+                extraction_notes="",
+            )
+
+    monkeypatch.setattr(sources, "fetch_sent_items", fake_fetch)
+    monkeypatch.setattr(pipeline, "OllamaClient", _CountingOllama)
+
+    run_dir = pipeline.run_pipeline(
+        _config(tmp_path),
+        RunOptions(llm_concurrency=2, stage_queue_size=2, metrics=True, llm_cache=False),
+    )
+    manifest = _read_manifest(run_dir)
+    lines = (Path(run_dir) / "accepted.jsonl").read_text(encoding="utf-8").splitlines()
+
+    assert [json.loads(line)["message_id"] for line in lines] == [f"m{index}" for index in range(60)]
+    # Fetch never runs further ahead of the LLM than the queues between them can hold.
+    assert max(lead) <= 2 + 4 + 4
+    assert list(manifest["queue_depths"]) == ["fetch", "llm", "commit"]
+    assert manifest["queue_depths"]["fetch"]["capacity"] == 2
+    assert manifest["queue_depths"]["commit"]["max_depth"] <= 4
+
+
+def test_compressed_sharded_output_is_listed_in_manifest(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: iter([_message(i) for i in range(1, 7)]))
+    monkeypatch.setattr(pipeline, "OllamaClient", _SlowFakeOllama)
+    config = replace(_config(tmp_path), output_compression="gzip", output_shard_bytes=600)
+
+    run_dir = pipeline.run_pipeline(config, RunOptions(llm_cache=False))
+    manifest = _read_manifest(run_dir)
+    accepted = [shard for shard in manifest["output_shards"] if shard["kind"] == "accepted"]
+
+    assert len(accepted) > 1
+    assert all(shard["file"].endswith(".jsonl.gz") for shard in accepted)
+    assert sum(shard["records"] for shard in accepted) == manifest["accepted_count"] == 6
+    assert [record["message_id"] for record in iter_run_records(Path(run_dir), "accepted")] == [
+        f"m{i}" for i in range(1, 7)
+    ]
+
+
+def test_concurrent_run_with_persistent_dedupe_commits_the_index(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: iter([_message(i) for i in range(1, 5)]))
+    monkeypatch.setattr(pipeline, "OllamaClient", _SlowFakeOllama)
+    config = _config(tmp_path)
+    options = RunOptions(llm_concurrency=2, persistent_dedupe=True, llm_cache=False, resume=False)
+
+    first = _read_manifest(pipeline.run_pipeline(config, options))
+    second = _read_manifest(pipeline.run_pipeline(config, options))
+
+    assert first["accepted_count"] == 4
+    # Every pair accepted by the first run is in the index, so the rerun rejects them all.
+    assert second["accepted_count"] == 0
+    assert second["rejected_count"] == 4
+
+
+def test_sources_file_shares_persistent_dedupe_across_mailboxes(tmp_path: Path, monkeypatch) -> None:
+    # Both mailboxes sent the same answers, so the shared index keeps only one copy of each.
+    mailboxes = {
+        "alice@example.com": [_message(index) for index in range(1, 4)],
+        "bob@example.com": [replace(_message(index), message_id=f"b{index}") for index in range(1, 4)],
+    }
+
+    def fake_fetch(*, email, folder, should_skip=None, **kwargs):
+        yield from mailboxes[email]
+
+    class _SameAnswerOllama(_SlowFakeOllama):
+        def extract_qa(self, prompt: str) -> LlmResult:
+            subject = prompt.split("Subject: ", 1)[1].split("\n", 1)[0]
+            return LlmResult(
+                question=f"How do I fix {subject}?",
+                answer=f"Restart the service for {subject}.",
+                confidence=0.9,
+                extraction_notes="",
+            )
+
+    monkeypatch.setattr(sources, "fetch_sent_items", fake_fetch)
+    monkeypatch.setattr(pipeline, "OllamaClient", _SameAnswerOllama)
+    sources_file = tmp_path / "sources.json"
+    sources_file.write_text(
+        json.dumps([{"name": "alice", "email": "alice@example.com"}, {"name": "bob", "email": "bob@example.com"}]),
+        encoding="utf-8",
+    )
+    options = RunOptions(sources_file=str(sources_file), persistent_dedupe=True, llm_cache=False, resume=False)
+
+    manifest = _read_manifest(pipeline.run_pipeline(_config(tmp_path / "out"), options))
+
+    assert manifest["total_processed"] == 6
+    assert manifest["accepted_count"] == 3
+    assert manifest["rejected_count"] == 3
+    assert (tmp_path / "out" / "dedupe.sqlite3").exists()
+
+
+def test_checkpoint_does_not_skip_messages_tied_on_sent_time(tmp_path: Path, monkeypatch) -> None:
+    # Exchange only orders by sent time, so a tie can arrive with the larger message id first.
+    tied = [replace(_message(1), message_id="z-msg"), replace(_message(1), message_id="a-msg", thread_id="t2")]
+
+    class _FixedOllama(_SlowFakeOllama):
+        def extract_qa(self, prompt: str) -> LlmResult:
+            return LlmResult(
+                question="How do I fix the sync service?",
+                answer="Restart the sync service and clear the cache.",
+                confidence=0.9,
+                extraction_notes="",
+            )
+
+    class _CrashingOllama(_FixedOllama):
+        def extract_qa(self, prompt: str) -> LlmResult:
+            if "MessageId: a-msg" in prompt:
+                raise RuntimeError("ollama went away")
+            return super().extract_qa(prompt)
+
+    def fake_fetch(*, should_skip=None, **kwargs):
+        for message in tied:
+            if should_skip and should_skip(message.sent_at, message.message_id):
+                continue
+            yield message
+
+    monkeypatch.setattr(sources, "fetch_sent_items", fake_fetch)
+    monkeypatch.setattr(pipeline, "OllamaClient", _CrashingOllama)
+    config = replace(_config(tmp_path), checkpoint_every=1)
+
+    with pytest.raises(RuntimeError):
+        pipeline.run_pipeline(config, RunOptions(llm_cache=False))
+    assert load_checkpoint(tmp_path.resolve() / "checkpoint.json").last_message_id == "z-msg"
+
+    monkeypatch.setattr(pipeline, "OllamaClient", _FixedOllama)
+    rerun = _read_manifest(pipeline.run_pipeline(config, RunOptions(llm_cache=False)))
+
+    assert rerun["skipped_count"] == 1
+    assert rerun["total_processed"] == 1
+    assert rerun["accepted_count"] == 1
+
+
+def test_group_threads_dispatches_conversations_that_leave_the_window(tmp_path: Path, monkeypatch) -> None:
+    def reply(index: int, thread_id: str, hour: int) -> SourceEmail:
+        return replace(
+            _message(1),
+            message_id=f"m{index}",
+            thread_id=thread_id,
+            sent_at=datetime(2026, 2, 1, hour, tzinfo=timezone.utc),
+        )
+
+    # t-a goes quiet after hour 2 and is dispatched when hour 5 arrives, so its late reply at
+    # hour 6 starts a new group. t-big is sent as soon as two replies reach the token cap.
+    stream = [
+        reply(1, "t-a", 1),
+        reply(2, "t-a", 2),
+        reply(3, "t-big", 3),
+        reply(4, "t-big", 3),
+        reply(5, "t-big", 4),
+        reply(6, "t-b", 5),
+        reply(7, "t-a", 6),
+    ]
+    calls: list[str] = []
+
+    class _RecordingOllama(_SlowFakeOllama):
+        def extract_qa(self, prompt: str) -> LlmResult:
+            calls.append(prompt)
+            return LlmResult(
+                question=f"How do I fix sync {len(calls)}?",
+                answer=f"Restart the sync service, attempt {len(calls)}.",
+                confidence=0.9,
+                extraction_notes="",
+            )
+
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: iter(stream))
+    monkeypatch.setattr(pipeline, "OllamaClient", _RecordingOllama)
+    body_tokens = pipeline.estimate_tokens(_BODY)
+    options = RunOptions(
+        group_threads=True,
+        thread_window_hours=3,
+        thread_max_tokens=body_tokens * 2,
+        llm_cache=False,
+    )
+
+    run_dir = pipeline.run_pipeline(_config(tmp_path), options)
+    records = [json.loads(line) for line in (Path(run_dir) / "accepted.jsonl").read_text().splitlines()]
+
+    groups = sorted(record["source_message_ids"] or [record["message_id"]] for record in records)
+    assert groups == [["m1", "m2"], ["m3", "m4"], ["m5"], ["m6"], ["m7"]]
+    assert _read_manifest(run_dir)["prompts_dispatched"] == 5
@@ -1,4 +1,12 @@
-from email2qa.preprocess import preprocess_email_body
+from email2qa.preprocess import (
+    PreprocessRules,
+    html_to_text,
+    normalize_whitespace,
+    preprocess_email_body,
+    strip_disclaimer,
+    strip_quoted_text,
+    trim_signature,
+)
 
 
 def test_preprocess_removes_disclaimer_and_quote() -> None:
@@ -22,3 +30,38 @@ def test_preprocess_removes_disclaimer_and_quote() -> None:
 def test_preprocess_flags_short_content() -> None:
     result = preprocess_email_body("ok thanks")
     assert result.has_enough_content is False
+
+
+def _legacy_clean(raw: str) -> str:
+    text = html_to_text(raw)
+    text = strip_disclaimer(text)
+    text = strip_quoted_text(text)
+    text = trim_signature(text)
+    return normalize_whitespace(text)
+
+
+def test_single_pass_matches_legacy_chain() -> None:
+    bodies = [
+        "Hello,\r\nPlease   restart\tthe service.\r\n\r\n\r\n\r\nThanks,\r\nAgent",
+        "Step one.\n  > quoted reply\nnot kept",
+        "Fix applied. Confidentiality Notice: x\nmore\nThis email and any attachments are private",
+        "Line one\rline two\n\n\n\nOn Mon, Bob wrote:\nold text",
+        "Answer here\nBest Regards,\nName\n-----Original Message-----",
+        "<p>Hello</p><p>Use the portal.</p><p>Kind regards</p>",
+        "",
+    ]
+    for body in bodies:
+        assert preprocess_email_body(body).cleaned_text == _legacy_clean(body)
+
+
+def test_extra_rules_extend_defaults() -> None:
+    rules = PreprocessRules(
+        quote_patterns=[r"^Von:\s"],
+        signature_patterns=[r"^cheers[,]?$"],
+        disclaimer_markers=["Internal use only"],
+    )
+
+    assert rules.clean("Answer\nVon: kunde@example.com\nold") == "Answer"
+    assert rules.clean("Answer\nCheers,\nAgent") == "Answer"
+    assert rules.clean("Answer. Internal use only, do not forward") == "Answer."
+    assert rules.clean("Answer\nThanks\nAgent") == "Answer"
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+from email2qa.exchange_client import SourceEmail
+from email2qa.preprocess import DEFAULT_RULES, preprocess_email_body
+from email2qa.preprocess_pool import iter_preprocessed
+
+
+def _messages(count: int) -> list[SourceEmail]:
+    start = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    return [
+        SourceEmail(
+            message_id=f"m{index}",
+            thread_id=f"t{index}",
+            subject=f"Re: ticket {index}",
+            body=(
+                f"<html><body><p>Step {index}: restart the sync service and retry the upload.</p>"
+                "<p>Regards,<br>Agent</p></body></html>"
+                if index % 2
+                else f"Step {index}: clear the cache.\n\n-----Original Message-----\nFrom: user"
+            ),
+            sent_at=start + timedelta(minutes=index),
+            sender="agent@example.com",
+            recipients=["user@example.com"],
+        )
+        for index in range(count)
+    ]
+
+
+def test_iter_preprocessed_inline_matches_preprocess() -> None:
+    messages = _messages(5)
+
+    results = list(iter_preprocessed(messages, DEFAULT_RULES))
+
+    assert [message for message, _ in results] == messages
+    assert [pre for _, pre in results] == [preprocess_email_body(m.body, DEFAULT_RULES) for m in messages]
+
+
+def test_iter_preprocessed_process_pool_preserves_order() -> None:
+    messages = _messages(23)
+
+    results = list(iter_preprocessed(iter(messages), DEFAULT_RULES, workers=2, chunk_size=4))
+
+    assert [message.message_id for message, _ in results] == [m.message_id for m in messages]
+    assert [pre for _, pre in results] == [preprocess_email_body(m.body, DEFAULT_RULES) for m in messages]
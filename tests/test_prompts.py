@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+
+from email2qa.exchange_client import SourceEmail
+from email2qa.prompts import (
+    PromptBudget,
+    build_thread_prompt,
+    build_user_prompt,
+    estimate_tokens,
+    fit_email_to_budget,
+    fit_thread_to_budget,
+    truncate_head_tail,
+)
+
+
+def _reply(index: int, text: str) -> tuple[SourceEmail, str]:
+    message = SourceEmail(
+        message_id=f"m{index}",
+        thread_id="t1",
+        subject=f"Re: ticket {index}",
+        body=text,
+        sent_at=datetime(2026, 2, 1, index, tzinfo=timezone.utc),
+        sender="agent@example.com",
+        recipients=["user@example.com"],
+    )
+    return message, text
+
+
+def test_thread_prompt_puts_latest_reply_last() -> None:
+    prompt = build_thread_prompt([_reply(3, "final fix"), _reply(1, "first reply"), _reply(2, "follow up")])
+
+    assert "MessageIds: m1, m2, m3" in prompt
+    assert "Subject: Re: ticket 3" in prompt
+    assert prompt.index("first reply") < prompt.index("follow up") < prompt.index("LatestReply:")
+    assert prompt.split("LatestReply:", 1)[1].strip().startswith("final fix")
+
+
+def test_truncate_head_tail_keeps_both_ends() -> None:
+    lines = [f"line {index:04d} of the pasted log" for index in range(500)]
+    text = "\n".join(lines)
+
+    truncated = truncate_head_tail(text, 200)
+
+    assert estimate_tokens(truncated) <= 200
+    assert truncated.startswith("line 0000")
+    assert truncated.endswith("line 0499 of the pasted log")
+    assert "characters omitted ...]" in truncated
+    assert truncate_head_tail("short", 200) == "short"
+
+
+def test_fit_email_to_budget_bounds_prompt_and_caps_recipients() -> None:
+    message, _ = _reply(1, "")
+    message.recipients[:] = [f"user{index}@example.com" for index in range(40)]
+    body = "Restart the agent and check the log. " * 2000
+
+    prompt_message, text, note = fit_email_to_budget(message, body, PromptBudget(500, 5))
+    prompt = build_user_prompt(prompt_message, text)
+
+    assert estimate_tokens(prompt) <= 520
+    assert "user4@example.com, (+35 more)" in prompt
+    assert len(message.recipients) == 40
+    assert note.startswith("recipients capped at 5 of 40; body truncated from")
+    assert fit_email_to_budget(message, "ok", PromptBudget()) == (message, "ok", "")
+
+
+def test_fit_thread_to_budget_drops_oldest_context_first() -> None:
+    replies = [_reply(1, "a" * 2000), _reply(2, "b" * 400), _reply(3, "final fix")]
+
+    fitted, note = fit_thread_to_budget(replies, PromptBudget(max_tokens=400))
+
+    assert [message.message_id for message, _ in fitted] == ["m2", "m3"]
+    assert note == "dropped 1 earlier replies"
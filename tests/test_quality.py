@@ -1,5 +1,7 @@
 from datetime import datetime, timezone
+from pathlib import Path
 
+from email2qa.dedupe_index import DedupeIndex
 from email2qa.exchange_client import SourceEmail
 from email2qa.llm_client import LlmResult
 from email2qa.quality import evaluate_candidate, new_quality_state
@@ -56,3 +58,100 @@ def test_duplicate_is_rejected() -> None:
     assert qa2 is None
     assert rejected2 is not None
     assert rejected2.reason == "duplicate_pair"
+
+
+def test_duplicate_is_rejected_across_runs_with_persistent_index(tmp_path: Path) -> None:
+    candidate = LlmResult(
+        question="How do I update billing?",
+        answer="Open billing page and save changes.",
+        confidence=0.95,
+        extraction_notes="",
+    )
+    first_run = DedupeIndex(tmp_path / "dedupe.sqlite3")
+    qa1, _ = evaluate_candidate(
+        message=_message(),
+        candidate=candidate,
+        min_confidence=0.65,
+        state=new_quality_state(first_run),
+    )
+    first_run.close()
+
+    second_run = DedupeIndex(tmp_path / "dedupe.sqlite3")
+    qa2, rejected2 = evaluate_candidate(
+        message=_message(),
+        candidate=LlmResult(
+            question="  how do I UPDATE billing? ",
+            answer="Open billing page and save  changes.",
+            confidence=0.9,
+            extraction_notes="",
+        ),
+        min_confidence=0.65,
+        state=new_quality_state(second_run),
+    )
+    second_run.close()
+
+    assert qa1 is not None
+    assert qa2 is None
+    assert rejected2 is not None
+    assert rejected2.reason == "duplicate_pair"
+
+
+def test_near_duplicate_is_rejected_when_enabled() -> None:
+    state = new_quality_state(near_duplicate_threshold=0.7)
+    answer = (
+        "Open the billing page in the admin portal, update the card details, "
+        "save the changes and wait for the confirmation email from our team."
+    )
+    qa1, _ = evaluate_candidate(
+        message=_message(),
+        candidate=LlmResult(question="How do I update billing?", answer=answer, confidence=0.95, extraction_notes=""),
+        min_confidence=0.65,
+        state=state,
+    )
+    qa2, rejected2 = evaluate_candidate(
+        message=_message(),
+        candidate=LlmResult(
+            question="How do I update billing?",
+            answer=answer.replace("our team", "our billing team"),
+            confidence=0.95,
+            extraction_notes="",
+        ),
+        min_confidence=0.65,
+        state=state,
+    )
+
+    assert qa1 is not None
+    assert qa2 is None
+    assert rejected2 is not None
+    assert rejected2.reason == "near_duplicate"
+
+
+def test_prompt_truncation_is_recorded_on_accepted_and_rejected_records() -> None:
+    candidate = LlmResult(
+        question="How do I update billing?",
+        answer="Open billing page and save changes.",
+        confidence=0.95,
+        extraction_notes="from latest reply",
+    )
+
+    qa, _ = evaluate_candidate(
+        message=_message(),
+        candidate=candidate,
+        min_confidence=0.65,
+        state=new_quality_state(),
+        prompt_truncation="body truncated from 9000 to 2000 characters",
+    )
+    _, rejected = evaluate_candidate(
+        message=_message(),
+        candidate=candidate,
+        min_confidence=0.99,
+        state=new_quality_state(),
+        prompt_truncation="recipients capped at 5 of 40",
+    )
+
+    assert qa is not None
+    assert qa.extraction_notes == (
+        "from latest reply [prompt truncated: body truncated from 9000 to 2000 characters]"
+    )
+    assert rejected is not None
+    assert rejected.prompt_truncation == "recipients capped at 5 of 40"
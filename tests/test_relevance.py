@@ -0,0 +1,26 @@
+from email2qa.relevance import DEFAULT_RELEVANCE_THRESHOLD, relevance_features, relevance_score
+
+
+def test_relevance_score_separates_answers_from_acknowledgements() -> None:
+    answer = (
+        "The error is caused by an old agent version. Upgrade to 5.2, set SyncMode=full in "
+        "C:\\ProgramData\\agent.ini and restart the service."
+    )
+    acknowledgement = "Thank you, got it. Will do."
+    logistics = "Can we move the meeting to tomorrow? I sent a new calendar invite."
+
+    assert relevance_score(answer) > 0.9
+    assert relevance_score(acknowledgement) < DEFAULT_RELEVANCE_THRESHOLD
+    assert relevance_score(logistics) < DEFAULT_RELEVANCE_THRESHOLD
+
+
+def test_relevance_features_are_scaled_to_unit_range() -> None:
+    features = relevance_features("1. restart\n2. restart\n3. restart\n" * 50 + "thanks " * 10)
+
+    assert all(0.0 <= value <= 1.0 for value in features.values())
+    assert features["steps"] == 1.0
+    assert features["acknowledgement"] == 1.0
+
+
+def test_relevance_score_accepts_custom_weights() -> None:
+    assert relevance_score("anything at all", weights={"bias": 0.0}) == 0.5
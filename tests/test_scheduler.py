@@ -0,0 +1,54 @@
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from email2qa.scheduler import FairScheduler
+
+
+def test_sources_take_turns_regardless_of_backlog() -> None:
+    scheduler = FairScheduler(1)
+    gate = threading.Event()
+    order: list[str] = []
+    scheduler.submit("blocker", gate.wait)
+    for index in range(6):
+        scheduler.submit("busy", order.append, f"busy-{index}")
+    for index in range(2):
+        scheduler.submit("quiet", order.append, f"quiet-{index}")
+
+    gate.set()
+    scheduler.shutdown(wait=True)
+
+    assert order[:4] == ["busy-0", "quiet-0", "busy-1", "quiet-1"]
+    assert order[4:] == ["busy-2", "busy-3", "busy-4", "busy-5"]
+
+
+def test_results_and_errors_come_back_through_futures() -> None:
+    scheduler = FairScheduler(2)
+
+    def fail() -> None:
+        raise ValueError("bad prompt")
+
+    ok = scheduler.submit("a", lambda value: value * 2, 21)
+    broken = scheduler.submit("b", fail)
+
+    assert ok.result(timeout=5) == 42
+    with pytest.raises(ValueError, match="bad prompt"):
+        broken.result(timeout=5)
+    scheduler.shutdown()
+
+
+def test_shutdown_can_cancel_queued_work() -> None:
+    scheduler = FairScheduler(1)
+    gate = threading.Event()
+    running = scheduler.submit("a", gate.wait)
+    queued = scheduler.submit("a", lambda: "never")
+
+    threading.Timer(0.05, gate.set).start()
+    scheduler.shutdown(wait=True, cancel_futures=True)
+
+    assert running.result() is True
+    with pytest.raises(CancelledError):
+        queued.result()
+    with pytest.raises(RuntimeError):
+        scheduler.submit("a", lambda: None)
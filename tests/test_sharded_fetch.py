@@ -0,0 +1,161 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import pairwise
+from types import SimpleNamespace
+
+import pytest
+
+from email2qa.exchange_client import iter_sent_items
+from email2qa.sharded_fetch import iter_sharded_items, plan_shards
+
+_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class _FakeFolderQuery:
+    # Enough of exchangelib's QuerySet to filter on datetime_sent, order, slice and count.
+    def __init__(self, folder: "_FakeFolder", items: list[SimpleNamespace]) -> None:
+        self.folder = folder
+        self.items = items
+        self.page_size = None
+        self.chunk_size = None
+
+    def all(self) -> "_FakeFolderQuery":
+        return self
+
+    def only(self, *_fields: str) -> "_FakeFolderQuery":
+        return self
+
+    def order_by(self, *_fields: str) -> "_FakeFolderQuery":
+        return _FakeFolderQuery(self.folder, sorted(self.items, key=lambda item: item.datetime_sent))
+
+    def filter(self, **kwargs) -> "_FakeFolderQuery":
+        items = self.items
+        for lookup, value in kwargs.items():
+            operator = lookup.split("__", 1)[1]
+            compare = {
+                "gte": lambda sent, value=value: sent >= value,
+                "lt": lambda sent, value=value: sent < value,
+                "lte": lambda sent, value=value: sent <= value,
+            }[operator]
+            items = [item for item in items if compare(item.datetime_sent)]
+        return _FakeFolderQuery(self.folder, items)
+
+    def __getitem__(self, key: slice) -> "_FakeFolderQuery":
+        return _FakeFolderQuery(self.folder, self.items[key])
+
+    def count(self) -> int:
+        self.folder.counts += 1
+        return len(self.items)
+
+    def __iter__(self):
+        with self.folder.lock:
+            self.folder.active += 1
+            self.folder.peak = max(self.folder.peak, self.folder.active)
+        try:
+            yield from self.items
+        finally:
+            with self.folder.lock:
+                self.folder.active -= 1
+
+
+class _FakeFolder(_FakeFolderQuery):
+    def __init__(self, items: list[SimpleNamespace]) -> None:
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.counts = 0
+        super().__init__(self, items)
+
+
+class _FakeAccount:
+    def __init__(self, items: list[SimpleNamespace]) -> None:
+        self.sent = _FakeFolder(items)
+        self._by_id = {item.id: item for item in items}
+
+    def fetch(self, ids, only_fields=None, chunk_size=None):
+        for item_id, _changekey in ids:
+            yield self._by_id[item_id]
+
+
+def _item(index: int, sent_at: datetime) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=f"id-{index}",
+        changekey=f"ck-{index}",
+        message_id=f"m{index}",
+        conversation_id=SimpleNamespace(id=f"t{index}"),
+        subject=f"Re: ticket {index}",
+        body="body",
+        datetime_sent=sent_at,
+        sender=SimpleNamespace(email_address="agent@example.com"),
+        to_recipients=[],
+    )
+
+
+def _mailbox() -> list[SimpleNamespace]:
+    # A quiet year with one very busy March, plus two messages sent at the same instant.
+    items = [_item(month, _START + timedelta(days=30 * month + 3)) for month in range(12)]
+    busy = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    items += [_item(100 + index, busy + timedelta(hours=6 * index)) for index in range(80)]
+    items.append(_item(999, items[-1].datetime_sent))
+    return items
+
+
+def test_plan_shards_splits_dense_months_and_covers_the_range() -> None:
+    account = _FakeAccount(_mailbox())
+    until = datetime(2025, 12, 31, tzinfo=timezone.utc)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        shards = plan_shards(account, since=_START, until=until, shards=4, pool=pool)
+
+    assert shards[0].start == _START
+    assert shards[-1].end == until and shards[-1].inclusive_end
+    assert all(previous.end == current.start for previous, current in pairwise(shards))
+    assert sum(shard.count for shard in shards) == len(account.sent.items)
+    march = [shard for shard in shards if shard.end <= datetime(2025, 4, 1, tzinfo=timezone.utc)]
+    assert len(march) >= 3
+    assert max(shard.count for shard in shards) <= 24
+
+
+def test_sharded_fetch_matches_sequential_order_with_capped_connections() -> None:
+    items = _mailbox()
+    until = datetime(2025, 12, 31, tzinfo=timezone.utc)
+    skipped = {"m5", "m120"}
+
+    def skip(_sent_at: datetime, message_id: str) -> bool:
+        return message_id in skipped
+
+    sequential = list(
+        iter_sent_items(
+            _FakeAccount(items), email="a@example.com", since=_START, until=until, limit=None, should_skip=skip
+        )
+    )
+    account = _FakeAccount(items)
+    sharded = list(
+        iter_sharded_items(
+            account,
+            email="a@example.com",
+            since=_START,
+            until=until,
+            shards=6,
+            max_connections=2,
+            page_size=5,
+            should_skip=skip,
+        )
+    )
+
+    assert [message.message_id for message in sharded] == [message.message_id for message in sequential]
+    assert len(sharded) == len(items) - len(skipped)
+    assert account.sent.peak <= 2
+
+
+def test_sharded_fetch_reports_shard_failures() -> None:
+    account = _FakeAccount(_mailbox())
+
+    def broken_fetch(ids, only_fields=None, chunk_size=None):
+        raise ConnectionError("throttled")
+
+    account.fetch = broken_fetch
+
+    with pytest.raises(ConnectionError, match="throttled"):
+        list(iter_sharded_items(account, email="a@example.com", since=_START, until=None, shards=3))
@@ -0,0 +1,179 @@
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from email2qa import sources
+from email2qa.config import AppConfig
+from email2qa.exchange_client import SourceEmail
+from email2qa.sources import (
+    ExchangeSource,
+    SnapshotSource,
+    SnapshotWriter,
+    load_sources_file,
+    mailbox_state_dir,
+    open_source,
+    recording,
+    snapshot_index_path,
+    source_state_dir,
+)
+
+_START = datetime(2026, 2, 1, tzinfo=timezone.utc)
+
+
+def _message(index: int) -> SourceEmail:
+    return SourceEmail(
+        message_id=f"m{index}",
+        thread_id=f"t{index // 2}",
+        subject=f"Re: ticket {index}",
+        body=f"<p>Restart the sync service for ticket {index} – café ✓</p>",
+        sent_at=_START + timedelta(hours=index),
+        sender="agent@example.com",
+        recipients=[f"user{index}@example.com"],
+    )
+
+
+def _config(tmp_path: Path) -> AppConfig:
+    return AppConfig(
+        exchange_server="mail.example.com",
+        exchange_email="agent@example.com",
+        exchange_username="agent@example.com",
+        exchange_password="secret",
+        ollama_base_url="http://localhost:11434",
+        ollama_model="test-model",
+        output_dir=str(tmp_path),
+        min_confidence=0.65,
+    )
+
+
+def test_snapshot_round_trips_messages(tmp_path: Path) -> None:
+    path = tmp_path / "mailbox.snap"
+    messages = [_message(i) for i in range(5)]
+    with SnapshotWriter(path) as writer:
+        recorded = list(recording(iter(messages), writer))
+
+    assert recorded == messages
+    assert snapshot_index_path(path).exists()
+    assert list(SnapshotSource(path).fetch(since=None, until=None, limit=None)) == messages
+
+
+def test_snapshot_applies_window_limit_and_skip_before_reading_bodies(tmp_path: Path) -> None:
+    path = tmp_path / "mailbox.snap"
+    with SnapshotWriter(path) as writer:
+        for index in range(10):
+            writer.write(_message(index))
+    skipped: list[str] = []
+
+    def should_skip(sent_at: datetime, message_id: str) -> bool:
+        if message_id == "m3":
+            skipped.append(message_id)
+            return True
+        return False
+
+    fetched = SnapshotSource(path).fetch(
+        since=_START + timedelta(hours=2),
+        until=_START + timedelta(hours=8),
+        limit=4,
+        should_skip=should_skip,
+    )
+
+    assert [message.message_id for message in fetched] == ["m2", "m4", "m5"]
+    assert skipped == ["m3"]
+
+
+def test_unfinished_snapshot_is_not_visible(tmp_path: Path) -> None:
+    path = tmp_path / "mailbox.snap"
+    writer = SnapshotWriter(path)
+    writer.write(_message(1))
+
+    with pytest.raises(ValueError, match="Snapshot not found"):
+        open_source(f"snapshot:{path}", _config(tmp_path))
+    writer.close()
+    assert isinstance(open_source(f"snapshot:{path}", _config(tmp_path)), SnapshotSource)
+
+
+def test_open_source_exchange_delegates_to_fetch_sent_items(tmp_path: Path, monkeypatch) -> None:
+    calls: list[dict] = []
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: calls.append(kwargs) or iter([]))
+
+    source = open_source("exchange", _config(tmp_path))
+    list(source.fetch(since=None, until=None, limit=3, page_size=50))
+
+    assert isinstance(source, ExchangeSource)
+    assert calls[0]["server"] == "mail.example.com"
+    assert calls[0]["limit"] == 3
+    assert calls[0]["page_size"] == 50
+    with pytest.raises(ValueError, match="Unsupported source"):
+        open_source("imap", _config(tmp_path))
+
+
+def test_sharded_exchange_source_uses_sharded_fetch_unless_limited(tmp_path: Path, monkeypatch) -> None:
+    sharded: list[dict] = []
+    sequential: list[dict] = []
+    monkeypatch.setattr(sources, "fetch_sharded_sent_items", lambda **kwargs: sharded.append(kwargs) or iter([]))
+    monkeypatch.setattr(sources, "fetch_sent_items", lambda **kwargs: sequential.append(kwargs) or iter([]))
+
+    source = open_source("exchange", _config(tmp_path), fetch_shards=8)
+    list(source.fetch(since=_START, until=None, limit=None))
+    list(source.fetch(since=_START, until=None, limit=10))
+
+    assert sharded[0]["shards"] == 8
+    assert sharded[0]["max_connections"] == 4
+    assert len(sequential) == 1
+
+
+def test_snapshot_runs_keep_separate_state(tmp_path: Path) -> None:
+    assert source_state_dir("exchange", str(tmp_path)) == str(tmp_path)
+    assert source_state_dir("snapshot:/data/mailbox.snap", str(tmp_path)) == str(
+        tmp_path / "snapshot-state" / "mailbox.snap"
+    )
+
+
+def test_sources_file_fills_in_defaults_and_reads_passwords_from_env(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("SUPPORT_PASSWORD", "support-secret")
+    path = tmp_path / "sources.json"
+    path.write_text(
+        json.dumps(
+            [
+                {"name": "agent-sent"},
+                {
+                    "name": "support-escalations",
+                    "email": "support@example.com",
+                    "folder": "Inbox/Escalations",
+                    "password_env": "SUPPORT_PASSWORD",
+                },
+                {"name": "replay", "source": "snapshot:/data/sent.snap"},
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+    agent, support, replay = load_sources_file(path, _config(tmp_path))
+
+    assert agent.spec == "exchange"
+    assert agent.config.exchange_email == "agent@example.com"
+    assert agent.config.exchange_folder == "sent"
+    assert support.config.exchange_username == "support@example.com"
+    assert support.config.exchange_password == "support-secret"
+    assert support.config.exchange_folder == "Inbox/Escalations"
+    assert replay.spec == "snapshot:/data/sent.snap"
+    assert mailbox_state_dir(str(tmp_path), support.name) == str(tmp_path / "sources" / "support-escalations")
+
+
+@pytest.mark.parametrize(
+    ("sources", "message"),
+    [
+        ([], "non-empty JSON list"),
+        ([{"name": "a"}, {"name": "a"}], "Duplicate source name"),
+        ([{"name": "../escape"}], "may only contain"),
+        ([{"name": "a", "mailbox": "x"}], "Unknown keys"),
+        ([{"name": "a", "password_env": "EMAIL2QA_TEST_UNSET_PASSWORD"}], "is not set"),
+    ],
+)
+def test_sources_file_rejects_invalid_entries(tmp_path: Path, sources: list, message: str) -> None:
+    path = tmp_path / "sources.json"
+    path.write_text(json.dumps(sources), encoding="utf-8")
+
+    with pytest.raises(ValueError, match=message):
+        load_sources_file(path, _config(tmp_path))
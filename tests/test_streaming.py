@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from email2qa.streaming import BackgroundConsumer, prefetch
+
+
+def test_prefetch_preserves_order() -> None:
+    assert list(prefetch(iter(range(50)), buffer_size=4)) == list(range(50))
+
+
+def test_prefetch_reraises_producer_error() -> None:
+    def produce():
+        yield 1
+        raise RuntimeError("boom")
+
+    stream = prefetch(produce(), buffer_size=2)
+    assert next(stream) == 1
+    with pytest.raises(RuntimeError, match="boom"):
+        next(stream)
+
+
+def test_prefetch_stops_producer_when_consumer_closes() -> None:
+    produced: list[int] = []
+
+    def produce():
+        for value in range(1000):
+            produced.append(value)
+            yield value
+
+    stream = prefetch(produce(), buffer_size=2)
+    assert next(stream) == 0
+    stream.close()
+    assert len(produced) < 1000
+
+
+def test_background_consumer_handles_items_in_order_with_backpressure() -> None:
+    gate = threading.Event()
+    handled: list[int] = []
+    depths: list[int] = []
+
+    def handle(value: int) -> None:
+        gate.wait()
+        handled.append(value)
+
+    consumer = BackgroundConsumer(handle, capacity=2, observe_depth=depths.append)
+    producer = threading.Thread(target=lambda: [consumer.put(value) for value in range(10)])
+    producer.start()
+    producer.join(timeout=0.3)
+    # One item is in hand and two are queued; the producer is blocked on the fourth.
+    assert producer.is_alive()
+    assert max(depths) <= 2
+    gate.set()
+    producer.join()
+    consumer.close()
+
+    assert handled == list(range(10))
+
+
+def test_background_consumer_reraises_and_returns_unhandled_items() -> None:
+    def handle(value: int) -> None:
+        if value == 2:
+            raise RuntimeError("disk full")
+
+    consumer = BackgroundConsumer(handle, capacity=4)
+    for value in range(4):
+        consumer.put(value)
+    with pytest.raises(RuntimeError, match="disk full"):
+        consumer.close()
+    assert consumer.abort() == [3]